@@ -0,0 +1,89 @@
+"""
+Benchmark claim-check - signaux avec texte volumineux, intégré vs référencé
+
+Pour chaque taille de texte (`response` d'un ASSISTANT_RESPONSE), compare:
+- intégré: taille du message Kafka, encodage côté producteur, décodage côté
+  consommateur qui ne lit que les métadonnées
+- claim-check (`shared.claimcheck`, magasin fichier dans un répertoire
+  temporaire): taille du message, stockage du blob + encodage, décodage,
+  et résolution de la référence par un consommateur qui lit le texte
+
+Chaque itération stocke un texte différent (pas de déduplication).
+Aucune infrastructure requise.
+
+Usage:
+    python benchmarks/bench_claimcheck.py --sizes 4096,65536,1048576 --iterations 200
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from shared.claimcheck import ClaimCheck, FileBlobStore  # noqa: E402
+from shared.codec import SignalCodec  # noqa: E402
+from shared.types import CortexId, SignalPondere  # noqa: E402
+
+
+def signal(size: int, i: int) -> SignalPondere:
+    text = (f"{i:08d} " + "Rapport de qualification: besoins, budget, calendrier. " * (size // 50 + 1))[:size]
+    return SignalPondere.trusted(
+        type="ASSISTANT_RESPONSE",
+        source=CortexId.NLP,
+        payload={"session_id": "session-1234567890", "response": text, "final": True},
+        confiance=0.9
+    )
+
+
+async def bench(size: int, iterations: int, claims: ClaimCheck, codec: SignalCodec):
+    signals = [signal(size, i) for i in range(iterations)]
+
+    started = time.perf_counter()
+    inline = [codec.encode(s) for s in signals]
+    inline_encode = time.perf_counter() - started
+    started = time.perf_counter()
+    for value in inline:
+        codec.decode(value)["type"]
+    inline_decode = time.perf_counter() - started
+
+    started = time.perf_counter()
+    offloaded = []
+    for s in signals:
+        payload = await claims.offload_payload(s.payload, ("response",))
+        offloaded.append(codec.encode(s.model_copy(update={"payload": payload})))
+    offload_encode = time.perf_counter() - started
+    started = time.perf_counter()
+    decoded = [codec.decode(value) for value in offloaded]
+    offload_decode = time.perf_counter() - started
+    started = time.perf_counter()
+    for d in decoded:
+        await claims.resolve(d["payload"]["response"])
+    resolve = time.perf_counter() - started
+
+    per = lambda seconds: seconds / iterations * 1e6  # noqa: E731
+    print(f"{size:>9,} {len(inline[0]):>10,} {per(inline_encode):>9.1f} {per(inline_decode):>9.1f}"
+          f" {len(offloaded[0]):>10,} {per(offload_encode):>9.1f} {per(offload_decode):>9.1f} {per(resolve):>9.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="4096,16384,65536,262144,1048576", help="Tailles de texte (octets)")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    codec = SignalCodec("json")
+    print(f"{'':>9} {'---------- inline ----------':>30} {'--------------- claim-check ---------------':>40}")
+    print(f"{'text (B)':>9} {'msg (B)':>10} {'enc µs':>9} {'dec µs':>9}"
+          f" {'msg (B)':>10} {'put+enc':>9} {'dec µs':>9} {'get µs':>9}")
+    with tempfile.TemporaryDirectory() as root:
+        # Seuil 0: le texte est toujours déporté, pour comparer à taille égale
+        claims = ClaimCheck(FileBlobStore(root), threshold=0)
+        for size in (int(s) for s in args.sizes.split(",")):
+            await bench(size, args.iterations, claims, codec)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Benchmark codec des signaux - json.dumps(model_dump()) vs shared.codec
+
+Compare, sur des signaux LEAD_MESSAGE_RECEIVED réalistes avec un
+`conversation_history` de taille croissante, l'ancienne sérialisation
+(`json.dumps(signal.model_dump())` / `json.loads`) et `SignalCodec` en JSON
+(pydantic-core + orjson) et en MessagePack (si `msgpack` est installé).
+Aucune infrastructure requise.
+
+Usage:
+    python benchmarks/bench_codec.py --history 0 10 50 200 --iterations 2000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from shared import codec as codec_module  # noqa: E402
+from shared.codec import SignalCodec  # noqa: E402
+from shared.types import CortexId, SignalPondere, SignalType  # noqa: E402
+
+USER_TURN = "Bonjour, nous cherchons à automatiser le tri de nos demandes clients. Quel serait le délai et le budget pour une intégration avec notre CRM ?"
+ASSISTANT_TURN = "Merci pour ces précisions ! Pour une intégration CRM avec classification automatique, comptez généralement 4 à 6 semaines. Quel volume de demandes traitez-vous chaque mois ?"
+
+
+def make_signal(history: int) -> SignalPondere:
+    return SignalPondere(
+        type=SignalType.LEAD_MESSAGE_RECEIVED,
+        source=CortexId.SENSORIEL,
+        payload={
+            "session_id": "session-1234567890",
+            "message": USER_TURN,
+            "prospect_info": {
+                "name": "Marie Dupont",
+                "email": "marie.dupont@example.com",
+                "company": "Logistique Express SAS",
+                "phone": "+33 6 12 34 56 78",
+                "language": "fr"
+            },
+            "conversation_history": [
+                {"role": "user" if i % 2 == 0 else "assistant", "content": USER_TURN if i % 2 == 0 else ASSISTANT_TURN}
+                for i in range(history)
+            ],
+            "language": "fr",
+            "message_count": history + 1
+        }
+    )
+
+
+def legacy_encode(signal):
+    return json.dumps(signal.model_dump()).encode("utf-8")
+
+
+def legacy_decode(data, headers=None):
+    return json.loads(data.decode("utf-8"))
+
+
+def timed_us(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 10, 50, 200])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    codecs = [("legacy json", legacy_encode, legacy_decode, None)]
+    json_codec = SignalCodec("json")
+    label = "codec json" + ("" if codec_module.orjson else " (stdlib)")
+    codecs.append((label, json_codec.encode, json_codec.decode, json_codec.headers))
+    if codec_module.msgpack is not None:
+        msgpack_codec = SignalCodec("msgpack")
+        codecs.append(("codec msgpack", msgpack_codec.encode, msgpack_codec.decode, msgpack_codec.headers))
+    else:
+        print("(msgpack non installé: format binaire ignoré)")
+
+    print(f"{'history':>8} {'codec':<20} {'bytes':>8} {'encode µs':>10} {'decode µs':>10} {'speedup':>8}")
+    for history in args.history:
+        signal = make_signal(history)
+        baseline = None
+        for name, encode, decode, headers in codecs:
+            data = encode(signal)
+            assert decode(data, headers)["payload"]["message_count"] == history + 1
+            encode_us = timed_us(lambda: encode(signal), args.iterations)
+            decode_us = timed_us(lambda: decode(data, headers), args.iterations)
+            total = encode_us + decode_us
+            baseline = baseline or total
+            print(f"{history:>8} {name:<20} {len(data):>8} {encode_us:>10.1f} {decode_us:>10.1f} {baseline / total:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
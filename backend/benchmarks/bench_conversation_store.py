@@ -0,0 +1,118 @@
+"""
+Benchmark stockage des conversations - chaîne JSON vs liste Redis
+
+Compare, pour un tour de conversation complet (message utilisateur,
+lecture de l'historique, réponse assistant), l'ancien format
+(GET + SETEX de tout l'historique, relu à chaque fois) et le format liste
+de `ConversationStateManager` (script Lua, un aller-retour par ajout).
+
+Usage (Redis démarré via docker-compose):
+    python benchmarks/bench_conversation_store.py --history 10 50 200 --turns 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import redis.asyncio as redis
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(BACKEND_DIR), str(BACKEND_DIR / "cortex-nlp")]
+from src.main import ConversationStateManager  # noqa: E402
+
+
+class LegacyJsonStore:
+    """Ancienne implémentation: historique sérialisé en une chaîne JSON"""
+
+    def __init__(self, client: redis.Redis, ttl: int = 3600):
+        self.redis = client
+        self.ttl = ttl
+
+    async def get_conversation(self, session_id):
+        data = await self.redis.get(f"conversation:{session_id}")
+        return json.loads(data) if data else []
+
+    async def add_message(self, session_id, role, content):
+        history = await self.get_conversation(session_id)
+        history.append({"role": role, "content": content})
+        await self.redis.setex(f"conversation:{session_id}", self.ttl, json.dumps(history))
+
+    async def turn(self, session_id, prospect_info, message, reply):
+        await self.redis.setex(f"prospect:{session_id}", self.ttl, json.dumps(prospect_info))
+        await self.add_message(session_id, "user", message)
+        history = await self.get_conversation(session_id)
+        await self.add_message(session_id, "assistant", reply)
+        return history
+
+
+class ListStore:
+    """Nouvelle implémentation: liste Redis, ajout + lecture en un appel"""
+
+    def __init__(self, client: redis.Redis, max_messages: int):
+        self.manager = ConversationStateManager(client, max_messages=max_messages)
+
+    async def turn(self, session_id, prospect_info, message, reply):
+        history = await self.manager.add_message(session_id, "user", message, prospect_info=prospect_info)
+        await self.manager.add_message(session_id, "assistant", reply, window=0)
+        return history
+
+
+MESSAGE = "Nous cherchons à automatiser la qualification de nos leads entrants, quel serait le délai ?"
+REPLY = ("Excellente question ! Pour une automatisation de ce type, nous prévoyons généralement "
+         "une phase de cadrage de deux semaines, puis un développement itératif. " * 3)
+PROSPECT = {"name": "Awa", "email": "awa@example.com", "company": "Acme", "phone": None}
+
+
+async def seed(client: redis.Redis, store, session_id: str, history: int):
+    """Pré-remplit une session avec `history` messages"""
+    for _ in range(history // 2):
+        await store.turn(session_id, PROSPECT, MESSAGE, REPLY)
+
+
+async def measure(client, store, history: int, turns: int):
+    session_id = f"bench-{uuid.uuid4()}"
+    await seed(client, store, session_id, history)
+    latencies = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        await store.turn(session_id, PROSPECT, MESSAGE, REPLY)
+        latencies.append(time.perf_counter() - started)
+        # Garder une taille d'historique stable pour le format chaîne
+        if isinstance(store, LegacyJsonStore):
+            data = json.loads(await client.get(f"conversation:{session_id}"))
+            await client.setex(f"conversation:{session_id}", 3600, json.dumps(data[-history:]))
+    await client.delete(f"conversation:{session_id}", f"prospect:{session_id}")
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379"))
+    parser.add_argument("--history", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    client = redis.from_url(args.redis_url)
+    try:
+        print(f"{'layout':<8} {'history':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+        for history in args.history:
+            for name, store in (("json", LegacyJsonStore(client)), ("list", ListStore(client, history))):
+                r = await measure(client, store, history, args.turns)
+                print(f"{name:<8} {history:>8} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['mean_ms']:>8.2f}")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark protocole delta - octets par message chat vers Kafka
+
+Simule une conversation de `--turns` échanges (message utilisateur, réponse
+de l'assistant) et compare, pour chaque message, le signal
+LEAD_MESSAGE_RECEIVED construit par cortex-sensoriel avec l'historique
+complet (`conversation_history`, taille croissante) et en protocole delta
+(`seq`, message seul): taille encodée, total sur la conversation et coût de
+construction + sérialisation. Aucune infrastructure requise.
+
+Usage:
+    python benchmarks/bench_delta.py --turns 40 --user-chars 160 --assistant-chars 600
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND / "cortex-sensoriel"))
+
+PROSPECT = {"name": "Marie Dupont", "email": "marie@example.com", "company": "Logistique Express SAS"}
+
+
+def text(chars: int, turn: int) -> str:
+    words = f"message {turn} sur les délais de livraison et l'intégration du CRM ".split()
+    out = []
+    while sum(len(w) + 1 for w in out) < chars:
+        out.append(words[len(out) % len(words)])
+    return " ".join(out)[:chars]
+
+
+def requests(args):
+    from src.main import ChatRequest
+
+    history = []
+    full, delta = [], []
+    for turn in range(1, args.turns + 1):
+        message = text(args.user_chars, turn)
+        common = {"session_id": "session-1234567890", "message": message, "prospect_info": PROSPECT}
+        full.append(ChatRequest(**common, conversation_history=list(history)))
+        delta.append(ChatRequest(**common, seq=turn))
+        history.append({"role": "user", "content": message})
+        history.append({"role": "assistant", "content": text(args.assistant_chars, turn)})
+    return full, delta
+
+
+def measure(chat_signal, codec, batch, repeat: int):
+    sizes = [len(codec.encode(chat_signal(request))) for request in batch]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for request in batch:
+            codec.encode(chat_signal(request))
+    elapsed = (time.perf_counter() - started) / (repeat * len(batch)) * 1e6
+    return sizes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40, help="Messages utilisateur dans la conversation")
+    parser.add_argument("--user-chars", type=int, default=160)
+    parser.add_argument("--assistant-chars", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    from src.main import chat_signal, codec
+
+    full, delta = requests(args)
+    full_sizes, full_us = measure(chat_signal, codec, full, args.repeat)
+    delta_sizes, delta_us = measure(chat_signal, codec, delta, args.repeat)
+
+    print(f"conversation of {args.turns} turns, user {args.user_chars} chars, assistant {args.assistant_chars} chars")
+    print(f"{'message':>8} {'full (B)':>10} {'delta (B)':>10} {'ratio':>7}")
+    for turn in sorted({1, 2, 5, 10, 20, 40, args.turns} & set(range(1, args.turns + 1))):
+        f, d = full_sizes[turn - 1], delta_sizes[turn - 1]
+        print(f"{turn:>8} {f:>10,} {d:>10,} {f / d:>6.1f}x")
+    print()
+    total_full, total_delta = sum(full_sizes), sum(delta_sizes)
+    print(f"{'':<24} {'full':>12} {'delta':>12}")
+    print(f"{'bytes per message (mean)':<24} {total_full / len(full):>12,.0f} {total_delta / len(delta):>12,.0f}")
+    print(f"{'bytes per conversation':<24} {total_full:>12,} {total_delta:>12,}")
+    print(f"{'build + encode (µs/msg)':<24} {full_us:>12.1f} {delta_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
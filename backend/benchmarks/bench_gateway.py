@@ -0,0 +1,134 @@
+"""
+Benchmark passerelle LLM - pool de connexions, préchauffage et choix de l'endpoint
+
+Des passerelles simulées (uvicorn sur 127.0.0.1, latence fixe par endpoint
+plus un délai d'établissement de connexion `--connect-delay` qui tient lieu
+de poignée de main TLS) reçoivent des rafales de `--burst` appels
+simultanés. Compare:
+
+- pool: client httpx par défaut (froid) vs `create_http_client` préchauffé
+  (`prewarm`), latence de la première rafale après démarrage
+- routage: une seule URL (la plus lente) vs `EndpointSelector` sur toutes
+  les URLs, latence moyenne et répartition des appels
+
+Usage:
+    python benchmarks/bench_gateway.py --latencies 0.2,0.5 --burst 16 --rounds 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND / "cortex-nlp"))
+from src.gateway import EndpointSelector, create_http_client, prewarm  # noqa: E402
+
+
+def gateway(latency: float, connect_delay: float):
+    """Application ASGI: `connect_delay` au premier appel de chaque connexion, puis `latency`"""
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        connection = (scope.get("client") or ("", 0))[1]
+        if connection not in seen:
+            seen.add(connection)
+            await asyncio.sleep(connect_delay)
+        if scope["method"] != "HEAD":
+            await asyncio.sleep(latency)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"choices":[{"message":{"content":"ok"}}]}'})
+
+    seen = set()
+    return app
+
+
+async def burst(client: httpx.AsyncClient, pick, size: int):
+    async def one():
+        started = time.perf_counter()
+        with pick() as call:
+            response = await client.post(call.url, json={"stream": False})
+            response.raise_for_status()
+        return call.url, time.perf_counter() - started
+
+    return await asyncio.gather(*(one() for _ in range(size)))
+
+
+def fixed(url: str):
+    """Équivalent de `EndpointSelector.call` pour une URL unique sans suivi"""
+    class Call:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    call = Call()
+    call.url = url
+    return lambda: call
+
+
+def report(label: str, results):
+    latencies = sorted(seconds for _, seconds in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<34} {statistics.mean(latencies) * 1000:>9.1f} {p95 * 1000:>9.1f} {latencies[-1] * 1000:>9.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencies", default="0.2,0.5", help="Latence de chaque passerelle simulée (s)")
+    parser.add_argument("--connect-delay", type=float, default=0.1, help="Coût d'une nouvelle connexion (s)")
+    parser.add_argument("--burst", type=int, default=16, help="Appels simultanés par rafale")
+    parser.add_argument("--rounds", type=int, default=20, help="Rafales pour la comparaison du routage")
+    parser.add_argument("--port", type=int, default=18400)
+    args = parser.parse_args()
+
+    latencies = [float(l) for l in args.latencies.split(",")]
+    servers, urls = [], []
+    for i, latency in enumerate(latencies):
+        port = args.port + i
+        server = uvicorn.Server(uvicorn.Config(gateway(latency, args.connect_delay), port=port, log_level="error"))
+        servers.append((server, asyncio.create_task(server.serve())))
+        urls.append(f"http://127.0.0.1:{port}/v1/chat/completions")
+    while not all(server.started for server, _ in servers):
+        await asyncio.sleep(0.05)
+
+    slowest = urls[latencies.index(max(latencies))]
+    print(f"gateways {args.latencies} s, connect {args.connect_delay * 1000:.0f} ms, burst {args.burst}")
+    print(f"{'':<34} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}")
+
+    # Première rafale: pool froid par défaut vs pool dimensionné et préchauffé
+    async with httpx.AsyncClient() as cold:
+        report("cold default pool (first burst)", await burst(cold, fixed(slowest), args.burst))
+    warm = create_http_client(max_connections=args.burst * 2, max_keepalive=args.burst * 2)
+    await prewarm(warm, [slowest], args.burst)
+    report("pre-warmed pool (first burst)", await burst(warm, fixed(slowest), args.burst))
+
+    # Routage: URL unique vs sélection par latence sur toutes les URLs
+    await prewarm(warm, urls, args.burst)
+    single = []
+    for _ in range(args.rounds):
+        single += await burst(warm, fixed(slowest), args.burst)
+    report("single gateway URL", single)
+    selector = EndpointSelector(urls, name="bench")
+    routed = []
+    for _ in range(args.rounds):
+        routed += await burst(warm, selector.call, args.burst)
+    report(f"latency-aware ({len(urls)} URLs)", routed)
+    share = {url: sum(1 for u, _ in routed if u == url) / len(routed) for url in urls}
+    print("share: " + ", ".join(f"{latency}s → {share[url]:.0%}" for url, latency in zip(urls, latencies)))
+
+    await warm.aclose()
+    for server, task in servers:
+        server.should_exit = True
+    await asyncio.gather(*(task for _, task in servers))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
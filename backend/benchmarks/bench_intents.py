@@ -0,0 +1,86 @@
+"""
+Benchmark détection d'intention - boucle de sous-chaînes vs automate
+
+Compare l'ancienne détection (`any(kw in message_lower)` intention par
+intention, arrêt au premier match) et `IntentEngine` (automate
+Aho-Corasick, une passe, toutes intentions scorées), unitaire et par lot,
+pour des lexiques de taille croissante. Aucune infrastructure requise.
+
+Usage:
+    python benchmarks/bench_intents.py --keywords 0 1000 10000 --messages 2000
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "cortex-nlp"))
+from src.intents import INTENT_LEXICONS, IntentEngine  # noqa: E402
+
+SAMPLE_MESSAGES = [
+    "Bonjour, je voudrais connaître le prix d'un chatbot pour notre site",
+    "Quel serait le délai pour une intégration avec notre API interne ?",
+    "Pouvez-vous m'appeler demain matin pour en discuter ?",
+    "Nous sommes une PME de 50 personnes dans la logistique",
+    "Est-ce qu'on peut voir une démonstration avant de s'engager ?",
+    "Our stack is mostly Python and we need it quickly, what's the cost?",
+    "Merci pour ces informations, je reviens vers vous après la réunion",
+]
+
+
+def legacy_detect(lexicons, message):
+    """Ancienne implémentation de `_detect_intent`"""
+    message_lower = message.lower()
+    for intent, keywords in lexicons.items():
+        if any(kw in message_lower for kw in keywords):
+            return intent
+    return "general"
+
+
+def grow_lexicons(extra: int, seed: int = 42):
+    """Lexiques par défaut complétés de `extra` mots-clés synthétiques (absents des messages)"""
+    rng = random.Random(seed)
+    lexicons = {intent: list(keywords) for intent, keywords in INTENT_LEXICONS.items()}
+    intents = list(lexicons)
+    for i in range(extra):
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 12)))
+        lexicons[intents[i % len(intents)]].append(f"{word}{i}")
+    return lexicons
+
+
+def per_message_us(fn, messages):
+    started = time.perf_counter()
+    fn(messages)
+    return (time.perf_counter() - started) / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, nargs="+", default=[0, 1000, 10000],
+                        help="Mots-clés synthétiques ajoutés aux lexiques par défaut")
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    messages = [SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)] for i in range(args.messages)]
+
+    print(f"{'keywords':>9} {'compile ms':>11} {'legacy µs/msg':>14} {'engine µs/msg':>14} {'batch µs/msg':>13}")
+    for extra in args.keywords:
+        lexicons = grow_lexicons(extra)
+        total = sum(len(keywords) for keywords in lexicons.values())
+
+        started = time.perf_counter()
+        engine = IntentEngine(lexicons)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        legacy = per_message_us(lambda ms: [legacy_detect(lexicons, m) for m in ms], messages)
+        single = per_message_us(lambda ms: [engine.detect(m) for m in ms], messages)
+        batch = per_message_us(engine.detect_many, messages)
+
+        print(f"{total:>9} {compile_ms:>11.1f} {legacy:>14.1f} {single:>14.1f} {batch:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
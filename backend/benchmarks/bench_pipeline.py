@@ -0,0 +1,386 @@
+"""
+Test de charge de bout en bout - POST /api/v1/chat → ASSISTANT_RESPONSE
+
+Lance cortex-sensoriel et cortex-nlp dans un même processus contre des
+substituts en mémoire (`standins.py`): broker Kafka, Redis (`fakeredis`,
+scripts Lua via `lupa`) et passerelle LLM à latence configurable. Des
+sessions simulées envoient leurs messages via l'API HTTP de
+cortex-sensoriel (transport ASGI) et attendent la réponse finale poussée
+sur leur WebSocket par le relais de sortie, puis marquent un temps de
+réflexion avant le message suivant.
+
+Étages mesurés (p50/p95/p99):
+- `ingest`: requête POST /api/v1/chat (signal produit)
+- `kafka <topic>`: ajout au topic → remise au consommateur
+- `nlp queue`: réponse HTTP → début du traitement NLP (broker + dispatcher)
+- `nlp processing`: traitement NLP complet (intention, Redis, LLM, acks)
+- `llm`: appel servi par la passerelle simulée
+- `first chunk` / `end to end`: début du POST → premier fragment / réponse
+  finale reçus sur la WebSocket
+
+Avec `--report-workers N`, les rapports de qualification sont générés en
+parallèle (pool de N workers, passerelle simulée distincte de latence
+`--report-latency`) et les prospects ont un téléphone, ce qui les qualifie
+au 5e message: l'effet sur la latence du chat se lit en comparant avec
+une exécution sans rapports (étage `report llm`, compteurs de demandes).
+
+La configuration des services passe par leurs variables d'environnement
+habituelles (NLP_MAX_IN_FLIGHT, LLM_LIMIT_*, SIGNAL_FORMAT...).
+
+Usage:
+    pip install "fakeredis[lua]"
+    python benchmarks/bench_pipeline.py --sessions 200 --messages 5 --rate 100 \\
+        --llm-latency lognormal:0.8:0.4 --llm-inter-chunk const:0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fakeredis  # noqa: E402
+import httpx  # noqa: E402
+
+from standins import FakeLLM, InMemoryBroker, parse_latency  # noqa: E402
+
+USER_MESSAGES = [
+    "Bonjour, je voudrais connaître le prix d'un chatbot pour notre site",
+    "Quel serait le délai pour une intégration avec notre API interne ?",
+    "Nous sommes une PME de 50 personnes dans la logistique",
+    "Est-ce qu'on peut voir une démonstration avant de s'engager ?",
+    "Notre budget est d'environ 20k€, quand pourrait-on commencer ?",
+    "Pouvez-vous m'appeler demain matin pour en discuter ?",
+    "Merci pour ces informations, je reviens vers vous après la réunion",
+]
+
+
+# ============================================
+# CHARGEMENT DES SERVICES
+# ============================================
+
+def load_service(name: str) -> Dict[str, Any]:
+    """
+    Importe le paquet `src` d'un service et retourne ses modules.
+
+    Les deux services nomment leur paquet `src`: il est retiré de
+    `sys.modules` après import, les modules chargés restant utilisables.
+    """
+    root = str(BACKEND / name)
+    sys.path.insert(0, root)
+    try:
+        importlib.import_module("src.main")
+        return {
+            module_name.split(".", 1)[1]: module
+            for module_name, module in sys.modules.items()
+            if module_name.startswith("src.")
+        }
+    finally:
+        sys.path.remove(root)
+        for module_name in [m for m in sys.modules if m == "src" or m.startswith("src.")]:
+            del sys.modules[module_name]
+
+
+# ============================================
+# MESURES
+# ============================================
+
+class Tracker:
+    """Horodate chaque message (par correlation_id) le long du pipeline"""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.accepted_at: Dict[str, float] = {}
+        self.started_at: Dict[str, float] = {}
+        self.first_chunk: Dict[str, float] = {}
+        self.done: Dict[str, asyncio.Future] = {}
+        self.outcomes: Dict[str, int] = defaultdict(int)
+
+    def expect(self, correlation_id: str, started: float, accepted: float):
+        self.started_at[correlation_id] = started
+        self.accepted_at[correlation_id] = accepted
+        self.stages["ingest"].append(accepted - started)
+        return self.done.setdefault(correlation_id, asyncio.get_running_loop().create_future())
+
+    def on_output(self, message: Dict[str, Any]):
+        """Signal poussé sur une WebSocket par le relais de sortie"""
+        signal = message.get("signal") or {}
+        correlation_id = signal.get("correlation_id")
+        started = self.started_at.get(correlation_id)
+        if started is None:
+            return
+        now = time.perf_counter()
+        signal_type = signal.get("type", "")
+        if signal_type == "ASSISTANT_RESPONSE":
+            if correlation_id not in self.first_chunk:
+                self.first_chunk[correlation_id] = now
+                self.stages["first chunk"].append(now - started)
+            if (signal.get("payload") or {}).get("final"):
+                self.stages["end to end"].append(now - started)
+                self._finish(correlation_id, "completed")
+        elif signal_type.startswith("ERROR_"):
+            self._finish(correlation_id, signal_type.lower())
+
+    def _finish(self, correlation_id: str, outcome: str):
+        done = self.done.get(correlation_id)
+        if done is not None and not done.done():
+            self.outcomes[outcome] += 1
+            done.set_result(outcome)
+
+    def wrap_dispatch(self, dispatch):
+        """Instrumente `dispatch_signal` de cortex-nlp (attente et durée de traitement)"""
+        async def dispatch_signal(processor, deduplicator, signal):
+            correlation_id = signal.get("correlation_id")
+            started = time.perf_counter()
+            accepted = self.accepted_at.get(correlation_id)
+            if accepted is not None:
+                self.stages["nlp queue"].append(started - accepted)
+            try:
+                return await dispatch(processor, deduplicator, signal)
+            finally:
+                self.stages["nlp processing"].append(time.perf_counter() - started)
+        return dispatch_signal
+
+
+class RecordingSocket:
+    """WebSocket simulée: transmet au tracker ce que le relais lui pousse"""
+
+    def __init__(self, tracker: Tracker):
+        self.tracker = tracker
+
+    async def send_json(self, message: Dict[str, Any]):
+        self.tracker.on_output(message)
+
+
+class Pacer:
+    """Espace les envois pour ne pas dépasser `rate` messages/s (0 = illimité)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+# ============================================
+# SCÉNARIO
+# ============================================
+
+async def run_session(
+    client: httpx.AsyncClient,
+    tracker: Tracker,
+    pacer: Pacer,
+    session_id: str,
+    args: argparse.Namespace,
+    rng: random.Random
+):
+    history = []
+    prospect = {"name": f"Prospect {session_id}", "email": f"{session_id}@example.com", "company": "ACME"}
+    if args.report_workers:
+        prospect["phone"] = "+33 1 23 45 67 89"
+    for turn in range(args.messages):
+        message = USER_MESSAGES[(turn + rng.randrange(len(USER_MESSAGES))) % len(USER_MESSAGES)]
+        await pacer.wait()
+        started = time.perf_counter()
+        response = await client.post("/api/v1/chat", json={
+            "session_id": session_id,
+            "message": message,
+            "prospect_info": prospect,
+            "conversation_history": history,
+            "language": "fr"
+        })
+        if response.status_code != 200:
+            tracker.outcomes[f"http {response.status_code}"] += 1
+            continue
+        done = tracker.expect(response.json()["correlation_id"], started, time.perf_counter())
+        try:
+            await asyncio.wait_for(asyncio.shield(done), args.timeout)
+        except asyncio.TimeoutError:
+            tracker.outcomes["timeout"] += 1
+        history += [{"role": "user", "content": message}, {"role": "assistant", "content": "..."}]
+        if args.think_ms:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+
+async def stop_tasks(tasks: List[asyncio.Task]):
+    """
+    Annule les tâches des services. Sous Python < 3.12, `asyncio.wait_for`
+    peut avaler une annulation qui coïncide avec la fin de l'attente (envoi
+    WebSocket du relais): l'annulation est renouvelée jusqu'à l'arrêt.
+    """
+    pending = set(tasks)
+    while pending:
+        for task in pending:
+            task.cancel()
+        _, pending = await asyncio.wait(pending, timeout=0.5)
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    os.environ["LLM_STREAMING"] = "true" if args.streaming else "false"
+    nlp_modules = load_service("cortex-nlp")
+    sensoriel_modules = load_service("cortex-sensoriel")
+    nlp, sensoriel = nlp_modules["main"], sensoriel_modules["main"]
+
+    ack_latency = parse_latency(args.broker_ack) if args.broker_ack else None
+    broker = InMemoryBroker(partitions=args.partitions, ack_latency=ack_latency)
+    llm = FakeLLM(
+        latency=parse_latency(args.llm_latency, random.Random(args.seed)),
+        first_token=parse_latency(args.llm_first_token, random.Random(args.seed + 1)) if args.llm_first_token else None,
+        inter_chunk=parse_latency(args.llm_inter_chunk, random.Random(args.seed + 2)),
+        chunks=args.llm_chunks,
+        error_rate=args.llm_error_rate,
+        seed=args.seed
+    )
+    tracker = Tracker()
+    redis_client = fakeredis.FakeAsyncRedis()
+
+    # cortex-nlp: consommateur, producteur, Redis et passerelle LLM substitués
+    nlp.AIOKafkaConsumer = broker.consumer
+    nlp.dispatch_signal = tracker.wrap_dispatch(nlp.dispatch_signal)
+    llm_http = httpx.AsyncClient(transport=llm.transport)
+    processor = nlp.MessageProcessor(
+        nlp.LLMClient(llm_http, "bench", "http://fake-llm/v1/chat/completions"),
+        nlp.create_state_manager(redis_client),
+        broker.producer()
+    )
+    deduplicator = nlp.SignalDeduplicator(redis_client)
+
+    # Rapports: pool de workers et passerelle simulée dédiés
+    reports, report_llm, report_http = None, None, None
+    if args.report_workers:
+        report_llm = FakeLLM(latency=parse_latency(args.report_latency, random.Random(args.seed + 3)), seed=args.seed + 3)
+        report_http = httpx.AsyncClient(transport=report_llm.transport)
+        report_client = nlp.LLMClient(report_http, "bench", "http://fake-llm/v1/chat/completions")
+        reports = nlp.ReportWorker(
+            lambda job: nlp.generate_report(report_client, job),
+            lambda job, report, cached: nlp.emit_report(processor, job, report, cached),
+            workers=args.report_workers
+        )
+
+    # cortex-sensoriel: producteur et relais de sortie substitués, WebSockets simulées
+    sensoriel.producer = broker.producer()
+    sensoriel_modules["output_relay"].AIOKafkaConsumer = broker.consumer
+    socket = RecordingSocket(tracker)
+    session_ids = [f"bench-{i:05d}" for i in range(args.sessions)]
+    for session_id in session_ids:
+        sensoriel.ws_manager.active_connections[session_id] = socket
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+        tasks = [
+            asyncio.create_task(nlp.consume_messages(processor, deduplicator)),
+            asyncio.create_task(sensoriel.output_relay.run())
+        ]
+        if reports is not None:
+            reports.start()
+            tasks.append(asyncio.create_task(nlp.consume_qualifications(processor, reports)))
+        while len(broker.consumers) < len(tasks):
+            await asyncio.sleep(0.01)
+
+        rng = random.Random(args.seed)
+        pacer = Pacer(args.rate)
+        transport = httpx.ASGITransport(app=sensoriel.app)
+        started = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url="http://cortex-sensoriel") as client:
+            await asyncio.gather(*(
+                run_session(client, tracker, pacer, session_id, args, rng)
+                for session_id in session_ids
+            ))
+        elapsed = time.perf_counter() - started
+
+        await stop_tasks(tasks)
+        if reports is not None:
+            await reports.stop()
+            await report_http.aclose()
+        await llm_http.aclose()
+        await redis_client.aclose()
+
+    for topic, lags in broker.delivery_lag.items():
+        tracker.stages[f"kafka {topic}"] = lags
+    tracker.stages["llm"] = llm.served
+    report_requests = {}
+    if report_llm:
+        tracker.stages["report llm"] = report_llm.served
+        for sample in nlp_modules["reports"].REPORT_REQUESTS.collect()[0].samples:
+            if sample.name.endswith("_total"):
+                report_requests[sample.labels["status"]] = int(sample.value)
+    return {"elapsed": elapsed, "tracker": tracker, "llm": llm, "broker": broker, "reports": report_requests}
+
+
+def report(args: argparse.Namespace, result: Dict[str, Any]):
+    tracker, llm, elapsed = result["tracker"], result["llm"], result["elapsed"]
+    sent = sum(tracker.outcomes.values())
+    completed = tracker.outcomes.get("completed", 0)
+
+    print(f"sessions={args.sessions} messages/session={args.messages} rate={args.rate or 'unbounded'}/s "
+          f"streaming={args.streaming} llm={args.llm_latency}")
+    print(f"elapsed {elapsed:.1f}s, {sent} messages, {completed} completed "
+          f"({completed / elapsed:.1f} msg/s), llm calls {llm.requests} (peak in-flight {llm.max_in_flight})")
+    if result["reports"]:
+        print("report requests: " + ", ".join(f"{k}={v}" for k, v in sorted(result["reports"].items())))
+    failures = {k: v for k, v in tracker.outcomes.items() if k != "completed"}
+    if failures:
+        print("failures: " + ", ".join(f"{k}={v}" for k, v in sorted(failures.items())))
+    print()
+    print(f"{'stage':<36} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    order = ["ingest", "nlp queue", "nlp processing", "llm", "first chunk", "end to end"]
+    stages = sorted(tracker.stages, key=lambda s: (order.index(s) if s in order else 1.5, s))
+    for stage in stages:
+        values = sorted(tracker.stages[stage])
+        if not values:
+            continue
+        p50, p95, p99 = (percentile(values, q) * 1000 for q in (0.50, 0.95, 0.99))
+        print(f"{stage:<36} {len(values):>7} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {values[-1] * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="Sessions simulées en parallèle")
+    parser.add_argument("--messages", type=int, default=4, help="Messages envoyés par session")
+    parser.add_argument("--rate", type=float, default=0, help="Débit max d'envoi, tous messages confondus (msg/s, 0 = illimité)")
+    parser.add_argument("--think-ms", type=float, default=0, help="Temps de réflexion moyen entre deux messages d'une session")
+    parser.add_argument("--timeout", type=float, default=60, help="Attente max de la réponse finale (s)")
+    parser.add_argument("--streaming", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--llm-latency", default="lognormal:0.8:0.4",
+                        help="Latence LLM hors streaming (const:S, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA, exp:MEAN)")
+    parser.add_argument("--llm-first-token", default=None, help="Délai du premier fragment en streaming (défaut: --llm-latency)")
+    parser.add_argument("--llm-inter-chunk", default="const:0.02", help="Délai entre fragments en streaming")
+    parser.add_argument("--llm-chunks", type=int, default=20)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--report-workers", type=int, default=0, help="Workers de rapports de qualification (0 = sans rapports)")
+    parser.add_argument("--report-latency", default="lognormal:10:0.3", help="Latence de génération d'un rapport")
+    parser.add_argument("--broker-ack", default=None, help="Latence d'ack du broker simulé (ex: const:0.002)")
+    parser.add_argument("--partitions", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="Affiche les logs des services")
+    args = parser.parse_args()
+
+    report(args, asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark producteur Kafka - mode "sync" vs mode "batched"
+
+Reproduit le chemin d'émission des cortices:
+- sync: chaque signal attend son ack (`send_and_wait`), comme une requête
+  HTTP qui attend le broker; les envois concurrents sont lancés au débit cible
+- batched: mise en file (`send`) avec linger/batch/compression, ack rapporté
+  par callback
+
+Usage (broker démarré via docker-compose):
+    python benchmarks/bench_producer.py --rates 1000 2500 5000 10000 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+
+from aiokafka import AIOKafkaProducer
+
+
+def build_signal(i: int) -> dict:
+    """Signal LEAD_MESSAGE_RECEIVED réaliste"""
+    session_id = f"bench-{i % 500}"
+    return {
+        "id": str(uuid.uuid4()),
+        "type": "LEAD_MESSAGE_RECEIVED",
+        "source": "cortex-sensoriel",
+        "timestamp": int(time.time() * 1000),
+        "payload": {
+            "session_id": session_id,
+            "message": "Bonjour, combien coûte une intégration IA pour notre CRM ?",
+            "prospect_info": {"name": "Awa", "email": "awa@example.com", "company": "Acme", "phone": None},
+            "conversation_history": [],
+            "language": "fr",
+            "message_count": 1
+        },
+        "confiance": 1.0,
+        "ttl": 60000,
+        "correlation_id": str(uuid.uuid4()),
+        "metadata": {"version": "1.0.0", "priority": "NORMAL"}
+    }
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(mode: str, rate: int, args) -> dict:
+    batched = mode == "batched"
+    producer = AIOKafkaProducer(
+        bootstrap_servers=args.bootstrap,
+        linger_ms=args.linger_ms if batched else 0,
+        max_batch_size=args.batch_size if batched else 16384,
+        compression_type=args.compression if batched else None,
+    )
+    await producer.start()
+
+    latencies = []
+    failures = 0
+    pending = set()
+
+    def on_delivery(started: float, fut: asyncio.Future):
+        nonlocal failures
+        if fut.cancelled() or fut.exception() is not None:
+            failures += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+
+    async def send_sync(i: int):
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            await producer.send_and_wait(args.topic, json.dumps(build_signal(i)).encode(), key=f"bench-{i % 500}".encode())
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            failures += 1
+
+    total = rate * args.duration
+    tick = 0.01
+    per_tick = max(1, int(rate * tick))
+    started = time.perf_counter()
+    sent = 0
+    try:
+        while sent < total:
+            for _ in range(min(per_tick, total - sent)):
+                if batched:
+                    t0 = time.perf_counter()
+                    fut = await producer.send(args.topic, json.dumps(build_signal(sent)).encode(), key=f"bench-{sent % 500}".encode())
+                    fut.add_done_callback(lambda f, t0=t0: on_delivery(t0, f))
+                    pending.add(fut)
+                    fut.add_done_callback(pending.discard)
+                else:
+                    task = asyncio.create_task(send_sync(sent))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                sent += 1
+            # Cadence: rattraper le retard sans dépasser le débit cible
+            target = started + sent / rate
+            delay = target - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await asyncio.gather(*pending, return_exceptions=True)
+    finally:
+        await producer.stop()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "rate": rate,
+        "delivered": len(latencies),
+        "failures": failures,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": (statistics.fmean(latencies) * 1000) if latencies else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bootstrap", default=os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092"))
+    parser.add_argument("--topic", default="signals.bench")
+    parser.add_argument("--rates", type=int, nargs="+", default=[1000, 2500, 5000, 10000])
+    parser.add_argument("--duration", type=int, default=10, help="Durée par palier (s)")
+    parser.add_argument("--linger-ms", type=int, default=int(os.getenv("KAFKA_LINGER_MS", "5")))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("KAFKA_MAX_BATCH_SIZE", "65536")))
+    parser.add_argument("--compression", default=os.getenv("KAFKA_COMPRESSION") or None)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'target/s':>9} {'achieved/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'fail':>6}")
+    for rate in args.rates:
+        for mode in ("sync", "batched"):
+            r = await run(mode, rate, args)
+            print(f"{r['mode']:<8} {r['rate']:>9} {r['throughput']:>11.0f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['failures']:>6}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
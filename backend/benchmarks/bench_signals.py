@@ -0,0 +1,94 @@
+"""
+Benchmark construction des signaux - signaux construits par seconde
+
+Compare l'ancien modèle local des services (validation Pydantic, deux
+`uuid.uuid4()` et `datetime.now()` par signal), le modèle partagé
+`shared.types.SignalPondere` validé, et son chemin de confiance
+`SignalPondere.trusted` (sans validation, identifiants UUIDv7).
+Aucune infrastructure requise.
+
+Usage:
+    python benchmarks/bench_signals.py --signals 200000
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from shared.types import CortexId, SignalMetadata, SignalPondere, SignalType  # noqa: E402
+
+
+class LegacySignalMetadata(BaseModel):
+    version: str = "1.0.0"
+    priority: str = "NORMAL"
+    trace_id: Optional[str] = None
+    span_id: Optional[str] = None
+
+
+class LegacySignalPondere(BaseModel):
+    """Ancien modèle de cortex-nlp"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str
+    source: str = "cortex-nlp"
+    timestamp: int = Field(default_factory=lambda: int(datetime.now().timestamp() * 1000))
+    payload: Dict[str, Any]
+    confiance: float = Field(ge=0.0, le=1.0, default=1.0)
+    ttl: int = 60000
+    correlation_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    metadata: LegacySignalMetadata = Field(default_factory=LegacySignalMetadata)
+
+
+def payload() -> Dict[str, Any]:
+    return {"session_id": "session-1234567890", "chunk": "Bonjour ! ", "sequence": 3, "final": False}
+
+
+BUILDERS = {
+    "legacy (validated)": lambda: LegacySignalPondere(
+        type="ASSISTANT_RESPONSE",
+        payload=payload(),
+        confiance=0.9,
+        metadata=LegacySignalMetadata(priority="NORMAL")
+    ),
+    "shared (validated)": lambda: SignalPondere(
+        type=SignalType.ASSISTANT_RESPONSE,
+        source=CortexId.NLP,
+        payload=payload(),
+        confiance=0.9,
+        metadata=SignalMetadata(priority="NORMAL")
+    ),
+    "shared trusted": lambda: SignalPondere.trusted(
+        type=SignalType.ASSISTANT_RESPONSE,
+        source=CortexId.NLP,
+        payload=payload(),
+        confiance=0.9,
+        priority="NORMAL"
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signals", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'model':<20} {'signals/s':>12} {'µs/signal':>10} {'speedup':>8}")
+    baseline = None
+    for name, build in BUILDERS.items():
+        started = time.perf_counter()
+        for _ in range(args.signals):
+            build()
+        elapsed = time.perf_counter() - started
+        rate = args.signals / elapsed
+        baseline = baseline or rate
+        print(f"{name:<20} {rate:>12,.0f} {elapsed / args.signals * 1e6:>10.2f} {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
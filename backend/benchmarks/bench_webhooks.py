@@ -0,0 +1,160 @@
+"""
+Benchmark webhooks - vérification de signature et absorption de rafales
+
+1. Vérification HMAC-SHA256: `hmac.new(secret, ...)` à chaque appel vs clé
+   préparée une fois (état copié), et `WebhookSource.verify` complet
+   (lecture des en-têtes, contrôle de l'horodatage)
+2. Rafale: `--burst` appels sur POST /api/v1/webhooks/{source} de
+   cortex-sensoriel, arrivant à `--rate` appels/s (0 = dos à dos), via le
+   transport ASGI et le broker en mémoire de `standins.py` avec latence
+   d'ack: débit d'acquittement, 429 et attente des signaux dans le tampon
+   jusqu'à l'ack Kafka. Aucune infrastructure requise.
+
+Le transport ASGI ne rend jamais la main pendant une requête: la boucle de
+lancement cède après chaque appel, comme le ferait la lecture réseau d'un
+serveur, pour que la tâche de vidage du tampon s'intercale.
+
+Usage:
+    python benchmarks/bench_webhooks.py --burst 5000 --rate 2000 --buffer 2000 --ack-latency const:0.005
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND / "cortex-sensoriel"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+SECRET = "bench-secret"
+
+
+def make_body(i: int) -> bytes:
+    return json.dumps({
+        "type": "lead.created",
+        "id": f"evt-{i}",
+        "data": {"email": f"lead{i}@example.com", "name": "Marie Dupont", "company": "Logistique Express SAS"}
+    }).encode("utf-8")
+
+
+def sign(body: bytes, timestamp: str) -> str:
+    return hmac.new(SECRET.encode("utf-8"), timestamp.encode("ascii") + b"." + body, hashlib.sha256).hexdigest()
+
+
+def bench_verify(iterations: int):
+    from src.webhooks import WebhookSource
+
+    source = WebhookSource("bench", [SECRET])
+    body = make_body(0)
+    timestamp = str(int(time.time()))
+    headers = {"x-signature": f"sha256={sign(body, timestamp)}", "x-webhook-timestamp": timestamp}
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        hmac.compare_digest(sign(body, timestamp), headers["x-signature"][7:])
+    naive = (time.perf_counter() - started) / iterations * 1e6
+
+    base = hmac.new(SECRET.encode("utf-8"), digestmod=hashlib.sha256)
+    signed = timestamp.encode("ascii") + b"." + body
+    started = time.perf_counter()
+    for _ in range(iterations):
+        mac = base.copy()
+        mac.update(signed)
+        hmac.compare_digest(mac.hexdigest(), headers["x-signature"][7:])
+    prepared = (time.perf_counter() - started) / iterations * 1e6
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        source.verify(headers, body)
+    full = (time.perf_counter() - started) / iterations * 1e6
+
+    print(f"{'verification':<32} {'µs/call':>8}")
+    print(f"{'hmac.new per call':<32} {naive:>8.2f}")
+    print(f"{'prepared key (copy)':<32} {prepared:>8.2f}")
+    print(f"{'WebhookSource.verify (full)':<32} {full:>8.2f}")
+    print()
+
+
+async def bench_burst(args):
+    import httpx
+    from standins import InMemoryBroker, parse_latency
+
+    import src.main as sensoriel
+    from src.webhooks import WEBHOOK_BUFFER_WAIT
+
+    broker = InMemoryBroker(partitions=3, ack_latency=parse_latency(args.ack_latency))
+    sensoriel.producer = broker.producer()
+    flusher = asyncio.create_task(sensoriel.webhook_buffer.run())
+
+    timestamp = str(int(time.time()))
+    requests = []
+    for i in range(args.burst):
+        body = make_body(i)
+        requests.append((body, {"x-signature": f"sha256={sign(body, timestamp)}", "x-webhook-timestamp": timestamp}))
+
+    statuses = {}
+    latencies = []
+    transport = httpx.ASGITransport(app=sensoriel.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://cortex-sensoriel") as client:
+        async def call(body, headers):
+            started = time.perf_counter()
+            response = await client.post("/api/v1/webhooks/bench", content=body, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        interval = 1 / args.rate if args.rate > 0 else 0
+        calls = []
+        started = time.perf_counter()
+        for i, (body, headers) in enumerate(requests):
+            calls.append(asyncio.create_task(call(body, headers)))
+            delay = started + (i + 1) * interval - time.perf_counter()
+            await asyncio.sleep(max(delay, 0))
+        await asyncio.gather(*calls)
+        acked = time.perf_counter() - started
+        while len(sensoriel.webhook_buffer):
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        drained = time.perf_counter() - started
+
+    flusher.cancel()
+    latencies.sort()
+    delivered = sum(len(log) for log in broker.logs.values())
+    wait = next(m for m in WEBHOOK_BUFFER_WAIT.collect())
+    wait_sum = next(s.value for s in wait.samples if s.name.endswith("_sum"))
+    wait_count = next(s.value for s in wait.samples if s.name.endswith("_count"))
+
+    print(f"burst {args.burst} calls at {args.rate or 'max'}/s, buffer {args.buffer}, batch {args.batch}, ack latency {args.ack_latency}")
+    print(f"responses: {', '.join(f'{code}={n}' for code, n in sorted(statuses.items()))}")
+    print(f"acknowledged in {acked:.2f}s ({args.burst / acked:,.0f} calls/s), "
+          f"HTTP p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"delivered {delivered} signals to Kafka in {drained:.2f}s, "
+          f"mean buffer wait {wait_sum / max(wait_count, 1) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50_000)
+    parser.add_argument("--burst", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=0, help="Arrivées par seconde (0 = dos à dos)")
+    parser.add_argument("--buffer", type=int, default=10000, help="WEBHOOK_BUFFER_MAX")
+    parser.add_argument("--batch", type=int, default=500, help="WEBHOOK_BATCH_SIZE")
+    parser.add_argument("--ack-latency", default="const:0.005", help="Latence d'ack du broker simulé")
+    args = parser.parse_args()
+
+    os.environ["WEBHOOK_SECRETS"] = f"bench:{SECRET}"
+    os.environ["WEBHOOK_BUFFER_MAX"] = str(args.buffer)
+    os.environ["WEBHOOK_BATCH_SIZE"] = str(args.batch)
+
+    bench_verify(args.iterations)
+    asyncio.run(bench_burst(args))
+
+
+if __name__ == "__main__":
+    main()
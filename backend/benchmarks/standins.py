@@ -0,0 +1,371 @@
+"""
+Substituts en mémoire de l'infrastructure, pour les tests de charge
+
+- `InMemoryBroker`: topics partitionnés, groupes de consommateurs et offsets
+  committés, avec des producteurs / consommateurs exposant le sous-ensemble
+  d'API aiokafka utilisé par les cortices (send, getmany, async for,
+  pause/resume, commit, listener de rebalancing)
+- `FakeLLM`: passerelle compatible OpenAI (réponse complète ou SSE) servie
+  par un `httpx.MockTransport`, avec des distributions de latence
+  configurables
+- Redis: `fakeredis.FakeAsyncRedis` (scripts Lua via `lupa`), voir
+  `bench_pipeline.py`
+
+Chaque substitut mesure son propre étage (délai de livraison par topic,
+latence LLM servie) dans des listes de durées en secondes.
+"""
+
+import asyncio
+import json
+import math
+import random
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+from aiokafka.structs import TopicPartition
+
+# ============================================
+# DISTRIBUTIONS DE LATENCE
+# ============================================
+
+def parse_latency(spec: str, rng: Optional[random.Random] = None) -> Callable[[], float]:
+    """
+    Distribution de latence (secondes) depuis une spécification texte:
+
+    - `const:0.8`
+    - `uniform:0.2:1.5` (min, max)
+    - `lognormal:0.8:0.5` (médiane, sigma)
+    - `exp:0.8` (moyenne)
+    """
+    rng = rng or random.Random()
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(v) for v in args.split(":")] if args else []
+        if kind == "const" and len(values) == 1:
+            return lambda: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda: rng.uniform(values[0], values[1])
+        if kind == "lognormal" and len(values) == 2:
+            mu = math.log(values[0])
+            return lambda: rng.lognormvariate(mu, values[1])
+        if kind == "exp" and len(values) == 1:
+            return lambda: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec: {spec} (expected const:S, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA or exp:MEAN)")
+
+
+# ============================================
+# BROKER KAFKA EN MÉMOIRE
+# ============================================
+
+@dataclass
+class Record:
+    """Enregistrement stocké (attributs lus par les cortices sur un ConsumerRecord)"""
+    topic: str
+    partition: int
+    offset: int
+    timestamp: int
+    key: Optional[bytes]
+    value: bytes
+    headers: Tuple[Tuple[str, bytes], ...]
+    appended_at: float
+
+
+@dataclass
+class RecordMetadata:
+    topic: str
+    partition: int
+    offset: int
+
+
+class InMemoryBroker:
+    """Topics partitionnés en mémoire, partagés par producteurs et consommateurs d'un même processus"""
+
+    def __init__(self, partitions: int = 6, ack_latency: Optional[Callable[[], float]] = None):
+        self.partitions = partitions
+        self.ack_latency = ack_latency
+        self.logs: Dict[TopicPartition, List[Record]] = defaultdict(list)
+        self.committed: Dict[Tuple[str, TopicPartition], int] = {}
+        self.consumers: List["InMemoryConsumer"] = []
+        # Délai append → remise à un consommateur, par topic
+        self.delivery_lag: Dict[str, List[float]] = defaultdict(list)
+        self._appended = asyncio.Event()
+        self._round_robin = 0
+
+    def producer(self, **config) -> "InMemoryProducer":
+        """Remplace `AIOKafkaProducer(...)` (la configuration est ignorée)"""
+        return InMemoryProducer(self)
+
+    def consumer(self, *topics: str, group_id: Optional[str] = None, auto_offset_reset: str = "latest", **config) -> "InMemoryConsumer":
+        """Remplace `AIOKafkaConsumer(...)`"""
+        return InMemoryConsumer(self, topics, group_id, auto_offset_reset)
+
+    def topic_partitions(self, topic: str) -> List[TopicPartition]:
+        return [TopicPartition(topic, p) for p in range(self.partitions)]
+
+    def end_offset(self, tp: TopicPartition) -> int:
+        return len(self.logs[tp])
+
+    def append(self, topic: str, value: bytes, key: Optional[bytes], headers: Sequence[Tuple[str, bytes]], partition: Optional[int]) -> RecordMetadata:
+        if partition is None:
+            if key is not None:
+                partition = zlib.crc32(key) % self.partitions
+            else:
+                partition = self._round_robin % self.partitions
+                self._round_robin += 1
+        tp = TopicPartition(topic, partition)
+        log = self.logs[tp]
+        record = Record(
+            topic=topic,
+            partition=partition,
+            offset=len(log),
+            timestamp=time.time_ns() // 1_000_000,
+            key=key,
+            value=value,
+            headers=tuple(headers or ()),
+            appended_at=time.perf_counter()
+        )
+        log.append(record)
+        # Réveille les consommateurs en attente
+        self._appended.set()
+        self._appended = asyncio.Event()
+        return RecordMetadata(topic, partition, record.offset)
+
+    async def wait_appended(self, timeout: float):
+        # asyncio.wait plutôt que wait_for: sous Python < 3.12, wait_for peut
+        # avaler l'annulation si l'événement survient au même moment
+        waiter = asyncio.ensure_future(self._appended.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            waiter.cancel()
+
+
+class InMemoryProducer:
+    """Sous-ensemble d'`AIOKafkaProducer`: l'ack est immédiat ou retardé de `ack_latency`"""
+
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+        self._sender = object()  # Lu par le health check de cortex-sensoriel
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def send(
+        self,
+        topic: str,
+        value: bytes = None,
+        key: Any = None,
+        partition: Optional[int] = None,
+        headers: Optional[Sequence[Tuple[str, bytes]]] = None,
+        **kwargs
+    ) -> asyncio.Future:
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        metadata = self.broker.append(topic, value, key, headers or (), partition)
+        delivery = asyncio.get_running_loop().create_future()
+        delay = self.broker.ack_latency() if self.broker.ack_latency else 0
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, _resolve, delivery, metadata)
+        else:
+            delivery.set_result(metadata)
+        return delivery
+
+    async def send_and_wait(self, topic: str, value: bytes = None, **kwargs) -> RecordMetadata:
+        return await (await self.send(topic, value, **kwargs))
+
+
+def _resolve(future: asyncio.Future, result: Any):
+    if not future.done():
+        future.set_result(result)
+
+
+class InMemoryConsumer:
+    """
+    Sous-ensemble d'`AIOKafkaConsumer`. Un consommateur seul dans son groupe
+    reçoit toutes les partitions de ses topics; sans groupe, il n'a pas
+    d'offsets committés (comme le relais de sortie).
+    """
+
+    def __init__(self, broker: InMemoryBroker, topics: Sequence[str], group_id: Optional[str], auto_offset_reset: str):
+        self.broker = broker
+        self.topics = list(topics)
+        self.group_id = group_id
+        self.auto_offset_reset = auto_offset_reset
+        self.listener = None
+        self._assignment: Set[TopicPartition] = set()
+        self._paused: Set[TopicPartition] = set()
+        self._positions: Dict[TopicPartition, int] = {}
+        self._pending: List[Record] = []
+
+    def subscribe(self, topics: Sequence[str], listener=None):
+        self.topics = list(topics)
+        self.listener = listener
+
+    async def start(self):
+        self._assignment = {tp for topic in self.topics for tp in self.broker.topic_partitions(topic)}
+        for tp in self._assignment:
+            committed = self.broker.committed.get((self.group_id, tp)) if self.group_id else None
+            if committed is not None:
+                self._positions[tp] = committed
+            elif self.auto_offset_reset == "earliest":
+                self._positions[tp] = 0
+            else:
+                self._positions[tp] = self.broker.end_offset(tp)
+        self.broker.consumers.append(self)
+        if self.listener:
+            await self.listener.on_partitions_assigned(set(self._assignment))
+
+    async def stop(self):
+        if self in self.broker.consumers:
+            self.broker.consumers.remove(self)
+
+    def assignment(self) -> Set[TopicPartition]:
+        return set(self._assignment)
+
+    def paused(self) -> Set[TopicPartition]:
+        return set(self._paused)
+
+    def pause(self, *partitions: TopicPartition):
+        self._paused.update(partitions)
+
+    def resume(self, *partitions: TopicPartition):
+        self._paused.difference_update(partitions)
+
+    async def commit(self, offsets: Optional[Dict[TopicPartition, int]] = None):
+        if self.group_id is None:
+            return
+        for tp, offset in (offsets or self._positions).items():
+            self.broker.committed[(self.group_id, tp)] = getattr(offset, "offset", offset)
+
+    def _fetch(self, max_records: Optional[int]) -> Dict[TopicPartition, List[Record]]:
+        batches = {}
+        budget = max_records or float("inf")
+        now = time.perf_counter()
+        for tp in sorted(self._assignment - self._paused):
+            log = self.broker.logs[tp]
+            position = self._positions[tp]
+            if position >= len(log) or budget <= 0:
+                continue
+            records = log[position:position + int(min(budget, len(log) - position))]
+            self._positions[tp] = position + len(records)
+            budget -= len(records)
+            lag = self.broker.delivery_lag[tp.topic]
+            lag.extend(now - r.appended_at for r in records)
+            batches[tp] = records
+        return batches
+
+    async def getmany(self, *partitions, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[Record]]:
+        batches = self._fetch(max_records)
+        if not batches and timeout_ms > 0:
+            await self.broker.wait_appended(timeout_ms / 1000)
+            batches = self._fetch(max_records)
+        return batches
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Record:
+        while not self._pending:
+            for records in (await self.getmany(timeout_ms=1000)).values():
+                self._pending.extend(records)
+        return self._pending.pop(0)
+
+
+# ============================================
+# PASSERELLE LLM SIMULÉE
+# ============================================
+
+class FakeLLM:
+    """
+    Passerelle LLM compatible OpenAI servie en mémoire.
+
+    Non-streaming: répond après `latency()` secondes. Streaming (SSE): le
+    premier fragment arrive après `first_token()`, les suivants espacés de
+    `inter_chunk()`. Une fraction `error_rate` des appels répond 503.
+    """
+
+    def __init__(
+        self,
+        latency: Callable[[], float],
+        first_token: Optional[Callable[[], float]] = None,
+        inter_chunk: Optional[Callable[[], float]] = None,
+        chunks: int = 20,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.first_token = first_token or latency
+        self.inter_chunk = inter_chunk or (lambda: 0.0)
+        self.chunks = chunks
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.served: List[float] = []
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        body = json.loads(request.content or b"{}")
+        started = time.perf_counter()
+        self._enter()
+        if self._rng.random() < self.error_rate:
+            await asyncio.sleep(self.latency())
+            self.errors += 1
+            self._leave(started)
+            return httpx.Response(503, json={"error": "overloaded"})
+        if body.get("stream"):
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                content=self._stream(started)
+            )
+        await asyncio.sleep(self.latency())
+        self._leave(started)
+        return httpx.Response(200, json={"choices": [{"message": {"role": "assistant", "content": self._text()}}]})
+
+    async def _stream(self, started: float):
+        # Le client cesse de lire après [DONE]: l'appel est compté comme servi
+        # dès que le dernier fragment a été lu
+        served = False
+        try:
+            await asyncio.sleep(self.first_token())
+            for i in range(self.chunks):
+                if i:
+                    await asyncio.sleep(self.inter_chunk())
+                data = {"choices": [{"delta": {"content": f"fragment {i} "}}]}
+                yield f"data: {json.dumps(data)}\n\n".encode("utf-8")
+            served = True
+            self._leave(started)
+            yield b"data: [DONE]\n\n"
+        finally:
+            if not served:
+                self._leave(started)
+
+    def _text(self) -> str:
+        return "".join(f"fragment {i} " for i in range(self.chunks))
+
+    def _enter(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _leave(self, started: float):
+        self.in_flight -= 1
+        self.served.append(time.perf_counter() - started)
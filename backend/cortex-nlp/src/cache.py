@@ -0,0 +1,117 @@
+"""
+Cache LRU en mémoire - Premier niveau devant Redis
+
+Cache borné en taille avec expiration (TTL), utilisé pour éviter les
+allers-retours Redis sur les sessions dont ce consommateur est propriétaire.
+Les compteurs hit/miss/éviction sont exportés vers Prometheus.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+CACHE_REQUESTS = Counter(
+    'cortex_nlp_cache_requests_total',
+    'In-process cache lookups',
+    ['cache', 'result']
+)
+
+CACHE_EVICTIONS = Counter(
+    'cortex_nlp_cache_evictions_total',
+    'In-process cache evictions',
+    ['cache', 'reason']
+)
+
+CACHE_SIZE = Gauge(
+    'cortex_nlp_cache_entries',
+    'Entries held by the in-process cache',
+    ['cache']
+)
+
+_MISSING = object()
+
+# ============================================
+# CACHE
+# ============================================
+
+class LRUCache:
+    """Cache LRU borné avec TTL; `name` active l'export des métriques"""
+
+    def __init__(self, maxsize: int, ttl: float, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retourne la valeur en cache (et la marque récemment utilisée)"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self._record("miss")
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self._evicted("ttl")
+            self._resize()
+            self._record("miss")
+            return default
+        self._data.move_to_end(key)
+        self._record("hit")
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Stocke une valeur, en évinçant les entrées les moins récentes si besoin"""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evicted("size")
+        self._resize()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Invalide une entrée"""
+        entry = self._data.pop(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        self._evicted("invalidated")
+        self._resize()
+        return entry[1]
+
+    def evict_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Invalide les entrées satisfaisant `predicate(key, value)`"""
+        keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+        for key in keys:
+            del self._data[key]
+            self._evicted("invalidated")
+        self._resize()
+        return len(keys)
+
+    def clear(self):
+        self.evict_where(lambda key, value: True)
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Entrées non expirées (sans modifier l'ordre LRU)"""
+        now = time.monotonic()
+        return ((key, value) for key, (expires_at, value) in list(self._data.items()) if expires_at >= now)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _record(self, result: str):
+        if self.name:
+            CACHE_REQUESTS.labels(cache=self.name, result=result).inc()
+
+    def _evicted(self, reason: str):
+        if self.name:
+            CACHE_EVICTIONS.labels(cache=self.name, reason=reason).inc()
+
+    def _resize(self):
+        if self.name:
+            CACHE_SIZE.labels(cache=self.name).set(len(self._data))
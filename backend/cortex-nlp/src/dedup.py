@@ -0,0 +1,80 @@
+"""
+Déduplication des signaux - Effet exactly-once
+
+Un signal redélivré (crash, rebalancing) ne doit pas relancer l'appel LLM
+ni dupliquer l'historique. Chaque `SignalPondere.id` est réservé avant
+traitement par un SET NX atomique dans Redis, devant lequel un filtre
+local borné évite l'aller-retour pour les doublons récents.
+"""
+
+from typing import Optional
+
+import redis.asyncio as redis
+from prometheus_client import Counter
+
+from src.cache import LRUCache
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+DUPLICATE_SIGNALS = Counter(
+    'cortex_nlp_duplicate_signals_total',
+    'Redelivered signals skipped by the deduplicator',
+    ['source']
+)
+
+# ============================================
+# DÉDUPLICATEUR
+# ============================================
+
+class SignalDeduplicator:
+    """Réserve chaque identifiant de signal avant traitement"""
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis],
+        local_size: int = 100_000,
+        lease_seconds: int = 120,
+        done_ttl: int = 86400
+    ):
+        self.redis = redis_client
+        self.lease_seconds = lease_seconds
+        self.done_ttl = done_ttl
+        self.local = LRUCache(local_size, done_ttl, name="dedup")
+
+    async def claim(self, signal_id: str) -> bool:
+        """
+        Réserve un signal; retourne False s'il est déjà traité ou en cours.
+
+        La réservation est un bail ("processing"): si le consommateur meurt
+        avant `complete`, le signal redevient traitable à son expiration.
+        """
+        if self.local.get(signal_id):
+            DUPLICATE_SIGNALS.labels(source="local").inc()
+            return False
+        if self.redis is None:
+            return True
+        try:
+            claimed = await self.redis.set(
+                f"signal:{signal_id}", "processing", nx=True, ex=self.lease_seconds
+            )
+        except Exception as e:
+            # Redis indisponible: on privilégie le traitement (at-least-once)
+            print(f"⚠️ Dedup claim failed for signal {signal_id}: {e}")
+            return True
+        if not claimed:
+            DUPLICATE_SIGNALS.labels(source="redis").inc()
+            return False
+        return True
+
+    async def complete(self, signal_id: str):
+        """Marque un signal comme traité (ses sorties ont été produites)"""
+        self.local.set(signal_id, True)
+        if self.redis is not None:
+            await self.redis.set(f"signal:{signal_id}", "done", ex=self.done_ttl)
+
+    async def release(self, signal_id: str):
+        """Libère la réservation d'un signal dont le traitement a échoué"""
+        if self.redis is not None:
+            await self.redis.delete(f"signal:{signal_id}")
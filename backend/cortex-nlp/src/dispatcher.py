@@ -0,0 +1,358 @@
+"""
+Dispatcher de consommation - Parallélisme ordonné par session
+
+Exécute les signaux de sessions différentes en parallèle sur un pool de
+workers borné, tout en préservant l'ordre des messages au sein d'une même
+session. Les offsets Kafka sont suivis par partition afin de ne committer
+que des préfixes entièrement traités: un enregistrement en échec est
+réessayé (en tête de sa session, l'ordre est préservé) puis, après
+`max_attempts` tentatives, confié à `on_failure` (dead-letter); son offset
+n'avance qu'après un succès ou une mise en dead-letter réussie.
+
+Les sessions prêtes sont servies par priorité (`metadata.priority`):
+CRITICAL, HIGH, NORMAL puis LOW, avec vieillissement pour éviter la famine.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from prometheus_client import Counter, Histogram
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+QUEUE_WAIT = Histogram(
+    'cortex_nlp_queue_wait_seconds',
+    'Delay between accepting a record and starting its processing',
+    ['priority'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+DISPATCH_FAILURES = Counter(
+    'cortex_nlp_dispatch_failures_total',
+    'Failed record processing attempts by outcome',
+    ['outcome']
+)
+
+# ============================================
+# PRIORITÉS
+# ============================================
+
+PRIORITIES = ("LOW", "NORMAL", "HIGH", "CRITICAL")
+_PRIORITY_LEVELS = {name: level for level, name in enumerate(PRIORITIES)}
+DEFAULT_PRIORITY = _PRIORITY_LEVELS["NORMAL"]
+
+
+def priority_level(priority: Optional[str]) -> int:
+    """Niveau numérique d'une priorité de signal (NORMAL si absente ou inconnue)"""
+    if not isinstance(priority, str):
+        return DEFAULT_PRIORITY
+    return _PRIORITY_LEVELS.get(priority.upper(), DEFAULT_PRIORITY)
+
+
+@dataclass
+class DispatchItem:
+    """Enregistrement en attente de traitement"""
+    key: str
+    value: Any
+    partition: Hashable
+    offset: int
+    priority: int = DEFAULT_PRIORITY
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class ReadyQueue:
+    """
+    File des sessions prêtes, servie par priorité décroissante.
+
+    Une session n'y figure qu'une fois; son niveau peut être relevé si un
+    message plus prioritaire arrive pendant qu'elle attend (l'ancienne
+    entrée devient caduque). Une session qui attend depuis plus de
+    `aging_seconds` passe devant les niveaux supérieurs.
+    """
+
+    def __init__(self, aging_seconds: float = 5.0):
+        self.aging_seconds = aging_seconds
+        self._levels: List[Deque[Tuple[str, float, int]]] = [deque() for _ in PRIORITIES]
+        self._queued: Dict[str, Tuple[int, float, int]] = {}  # clé -> (niveau, prête depuis, jeton)
+        self._tokens = 0
+        self._available = asyncio.Semaphore(0)
+
+    def put(self, key: str, level: int):
+        """Rend une session prête, ou relève son niveau si elle l'est déjà"""
+        current = self._queued.get(key)
+        if current is not None and current[0] >= level:
+            return
+        since = current[1] if current is not None else time.monotonic()
+        self._tokens += 1
+        self._queued[key] = (level, since, self._tokens)
+        self._levels[level].append((key, since, self._tokens))
+        if current is None:
+            self._available.release()
+
+    async def get(self) -> str:
+        """Attend et retire la prochaine session à servir"""
+        await self._available.acquire()
+        for level in range(len(self._levels)):
+            self._skip_stale(level)
+
+        level = max(l for l, entries in enumerate(self._levels) if entries)
+        deadline = time.monotonic() - self.aging_seconds
+        aged = [l for l in range(level) if self._levels[l] and self._levels[l][0][1] <= deadline]
+        if aged:
+            level = min(aged, key=lambda l: self._levels[l][0][1])
+
+        key, _, _ = self._levels[level].popleft()
+        del self._queued[key]
+        return key
+
+    def _skip_stale(self, level: int):
+        entries = self._levels[level]
+        while entries:
+            key, _, token = entries[0]
+            current = self._queued.get(key)
+            if current is not None and current[2] == token:
+                return
+            entries.popleft()
+
+
+class OffsetTracker:
+    """Suit les offsets en cours par partition et calcule les offsets committables"""
+
+    def __init__(self):
+        self._pending: Dict[Hashable, Deque[int]] = {}
+        self._done: Dict[Hashable, Set[int]] = {}
+
+    def track(self, partition: Hashable, offset: int):
+        """Enregistre un offset reçu (les offsets d'une partition arrivent croissants)"""
+        self._pending.setdefault(partition, deque()).append(offset)
+        self._done.setdefault(partition, set())
+
+    def complete(self, partition: Hashable, offset: int):
+        """Marque un offset comme traité"""
+        done = self._done.get(partition)
+        if done is not None:  # Partition révoquée entre-temps: on ignore
+            done.add(offset)
+
+    def committable(self) -> Dict[Hashable, int]:
+        """Retourne, par partition, le prochain offset à committer (préfixe contigu traité)"""
+        offsets = {}
+        for partition, pending in self._pending.items():
+            done = self._done[partition]
+            last = None
+            while pending and pending[0] in done:
+                last = pending.popleft()
+                done.discard(last)
+            if last is not None:
+                offsets[partition] = last + 1
+        return offsets
+
+    def forget(self, partitions: Iterable[Hashable]):
+        """Oublie l'état des partitions révoquées"""
+        for partition in partitions:
+            self._pending.pop(partition, None)
+            self._done.pop(partition, None)
+
+    def tracks(self, partition: Hashable) -> bool:
+        """Vrai tant que la partition n'a pas été révoquée"""
+        return partition in self._pending
+
+    @property
+    def in_flight(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+
+class SessionOrderedDispatcher:
+    """
+    Pool de workers borné: parallèle entre sessions, séquentiel dans une session.
+
+    - `max_in_flight` borne le nombre de handlers exécutés simultanément
+    - `max_pending` borne le nombre d'enregistrements acceptés mais non terminés;
+      `submit` bloque au-delà, ce qui freine naturellement la boucle Kafka
+    - une session est servie au niveau de son message en attente le plus
+      prioritaire (ses messages restent traités dans l'ordre d'arrivée)
+    - un handler en échec est relancé après `retry_backoff` secondes (doublées
+      à chaque tentative); après `max_attempts`, `on_failure(value, error)`
+      met l'enregistrement en dead-letter. Sans `on_failure`, ou si elle
+      échoue, les tentatives continuent: l'offset n'est jamais committé pour
+      un enregistrement ni traité ni mis de côté
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        max_in_flight: int = 32,
+        max_pending: Optional[int] = None,
+        aging_seconds: float = 5.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        on_failure: Optional[Callable[[Any, Exception], Awaitable[None]]] = None
+    ):
+        self.handler = handler
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.on_failure = on_failure
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_pending = max(self.max_in_flight, max_pending or self.max_in_flight * 4)
+        self.offsets = OffsetTracker()
+
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._sessions: Dict[str, Deque[DispatchItem]] = {}
+        self._scheduled: Set[str] = set()  # Sessions dans la file "prêtes" ou en cours
+        self._running: Set[str] = set()
+        self._ready = ReadyQueue(aging_seconds)
+        self._workers: List[asyncio.Task] = []
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def pending(self) -> int:
+        """Nombre d'enregistrements acceptés et non terminés"""
+        return self._pending
+
+    @property
+    def running(self) -> int:
+        """Nombre de handlers en cours d'exécution"""
+        return len(self._running)
+
+    def start(self):
+        """Démarre les workers"""
+        for i in range(self.max_in_flight):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"nlp-worker-{i}"))
+
+    async def stop(self):
+        """Arrête les workers (les traitements en cours sont annulés)"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin des traitements acceptés; retourne False si le délai expire"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def submit(
+        self,
+        key: str,
+        value: Any,
+        partition: Hashable,
+        offset: int,
+        priority: Optional[str] = None
+    ):
+        """Accepte un enregistrement; bloque si `max_pending` est atteint"""
+        await self._slots.acquire()
+        self.offsets.track(partition, offset)
+        self._pending += 1
+        self._idle.clear()
+
+        level = priority_level(priority)
+        self._sessions.setdefault(key, deque()).append(
+            DispatchItem(key=key, value=value, partition=partition, offset=offset, priority=level)
+        )
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            self._ready.put(key, level)
+        elif key not in self._running:
+            # Session déjà en attente: relever son niveau si besoin
+            self._ready.put(key, level)
+
+    def revoke(self, partitions: Iterable[Hashable]):
+        """Abandonne les enregistrements en attente des partitions révoquées"""
+        revoked = set(partitions)
+        self.offsets.forget(revoked)
+
+        for key, queue in self._sessions.items():
+            # La tête d'une session en cours d'exécution ne peut pas être retirée
+            head = queue.popleft() if key in self._running and queue else None
+            kept = deque(item for item in queue if item.partition not in revoked)
+            for _ in range(len(queue) - len(kept)):
+                self._release()
+            queue.clear()
+            queue.extend(kept)
+            if head is not None:
+                queue.appendleft(head)
+
+    def _release(self):
+        self._pending -= 1
+        self._slots.release()
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            queue = self._sessions.get(key)
+            if not queue:
+                # Session vidée par une révocation
+                self._scheduled.discard(key)
+                self._sessions.pop(key, None)
+                continue
+
+            item = queue[0]
+            self._running.add(key)
+            QUEUE_WAIT.labels(priority=PRIORITIES[item.priority]).observe(
+                time.monotonic() - item.submitted_at
+            )
+            done = False
+            try:
+                done = await self._process(item)
+            finally:
+                self._running.discard(key)
+                queue.popleft()
+                if done:
+                    self.offsets.complete(item.partition, item.offset)
+                self._release()
+
+            if queue:
+                # Round-robin: la session repasse en fin de file de son niveau
+                self._ready.put(key, max(pending.priority for pending in queue))
+            else:
+                self._scheduled.discard(key)
+                del self._sessions[key]
+
+    async def _process(self, item: DispatchItem) -> bool:
+        """
+        Exécute le handler jusqu'au succès ou à la mise en dead-letter;
+        retourne False si la partition a été révoquée entre-temps (le
+        nouveau propriétaire reprendra depuis le dernier offset committé).
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self.handler(item.value)
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+
+            if attempt >= self.max_attempts and self.on_failure is not None:
+                try:
+                    await self.on_failure(item.value, error)
+                    DISPATCH_FAILURES.labels(outcome="dead_lettered").inc()
+                    print(f"❌ Processing failed for session {item.key} after {attempt} attempts, dead-lettered: {error}")
+                    return True
+                except asyncio.CancelledError:
+                    raise
+                except Exception as dead_letter_error:
+                    DISPATCH_FAILURES.labels(outcome="dead_letter_failed").inc()
+                    print(f"❌ Dead-letter failed for session {item.key}: {dead_letter_error}")
+
+            DISPATCH_FAILURES.labels(outcome="retried").inc()
+            print(f"⚠️ Processing failed for session {item.key} (attempt {attempt}): {error}")
+            await asyncio.sleep(min(self.max_backoff, self.retry_backoff * 2 ** (attempt - 1)))
+            if not self.offsets.tracks(item.partition):
+                DISPATCH_FAILURES.labels(outcome="revoked").inc()
+                return False
@@ -0,0 +1,312 @@
+"""
+Passerelle LLM - pool de connexions et choix de l'endpoint
+
+Le client httpx des appels LLM a un pool dimensionné explicitement
+(connexions max, connexions gardées ouvertes, durée de keep-alive), HTTP/2
+en option, et est préchauffé au démarrage: les premières requêtes après un
+déploiement ne paient pas l'établissement TCP + TLS. Chaque requête est
+tracée (extension `trace` de httpcore) pour séparer l'attente d'une
+connexion du pool, l'établissement d'une connexion et l'échange HTTP.
+
+Plusieurs URLs de passerelle peuvent être configurées: chaque appel prend,
+parmi deux endpoints tirés au hasard, celui dont la latence récente (EWMA,
+multipliée par ses appels en cours) est la plus faible. Un endpoint en
+erreur est écarté `cooldown` secondes, et une latence plus ancienne que
+`stale_after` est réévaluée par un appel de test.
+"""
+
+import asyncio
+import math
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.resilience import DeadlineExceeded
+
+try:
+    import h2  # noqa: F401 - requis par httpx pour HTTP/2
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    h2 = None
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+LLM_POOL_IN_USE = Gauge(
+    'cortex_nlp_llm_pool_in_use',
+    'LLM gateway requests holding a pooled connection'
+)
+
+LLM_POOL_SATURATION = Gauge(
+    'cortex_nlp_llm_pool_saturation',
+    'LLM gateway requests in flight over the pool max connections'
+)
+
+LLM_HTTP_PHASE_TIME = Histogram(
+    'cortex_nlp_llm_http_phase_seconds',
+    'LLM gateway request time by phase (pool_wait, connect, request)',
+    ['phase'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+LLM_ENDPOINT_REQUESTS = Counter(
+    'cortex_nlp_llm_endpoint_requests_total',
+    'LLM calls by gateway endpoint and outcome',
+    ['client', 'endpoint', 'status']
+)
+
+LLM_ENDPOINT_LATENCY = Gauge(
+    'cortex_nlp_llm_endpoint_latency_seconds',
+    'Smoothed (EWMA) LLM latency per gateway endpoint',
+    ['client', 'endpoint']
+)
+
+# ============================================
+# TRANSPORT
+# ============================================
+
+class _PhaseTrace:
+    """Horodatage des événements httpcore d'une requête (le premier de chaque nom)"""
+
+    def __init__(self, parent: Optional[Callable[[str, Dict[str, Any]], Any]] = None):
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    async def __call__(self, event: str, info: Dict[str, Any]):
+        # "connection.connect_tcp.started", "http11.send_request_headers.started"...
+        self.marks.setdefault(event.split(".", 1)[-1], time.perf_counter())
+        if self.parent is not None:
+            await self.parent(event, info)
+
+    def observe(self):
+        marks = self.marks
+        connect = marks.get("connect_tcp.started")
+        sent = marks.get("send_request_headers.started")
+        first = connect if connect is not None else sent
+        if first is not None:
+            LLM_HTTP_PHASE_TIME.labels(phase="pool_wait").observe(first - self.started)
+        connected = marks.get("start_tls.complete", marks.get("connect_tcp.complete"))
+        if connect is not None and connected is not None:
+            LLM_HTTP_PHASE_TIME.labels(phase="connect").observe(connected - connect)
+        received = marks.get("receive_response_headers.complete")
+        if sent is not None and received is not None:
+            LLM_HTTP_PHASE_TIME.labels(phase="request").observe(received - sent)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Corps de réponse qui libère la connexion comptée à sa fermeture"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self.stream = stream
+        self.release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if self.release is not None:
+                self.release()
+                self.release = None
+
+
+class TracedTransport(httpx.AsyncBaseTransport):
+    """
+    Enveloppe un transport httpx: compte les requêtes qui occupent le pool
+    (jusqu'à la fermeture de la réponse) et mesure leurs phases.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_connections: int):
+        self.transport = transport
+        self.max_connections = max_connections
+        self.in_use = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        trace = _PhaseTrace(request.extensions.get("trace"))
+        request.extensions["trace"] = trace
+        self._acquire()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            self._release()
+            raise
+        trace.observe()
+        response.stream = _ReleasingStream(response.stream, self._release)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def _acquire(self):
+        self.in_use += 1
+        self._update()
+
+    def _release(self):
+        self.in_use -= 1
+        self._update()
+
+    def _update(self):
+        LLM_POOL_IN_USE.set(self.in_use)
+        LLM_POOL_SATURATION.set(self.in_use / self.max_connections)
+
+
+def create_http_client(
+    max_connections: int = 100,
+    max_keepalive: int = 20,
+    keepalive_expiry: float = 60.0,
+    http2: bool = False
+) -> httpx.AsyncClient:
+    """Client httpx de la passerelle LLM, pool dimensionné et tracé"""
+    if http2 and h2 is None:
+        print("⚠️ LLM_HTTP2 requested but the h2 package is not installed: using HTTP/1.1")
+        http2 = False
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+    )
+    return httpx.AsyncClient(transport=TracedTransport(transport, max_connections))
+
+
+async def prewarm(client: httpx.AsyncClient, urls: Sequence[str], connections: int, timeout: float = 5.0) -> int:
+    """
+    Ouvre `connections` connexions par endpoint (requêtes HEAD simultanées,
+    leur statut est sans importance) qui restent ensuite dans le pool.
+    Retourne le nombre de requêtes abouties; un échec n'empêche pas le démarrage.
+    """
+    async def warm(url: str) -> bool:
+        try:
+            await client.head(url, timeout=timeout)
+            return True
+        except httpx.HTTPError as e:
+            print(f"⚠️ LLM pool pre-warm failed for {url}: {e!r}")
+            return False
+
+    results = await asyncio.gather(*(warm(url) for url in urls for _ in range(connections)))
+    return sum(results)
+
+
+# ============================================
+# CHOIX DE L'ENDPOINT
+# ============================================
+
+class GatewayEndpoint:
+    """Une URL de passerelle et sa latence observée"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None  # EWMA, None tant que non mesurée
+        self.updated_at = 0.0
+        self.in_flight = 0
+        self.down_until = 0.0
+
+    def score(self, now: float, stale_after: float) -> float:
+        """Coût estimé d'un appel; 0 pour mesurer une latence inconnue ou périmée (un appel à la fois)"""
+        fresh = self.latency is not None and now - self.updated_at <= stale_after
+        if not fresh and self.in_flight == 0:
+            return 0.0
+        if self.latency is None:
+            return math.inf
+        return self.latency * (self.in_flight + 1)
+
+
+class EndpointCall:
+    """Appel en cours vers un endpoint; `responded()` fixe la latence retenue (streaming)"""
+
+    __slots__ = ("endpoint", "started", "latency")
+
+    def __init__(self, endpoint: GatewayEndpoint):
+        self.endpoint = endpoint
+        self.started = time.monotonic()
+        self.latency: Optional[float] = None
+
+    @property
+    def url(self) -> str:
+        return self.endpoint.url
+
+    def responded(self):
+        """En-têtes de réponse reçus: la suite du flux dépend de la longueur générée"""
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+
+
+class EndpointSelector:
+    """Répartit les appels d'un client LLM entre ses URLs de passerelle"""
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        name: str = "chat",
+        alpha: float = 0.3,
+        cooldown: float = 10.0,
+        stale_after: float = 30.0,
+        rng: Optional[random.Random] = None
+    ):
+        if not urls:
+            raise ValueError("At least one LLM gateway URL is required")
+        self.endpoints: List[GatewayEndpoint] = [GatewayEndpoint(url) for url in urls]
+        self.name = name
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.stale_after = stale_after
+        self._rng = rng or random.Random()
+
+    def pick(self) -> GatewayEndpoint:
+        """Meilleur de deux endpoints disponibles tirés au hasard (tous si aucun n'est disponible)"""
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e.down_until <= now] or self.endpoints
+        if len(candidates) > 2:
+            candidates = self._rng.sample(candidates, 2)
+        return min(candidates, key=lambda e: e.score(now, self.stale_after))
+
+    @contextmanager
+    def call(self) -> Iterator[EndpointCall]:
+        """
+        Choisit un endpoint et enregistre l'issue de l'appel. Un budget de
+        signal épuisé (DeadlineExceeded) ou une annulation ne sont pas
+        imputés à l'endpoint.
+        """
+        call = EndpointCall(self.pick())
+        call.endpoint.in_flight += 1
+        success: Optional[bool] = None
+        try:
+            yield call
+            success = True
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            success = False
+            raise
+        finally:
+            call.endpoint.in_flight -= 1
+            if success is not None:
+                call.responded()
+                self.record(call.endpoint, call.latency, success)
+
+    def record(self, endpoint: GatewayEndpoint, latency: float, success: bool):
+        now = time.monotonic()
+        LLM_ENDPOINT_REQUESTS.labels(
+            client=self.name, endpoint=endpoint.url, status="success" if success else "error"
+        ).inc()
+        if not success:
+            endpoint.down_until = now + self.cooldown
+            return
+        if endpoint.latency is None:
+            endpoint.latency = latency
+        else:
+            endpoint.latency += self.alpha * (latency - endpoint.latency)
+        endpoint.updated_at = now
+        LLM_ENDPOINT_LATENCY.labels(client=self.name, endpoint=endpoint.url).set(endpoint.latency)
@@ -0,0 +1,161 @@
+"""
+Détection d'intention - Automate multi-motifs (Aho-Corasick)
+
+Tous les lexiques sont compilés une fois en un seul automate: un message
+est parcouru en une passe, quel que soit le nombre de mots-clés. Les
+correspondances se font sans accents ni casse, sur des frontières de mots
+("api" ne correspond pas à "rapide"), et chaque intention reçoit un score.
+"""
+
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from src.text import fold_accents
+
+# Lexiques par intention; en cas d'égalité de score, l'ordre fait foi
+INTENT_LEXICONS: Dict[str, List[str]] = {
+    "budget": ["budget", "prix", "coût", "tarif", "combien", "price", "cost"],
+    "timeline": ["quand", "délai", "deadline", "timeline", "urgence", "rapide"],
+    "technical": ["technique", "tech", "api", "intégration", "stack", "développement"],
+    "demo": ["demo", "démonstration", "essai", "test", "voir"],
+    "contact": ["appeler", "téléphone", "rdv", "rendez-vous", "contact", "call"]
+}
+
+DEFAULT_INTENT = "general"
+
+
+@dataclass
+class IntentResult:
+    """Intention retenue, scores de toutes les intentions et mots-clés trouvés"""
+    intent: str
+    confidence: float
+    scores: Dict[str, int]
+    keywords_matched: List[str] = field(default_factory=list)
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class IntentEngine:
+    """Automate Aho-Corasick compilé à partir des lexiques d'intentions"""
+
+    def __init__(self, lexicons: Dict[str, Sequence[str]] = INTENT_LEXICONS):
+        self.intents = list(lexicons)
+        self._keywords: List[str] = []           # Forme d'origine, par identifiant
+        self._keyword_intents: List[List[int]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, int]]] = [[]]  # État -> [(longueur, mot-clé)]
+
+        ids: Dict[str, int] = {}
+        for intent_index, keywords in enumerate(lexicons.values()):
+            for keyword in keywords:
+                pattern = " ".join(fold_accents(keyword).split())
+                if not pattern:
+                    continue
+                if pattern not in ids:
+                    ids[pattern] = len(self._keywords)
+                    self._keywords.append(keyword)
+                    self._keyword_intents.append([])
+                    self._insert(pattern, ids[pattern])
+                if intent_index not in self._keyword_intents[ids[pattern]]:
+                    self._keyword_intents[ids[pattern]].append(intent_index)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, keyword_id: int):
+        state = 0
+        for c in pattern:
+            next_state = self._goto[state].get(c)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][c] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), keyword_id))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and c not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(c, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Les motifs suffixes sont aussi reconnus depuis cet état
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _scan(self, text: str) -> Iterable[Tuple[int, int]]:
+        """Produit (position de fin exclue, mot-clé) pour chaque mot entier reconnu"""
+        goto, fail, output = self._goto, self._fail, self._output
+        end = len(text)
+        state = 0
+        for i, c in enumerate(text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if not output[state]:
+                continue
+            after = i + 1
+            if after < end and _is_word_char(text[after]):
+                continue
+            for length, keyword_id in output[state]:
+                start = after - length
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    yield after, keyword_id
+
+    def _result(self, keyword_ids: Iterable[int]) -> IntentResult:
+        hits = [0] * len(self.intents)
+        matched: List[int] = []
+        for keyword_id in keyword_ids:
+            if keyword_id in matched:
+                continue
+            matched.append(keyword_id)
+            for intent_index in self._keyword_intents[keyword_id]:
+                hits[intent_index] += 1
+
+        scores = dict(zip(self.intents, hits))
+        best = max(range(len(hits)), key=lambda i: (hits[i], -i)) if hits else -1
+        if best < 0 or hits[best] == 0:
+            return IntentResult(DEFAULT_INTENT, 0.5, scores)
+        return IntentResult(
+            intent=self.intents[best],
+            confidence=min(0.95, 0.75 + 0.05 * hits[best]),
+            scores=scores,
+            keywords_matched=[self._keywords[k] for k in matched]
+        )
+
+    def detect(self, message: str) -> IntentResult:
+        """Score toutes les intentions d'un message et retient la meilleure"""
+        return self._result(keyword_id for _, keyword_id in self._scan(self._prepare(message)))
+
+    def detect_many(self, messages: Sequence[str]) -> List[IntentResult]:
+        """
+        Version par lot: les messages sont concaténés (séparateur hors mot)
+        et parcourus en une seule passe de l'automate.
+        """
+        starts = []
+        parts = []
+        offset = 0
+        for message in messages:
+            prepared = self._prepare(message)
+            starts.append(offset)
+            parts.append(prepared)
+            offset += len(prepared) + 1
+
+        found: List[List[int]] = [[] for _ in parts]
+        for end, keyword_id in self._scan("\n".join(parts)):
+            found[bisect_right(starts, end - 1) - 1].append(keyword_id)
+        return [self._result(keyword_ids) for keyword_ids in found]
+
+    @staticmethod
+    def _prepare(message: str) -> str:
+        # Espaces normalisés pour les mots-clés composés ("rendez vous")
+        return " ".join(fold_accents(message).split())
@@ -11,21 +11,39 @@ comprennent les intentions et formulent les réponses.
 """
 
 import asyncio
+import hashlib
 import json
 import os
-from typing import Optional, Dict, Any, List
+import time
+import math
+from typing import Optional, Dict, Any, List, AsyncIterator, Awaitable, Callable, Iterator, Tuple, Set, Union
 from datetime import datetime
-import uuid
 import httpx
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, ConsumerRebalanceListener
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
 from starlette.responses import Response
 import redis.asyncio as redis
 
+from shared.claimcheck import BlobNotFound, ClaimCheck, FileBlobStore, create_claim_check, is_ref
+from shared.codec import CodecError, SignalCodec
+from shared.types import CortexId, SignalPondere, is_expired_at, new_signal_id
+from src.cache import LRUCache
+from src.dedup import SignalDeduplicator
+from src.dispatcher import SessionOrderedDispatcher
+from src.gateway import EndpointSelector, create_http_client, prewarm
+from src.intents import IntentEngine
+from src.qualification import QUALIFIED_THRESHOLD, QualificationState, qualification_update
+from src.reports import ReportJob, ReportWorker, conversation_hash
+from src.resilience import (
+    AdaptiveLimiter, CircuitBreaker, CircuitOpenError, DeadlineExceeded, GatewayGuard
+)
+from src.singleflight import SingleFlight
+from src.text import normalize_text
+
 # ============================================
 # CONFIGURATION
 # ============================================
@@ -34,36 +52,117 @@ KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 LLM_API_URL = os.getenv("LLM_API_URL", "https://ai.gateway.lovable.dev/v1/chat/completions")
 LLM_API_KEY = os.getenv("LLM_API_KEY", "")  # LOVABLE_API_KEY
+# Plusieurs passerelles (séparées par des virgules): chaque appel choisit la
+# plus rapide d'après la latence récente; par défaut LLM_API_URL seule
+LLM_API_URLS = [u.strip() for u in os.getenv("LLM_API_URLS", LLM_API_URL).split(",") if u.strip()]
+LLM_MODEL = "google/gemini-2.5-flash"
+LLM_TIMEOUT_SECONDS = 30.0
+# Streaming SSE: les fragments de réponse sont émis au fil de la génération
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
+# Contexte envoyé au LLM: budget de tokens, tours récents gardés verbatim,
+# et nombre de messages plus anciens à accumuler avant de les résumer
+LLM_CONTEXT_MAX_TOKENS = int(os.getenv("LLM_CONTEXT_MAX_TOKENS", "4000"))
+LLM_CONTEXT_RECENT_TURNS = int(os.getenv("LLM_CONTEXT_RECENT_TURNS", "4"))
+LLM_SUMMARY_MIN_MESSAGES = int(os.getenv("LLM_SUMMARY_MIN_MESSAGES", "6"))
+LLM_CHARS_PER_TOKEN = 4  # Estimation (pas de tokenizer local pour Gemini)
+# Cache des réponses LLM pour les ouvertures de conversation récurrentes,
+# activé par intention (ex: "budget,demo"); vide = désactivé
+LLM_CACHE_INTENTS = {i.strip() for i in os.getenv("LLM_CACHE_INTENTS", "").split(",") if i.strip()}
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_MESSAGES = int(os.getenv("LLM_CACHE_MAX_MESSAGES", "1"))
+# Doublons (session + message identiques): durée pendant laquelle une réponse
+# générée est réutilisée plutôt que regénérée
+LLM_SINGLEFLIGHT_WINDOW_SECONDS = float(os.getenv("LLM_SINGLEFLIGHT_WINDOW_SECONDS", "10"))
+# Limiteur adaptatif (AIMD) des appels LLM concurrents: la limite croît tant
+# que la latence reste sous la cible et diminue de moitié sur erreur ou lenteur
+LLM_LIMIT_INITIAL = int(os.getenv("LLM_LIMIT_INITIAL", "16"))
+LLM_LIMIT_MIN = int(os.getenv("LLM_LIMIT_MIN", "1"))
+LLM_LIMIT_MAX = int(os.getenv("LLM_LIMIT_MAX", "64"))
+LLM_LATENCY_TARGET_SECONDS = float(os.getenv("LLM_LATENCY_TARGET_SECONDS", "15"))
+# Disjoncteur: ouvert quand le taux d'erreur des derniers appels dépasse le
+# seuil; les partitions Kafka sont alors en pause jusqu'au réarmement
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_MIN_REQUESTS = int(os.getenv("LLM_BREAKER_MIN_REQUESTS", "10"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Pool de connexions vers la passerelle (partagé par le chat et les rapports,
+# chacun jusqu'à LLM_LIMIT_MAX appels concurrents), préchauffé au démarrage
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", str(LLM_LIMIT_MAX * 2)))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "32"))
+LLM_POOL_KEEPALIVE_SECONDS = float(os.getenv("LLM_POOL_KEEPALIVE_SECONDS", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes")
+LLM_PREWARM_CONNECTIONS = int(os.getenv("LLM_PREWARM_CONNECTIONS", "4"))  # Par endpoint, 0 = désactivé
+# Endpoint en erreur écarté pendant ce délai (s'il en reste d'autres)
+LLM_ENDPOINT_COOLDOWN_SECONDS = float(os.getenv("LLM_ENDPOINT_COOLDOWN_SECONDS", "10"))
 
 TOPIC_INPUT = "signals.input.chat"
 TOPIC_OUTPUT = "signals.output.chat"
 TOPIC_INTELLIGENCE = "signals.intelligence"
 TOPIC_QUALIFICATION = "signals.qualification"
 TOPIC_ERRORS = "signals.errors"
+TOPIC_ACTIONS = "signals.actions"
 
 CONSUMER_GROUP = "cortex-nlp-group"
+REPORT_CONSUMER_GROUP = "cortex-nlp-reports"
+
+# Producteur Kafka: "sync" attend l'ack du broker pour chaque signal,
+# "batched" met en file et laisse le producteur regrouper les envois
+KAFKA_PRODUCER_MODE = os.getenv("KAFKA_PRODUCER_MODE", "batched")
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", "5"))
+KAFKA_MAX_BATCH_SIZE = int(os.getenv("KAFKA_MAX_BATCH_SIZE", "65536"))
+KAFKA_COMPRESSION = os.getenv("KAFKA_COMPRESSION") or None  # gzip, snappy, lz4, zstd
+# Format des signaux émis ("json" ou "msgpack"); les signaux reçus sont
+# décodés selon leur en-tête content-type, quel que soit ce réglage
+SIGNAL_FORMAT = os.getenv("SIGNAL_FORMAT", "json")
+
+# Parallélisme du consommateur
+NLP_MAX_IN_FLIGHT = int(os.getenv("NLP_MAX_IN_FLIGHT", "32"))
+NLP_MAX_PENDING = int(os.getenv("NLP_MAX_PENDING", str(NLP_MAX_IN_FLIGHT * 4)))
+NLP_COMMIT_INTERVAL_MS = int(os.getenv("NLP_COMMIT_INTERVAL_MS", "1000"))
+NLP_SHUTDOWN_GRACE_SECONDS = float(os.getenv("NLP_SHUTDOWN_GRACE_SECONDS", "10"))
+# Signal en échec: tentatives (backoff doublé à chaque fois) avant sa mise en
+# dead-letter sur signals.errors; son offset n'avance qu'ensuite
+NLP_MAX_ATTEMPTS = int(os.getenv("NLP_MAX_ATTEMPTS", "3"))
+NLP_RETRY_BACKOFF_SECONDS = float(os.getenv("NLP_RETRY_BACKOFF_SECONDS", "0.5"))
+# Ordonnancement par metadata.priority: attente au-delà de laquelle une
+# session moins prioritaire passe devant (anti-famine)
+NLP_PRIORITY_AGING_SECONDS = float(os.getenv("NLP_PRIORITY_AGING_SECONDS", "5"))
+# Signaux expirés (timestamp + ttl dépassés): "drop" les écarte silencieusement,
+# "dead-letter" les signale sur signals.errors
+NLP_EXPIRED_POLICY = os.getenv("NLP_EXPIRED_POLICY", "drop")
+# Déduplication par identifiant de signal
+DEDUP_LOCAL_SIZE = int(os.getenv("DEDUP_LOCAL_SIZE", "100000"))
+DEDUP_LEASE_SECONDS = int(os.getenv("DEDUP_LEASE_SECONDS", "120"))
+DEDUP_TTL_SECONDS = int(os.getenv("DEDUP_TTL_SECONDS", "86400"))
+
+# Historique de conversation: nombre max de messages conservés par session
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "100"))
+# Index d'activité: rafraîchissement périodique de la jauge des conversations actives
+ACTIVE_REFRESH_SECONDS = float(os.getenv("ACTIVE_REFRESH_SECONDS", "15"))
+ACTIVE_INDEX_KEY = "conversations:active"
+# Cache en mémoire devant Redis (0 pour désactiver)
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "10000"))
+CONVERSATION_CACHE_TTL_SECONDS = float(os.getenv("CONVERSATION_CACHE_TTL_SECONDS", "300"))
+
+# Rapports de qualification: pool de workers séparé du chat (0 = désactivé)
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_MAX_QUEUED = int(os.getenv("REPORT_MAX_QUEUED", "100"))  # Sessions en attente
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "1000"))
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "86400"))
+
+# Claim-check: textes au-delà du seuil stockés dans le magasin de blobs (volume
+# partagé avec cortex-sensoriel), référencés dans les signaux et l'historique
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", "")  # Vide = désactivé
+CLAIMCHECK_THRESHOLD_BYTES = int(os.getenv("CLAIMCHECK_THRESHOLD_BYTES", "16384"))
+CLAIMCHECK_FIELDS = ("response", "report")  # Champs de payload concernés
+BLOB_TTL_SECONDS = float(os.getenv("BLOB_TTL_SECONDS", "604800"))  # Rétention Kafka par défaut (7 jours)
+BLOB_PRUNE_INTERVAL_SECONDS = float(os.getenv("BLOB_PRUNE_INTERVAL_SECONDS", "3600"))
 
 # ============================================
 # MODÈLES
 # ============================================
 
-class SignalMetadata(BaseModel):
-    version: str = "1.0.0"
-    priority: str = "NORMAL"
-    trace_id: Optional[str] = None
-    span_id: Optional[str] = None
-
-class SignalPondere(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    type: str
-    source: str = "cortex-nlp"
-    timestamp: int = Field(default_factory=lambda: int(datetime.now().timestamp() * 1000))
-    payload: Dict[str, Any]
-    confiance: float = Field(ge=0.0, le=1.0, default=1.0)
-    ttl: int = 60000
-    correlation_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    metadata: SignalMetadata = Field(default_factory=SignalMetadata)
-
 class ConversationMessage(BaseModel):
     role: str
     content: str
@@ -84,6 +183,18 @@ MESSAGES_PRODUCED = Counter(
     ['topic', 'type']
 )
 
+DECODE_FAILURES = Counter(
+    'cortex_nlp_decode_failures_total',
+    'Consumed records that could not be decoded and were skipped',
+    ['topic']
+)
+
+PRODUCE_FAILURES = Counter(
+    'cortex_nlp_produce_failures_total',
+    'Signals whose delivery to Kafka failed',
+    ['topic', 'type']
+)
+
 LLM_REQUESTS = Counter(
     'cortex_nlp_llm_requests_total',
     'Total LLM API requests',
@@ -95,6 +206,40 @@ LLM_LATENCY = Histogram(
     'LLM API request latency'
 )
 
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    'cortex_nlp_llm_time_to_first_token_seconds',
+    'Delay between the LLM request and the first streamed token'
+)
+
+LLM_PROMPT_TOKENS = Histogram(
+    'cortex_nlp_llm_prompt_tokens',
+    'Estimated prompt tokens sent to the LLM',
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+
+LLM_CACHE_SAVED = Counter(
+    'cortex_nlp_llm_cache_saved_seconds_total',
+    'LLM latency avoided by response cache hits',
+    ['intent']
+)
+
+LLM_COALESCED = Counter(
+    'cortex_nlp_llm_coalesced_total',
+    'Duplicate generation requests served by another in-flight or recent call',
+    ['mode']
+)
+
+SUMMARY_TIME = Histogram(
+    'cortex_nlp_summary_seconds',
+    'Time spent generating rolling conversation summaries'
+)
+
+SUMMARIES = Counter(
+    'cortex_nlp_summaries_total',
+    'Rolling conversation summaries',
+    ['status']
+)
+
 PROCESSING_TIME = Histogram(
     'cortex_nlp_processing_seconds',
     'Time spent processing messages'
@@ -105,6 +250,34 @@ ACTIVE_CONVERSATIONS = Gauge(
     'Number of active conversations in cache'
 )
 
+IN_FLIGHT_MESSAGES = Gauge(
+    'cortex_nlp_in_flight_messages',
+    'Messages accepted by the dispatcher and not yet completed'
+)
+
+OFFSET_COMMITS = Counter(
+    'cortex_nlp_offset_commits_total',
+    'Manual offset commits',
+    ['status']
+)
+
+EXPIRED_SIGNALS = Counter(
+    'cortex_nlp_expired_signals_total',
+    'Signals whose ttl elapsed before or during processing',
+    ['type', 'action']
+)
+
+SESSION_RESYNCS = Counter(
+    'cortex_nlp_session_resyncs_total',
+    'Delta-protocol sequence gaps reported to clients and history resyncs applied',
+    ['event']
+)
+
+PAUSED_PARTITIONS = Gauge(
+    'cortex_nlp_paused_partitions',
+    'Input partitions paused while the LLM circuit breaker is open'
+)
+
 # ============================================
 # CLIENTS GLOBAUX
 # ============================================
@@ -112,63 +285,356 @@ ACTIVE_CONVERSATIONS = Gauge(
 consumer: Optional[AIOKafkaConsumer] = None
 producer: Optional[AIOKafkaProducer] = None
 redis_client: Optional[redis.Redis] = None
+state_manager: Optional["ConversationStateManager"] = None
 http_client: Optional[httpx.AsyncClient] = None
 
 # ============================================
 # LLM CLIENT
 # ============================================
 
+
 class LLMClient:
-    """Client pour l'API LLM (Lovable AI Gateway)"""
+    """Client pour l'API LLM (Lovable AI Gateway), sur une ou plusieurs URLs de passerelle"""
     
-    def __init__(self, http_client: httpx.AsyncClient, api_key: str, api_url: str):
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        api_key: str,
+        api_url: Union[str, List[str]],
+        max_context_tokens: int = LLM_CONTEXT_MAX_TOKENS,
+        recent_turns: int = LLM_CONTEXT_RECENT_TURNS,
+        cache_intents: Set[str] = LLM_CACHE_INTENTS,
+        guard: Optional[GatewayGuard] = None,
+        name: str = "chat"
+    ):
         self.client = http_client
         self.api_key = api_key
-        self.api_url = api_url
+        self.endpoints = EndpointSelector(
+            [api_url] if isinstance(api_url, str) else api_url,
+            name=name,
+            cooldown=LLM_ENDPOINT_COOLDOWN_SECONDS
+        )
+        self.max_context_tokens = max_context_tokens
+        self.recent_messages = recent_turns * 2  # Un tour = message utilisateur + réponse
+        self.cache_intents = cache_intents
+        self.response_cache = (
+            LRUCache(LLM_CACHE_SIZE, LLM_CACHE_TTL_SECONDS, name="llm_response")
+            if cache_intents else None
+        )
+        self.guard = guard or GatewayGuard(
+            AdaptiveLimiter(
+                initial=LLM_LIMIT_INITIAL,
+                min_limit=LLM_LIMIT_MIN,
+                max_limit=LLM_LIMIT_MAX,
+                latency_target=LLM_LATENCY_TARGET_SECONDS
+            ),
+            CircuitBreaker(
+                error_rate=LLM_BREAKER_ERROR_RATE,
+                min_requests=LLM_BREAKER_MIN_REQUESTS,
+                window=LLM_BREAKER_WINDOW,
+                reset_seconds=LLM_BREAKER_RESET_SECONDS
+            )
+        )
     
     async def generate_response(
         self,
         messages: List[ConversationMessage],
         prospect_info: Dict[str, Any],
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        message_count: Optional[int] = None,
+        cache_intent: Optional[str] = None,
+        deadline: Optional[float] = None
     ) -> str:
-        """Génère une réponse via le LLM"""
+        """Génère une réponse via le LLM (servie depuis le cache si l'intention y est éligible)"""
+        
+        cache_key = self._response_cache_key(messages, system_prompt, message_count, cache_intent)
+        if cache_key:
+            cached = self._cached_response(cache_key, cache_intent)
+            if cached is not None:
+                return cached
+            # Réponse partagée entre prospects: générée sans nom ni entreprise,
+            # comme le gabarit qui sert de clé
+            prospect_info = {}
+        
+        llm_messages = self._build_llm_messages(messages, prospect_info, system_prompt, message_count)
+        started = time.perf_counter()
+        
+        try:
+            async with self.guard.slot(max_wait=self._timeout(deadline)):
+                with LLM_LATENCY.time(), self.endpoints.call() as call, self._deadline_scope(deadline) as timeout:
+                    response = await self.client.post(
+                        call.url,
+                        headers=self._headers(),
+                        json={
+                            "model": LLM_MODEL,
+                            "messages": llm_messages,
+                            "stream": False
+                        },
+                        timeout=timeout
+                    )
+                    
+                    if response.status_code != 200:
+                        raise Exception(f"LLM API error: {response.status_code}")
+                    
+                    data = response.json()
+                    content = data["choices"][0]["message"]["content"]
+            
+            LLM_REQUESTS.labels(status="success").inc()
+            if cache_key:
+                self.response_cache.set(cache_key, (content, time.perf_counter() - started))
+            return content
+                
+        except (CircuitOpenError, DeadlineExceeded):
+            LLM_REQUESTS.labels(status="rejected").inc()
+            raise
+        except Exception as e:
+            LLM_REQUESTS.labels(status="error").inc()
+            raise e
+    
+    async def stream_response(
+        self,
+        messages: List[ConversationMessage],
+        prospect_info: Dict[str, Any],
+        system_prompt: Optional[str] = None,
+        message_count: Optional[int] = None,
+        cache_intent: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Génère une réponse en streaming (SSE) et produit les fragments au fil de l'eau"""
         
+        cache_key = self._response_cache_key(messages, system_prompt, message_count, cache_intent)
+        if cache_key:
+            cached = self._cached_response(cache_key, cache_intent)
+            if cached is not None:
+                yield cached
+                return
+            prospect_info = {}  # Voir generate_response
+        
+        llm_messages = self._build_llm_messages(messages, prospect_info, system_prompt, message_count)
+        started = time.perf_counter()
+        first_token = True
+        parts = []
+        
+        try:
+            async with self.guard.slot(max_wait=self._timeout(deadline)):
+                with LLM_LATENCY.time(), self.endpoints.call() as call, self._deadline_scope(deadline) as timeout:
+                    async with self.client.stream(
+                        "POST",
+                        call.url,
+                        headers=self._headers(),
+                        json={
+                            "model": LLM_MODEL,
+                            "messages": llm_messages,
+                            "stream": True
+                        },
+                        timeout=timeout
+                    ) as response:
+                        if response.status_code != 200:
+                            raise Exception(f"LLM API error: {response.status_code}")
+                        call.responded()
+                        
+                        # Le timeout httpx s'applique à chaque lecture: l'échéance du
+                        # signal borne en plus le flux entier (fragments au compte-gouttes)
+                        lines = response.aiter_lines()
+                        while True:
+                            try:
+                                line = await self._within_deadline(lines.__anext__, deadline)
+                            except StopAsyncIteration:
+                                break
+                            # Format SSE: "data: {...}" ... "data: [DONE]"
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                break
+                            choices = json.loads(data).get("choices") or [{}]
+                            content = (choices[0].get("delta") or {}).get("content")
+                            if not content:
+                                continue
+                            if first_token:
+                                LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started)
+                                first_token = False
+                            if cache_key:
+                                parts.append(content)
+                            yield content
+            
+            LLM_REQUESTS.labels(status="success").inc()
+            if cache_key:
+                self.response_cache.set(cache_key, ("".join(parts), time.perf_counter() - started))
+                
+        except (CircuitOpenError, DeadlineExceeded):
+            LLM_REQUESTS.labels(status="rejected").inc()
+            raise
+        except Exception as e:
+            LLM_REQUESTS.labels(status="error").inc()
+            raise e
+    
+    def _response_cache_key(
+        self,
+        messages: List[ConversationMessage],
+        system_prompt: Optional[str],
+        message_count: Optional[int],
+        cache_intent: Optional[str]
+    ) -> Optional[str]:
+        """
+        Clé du cache de réponses, ou None si la requête n'y est pas éligible.
+        
+        Seules les conversations courtes, sans prompt personnalisé ni résumé,
+        sont éligibles. La clé combine le gabarit du prompt système (sans nom
+        ni entreprise du prospect, donc avec la phase), l'intention et les
+        messages utilisateur normalisés; une réponse éligible est générée
+        avec ce même gabarit, elle ne contient donc rien du prospect.
+        """
+        if self.response_cache is None or cache_intent not in self.cache_intents or system_prompt:
+            return None
+        count = len(messages) if message_count is None else message_count
+        if count > LLM_CACHE_MAX_MESSAGES or any(m.role == "system" for m in messages):
+            return None
+        
+        parts = [
+            self._build_system_prompt({}, count),
+            cache_intent,
+            *[normalize_text(m.content) for m in messages if m.role == "user"]
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    
+    def _cached_response(self, cache_key: str, cache_intent: str) -> Optional[str]:
+        entry = self.response_cache.get(cache_key)
+        if entry is None:
+            return None
+        response, latency = entry
+        LLM_CACHE_SAVED.labels(intent=cache_intent).inc(latency)
+        return response
+    
+    @staticmethod
+    def _timeout(deadline: Optional[float]) -> float:
+        """Délai accordé à l'appel: le reste du budget du signal, plafonné à LLM_TIMEOUT_SECONDS"""
+        if deadline is None:
+            return LLM_TIMEOUT_SECONDS
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceeded("Signal deadline exceeded before the LLM call")
+        return min(LLM_TIMEOUT_SECONDS, remaining)
+    
+    @staticmethod
+    async def _within_deadline(step: Callable[[], Awaitable[Any]], deadline: Optional[float]) -> Any:
+        """Exécute `step()` sans dépasser l'échéance du signal (DeadlineExceeded sinon)"""
+        if deadline is None:
+            return await step()
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceeded("Signal deadline exceeded during the LLM stream")
+        try:
+            async with asyncio.timeout(remaining):
+                return await step()
+        except TimeoutError as e:
+            raise DeadlineExceeded("Signal deadline exceeded during the LLM stream") from e
+    
+    @classmethod
+    @contextmanager
+    def _deadline_scope(cls, deadline: Optional[float]) -> Iterator[float]:
+        """Fournit le délai de l'appel HTTP; un timeout dû au budget du signal devient DeadlineExceeded"""
+        timeout = cls._timeout(deadline)
+        try:
+            yield timeout
+        except httpx.TimeoutException as e:
+            if timeout < LLM_TIMEOUT_SECONDS:
+                raise DeadlineExceeded("Signal deadline exceeded during the LLM call") from e
+            raise
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _build_llm_messages(
+        self,
+        messages: List[ConversationMessage],
+        prospect_info: Dict[str, Any],
+        system_prompt: Optional[str],
+        message_count: Optional[int] = None
+    ) -> List[Dict[str, str]]:
         if not system_prompt:
-            system_prompt = self._build_system_prompt(prospect_info, len(messages))
+            count = len(messages) if message_count is None else message_count
+            system_prompt = self._build_system_prompt(prospect_info, count)
         
         llm_messages = [
             {"role": "system", "content": system_prompt},
             *[{"role": m.role, "content": m.content} for m in messages]
         ]
+        LLM_PROMPT_TOKENS.observe(sum(self.count_tokens(m["content"]) for m in llm_messages))
+        return llm_messages
+    
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """Estime le nombre de tokens d'un message (contenu + enveloppe de rôle)"""
+        return math.ceil(len(text) / LLM_CHARS_PER_TOKEN) + 4
+    
+    def build_context(
+        self,
+        messages: List[ConversationMessage],
+        summary: Optional[Dict[str, Any]] = None
+    ) -> List[ConversationMessage]:
+        """
+        Assemble le contexte envoyé au LLM dans le budget de tokens.
         
-        with LLM_LATENCY.time():
-            try:
-                response = await self.client.post(
-                    self.api_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "google/gemini-2.5-flash",
-                        "messages": llm_messages,
-                        "stream": False
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    LLM_REQUESTS.labels(status="success").inc()
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    LLM_REQUESTS.labels(status="error").inc()
-                    raise Exception(f"LLM API error: {response.status_code}")
-                    
-            except Exception as e:
-                LLM_REQUESTS.labels(status="error").inc()
-                raise e
+        Le résumé glissant (messages déjà repliés) vient en tête, puis les
+        messages non résumés, du plus récent au plus ancien, tant que le
+        budget le permet. Le dernier message est toujours conservé.
+        """
+        budget = self.max_context_tokens
+        head = []
+        if summary and summary.get("text"):
+            summary_message = ConversationMessage(
+                role="system",
+                content=f"Résumé de la conversation précédente:\n{summary['text']}"
+            )
+            head.append(summary_message)
+            budget -= self.count_tokens(summary_message.content)
+        
+        selected: List[ConversationMessage] = []
+        for message in reversed(messages):
+            cost = self.count_tokens(message.content)
+            if selected and cost > budget:
+                break
+            selected.append(message)
+            budget -= cost
+        
+        return head + selected[::-1]
+    
+    def messages_to_summarize(self, messages: List[ConversationMessage]) -> int:
+        """Nombre de messages anciens à replier dans le résumé (0 si pas encore utile)"""
+        foldable = len(messages) - self.recent_messages
+        return foldable if foldable >= LLM_SUMMARY_MIN_MESSAGES else 0
+    
+    async def summarize(
+        self,
+        messages: List[ConversationMessage],
+        prospect_info: Dict[str, Any],
+        previous_summary: Optional[str] = None
+    ) -> str:
+        """Met à jour le résumé glissant avec des messages plus anciens"""
+        
+        conversation_text = "\n\n".join([
+            f"{m.role.upper()}: {m.content}" for m in messages
+        ])
+        
+        system_prompt = f"""Tu résumes une conversation commerciale de NTSAGUI Digital pour la suite de l'échange.
+
+Conserve: besoins exprimés, contexte de l'entreprise, budget, délais, objections, engagements pris et questions restées ouvertes.
+Sois factuel et concis (10 lignes maximum), dans la langue de la conversation.
+
+RÉSUMÉ EXISTANT:
+{previous_summary or "Aucun"}
+
+NOUVEAUX MESSAGES À INTÉGRER:
+{conversation_text}
+
+Produis le résumé mis à jour."""
+
+        with SUMMARY_TIME.time():
+            return await self.generate_response([], prospect_info, system_prompt)
     
     async def generate_report(
         self,
@@ -230,27 +696,245 @@ PROSPECT:
 # CONVERSATION STATE MANAGER
 # ============================================
 
+# Ajout atomique à l'historique (liste Redis) en un seul aller-retour:
+# migration éventuelle de l'ancien format JSON, écriture des infos prospect,
+# RPUSH + LTRIM + EXPIRE, mise à jour de l'index d'activité et de l'état de
+# qualification, puis lecture de la fenêtre demandée.
+#   KEYS[1] = conversation:{session_id}   KEYS[2] = prospect:{session_id}
+#   KEYS[3] = index d'activité (sorted set session -> dernier message, ms)
+#   KEYS[4] = summary:{session_id} (résumé glissant, même TTL)
+#   KEYS[5] = qualification:{session_id} (hash: messages, phone, kw:<mot-clé>)
+#   ARGV[1] = ttl  ARGV[2] = max messages  ARGV[3] = fenêtre (0 = aucune lecture)
+#   ARGV[4] = infos prospect JSON ("" = inchangées)  ARGV[5] = maintenant (ms)
+#   ARGV[6] = session_id  ARGV[7] = delta de qualification JSON ("" = aucun)
+#   ARGV[8..] = messages JSON
+APPEND_MESSAGES_SCRIPT = """
+local key = KEYS[1]
+if redis.call('TYPE', key).ok == 'string' then
+    local legacy = cjson.decode(redis.call('GET', key))
+    redis.call('DEL', key)
+    for _, message in ipairs(legacy) do
+        redis.call('RPUSH', key, cjson.encode(message))
+    end
+end
+if ARGV[4] ~= '' then
+    redis.call('SET', KEYS[2], ARGV[4], 'EX', ARGV[1])
+end
+if #ARGV >= 8 then
+    redis.call('RPUSH', key, unpack(ARGV, 8))
+    redis.call('ZADD', KEYS[3], ARGV[5], ARGV[6])
+end
+if ARGV[7] ~= '' then
+    local update = cjson.decode(ARGV[7])
+    if redis.call('EXISTS', KEYS[5]) == 0 and redis.call('LLEN', key) > #ARGV - 7 then
+        -- Historique antérieur au suivi incrémental: reconstruit à la lecture
+        redis.call('HSET', KEYS[5], 'partial', 1)
+    end
+    redis.call('HINCRBY', KEYS[5], 'messages', update.messages)
+    for _, keyword in ipairs(update.keywords) do
+        redis.call('HSET', KEYS[5], 'kw:' .. keyword, 1)
+    end
+    if update.phone then
+        redis.call('HSET', KEYS[5], 'phone', 1)
+    end
+end
+redis.call('LTRIM', key, -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', key, ARGV[1])
+redis.call('EXPIRE', KEYS[4], ARGV[1])
+redis.call('EXPIRE', KEYS[5], ARGV[1])
+local window = tonumber(ARGV[3])
+if window > 0 then
+    return redis.call('LRANGE', key, -window, -1)
+end
+return {}
+"""
+
+# Remplacement des `covered` premiers messages par le résumé glissant.
+# Les messages récents sont ajoutés en queue: la tête repliée reste stable.
+#   KEYS[1] = conversation:{session_id}   KEYS[2] = summary:{session_id}
+#   ARGV[1] = ttl  ARGV[2] = résumé JSON  ARGV[3] = nombre de messages repliés
+APPLY_SUMMARY_SCRIPT = """
+if redis.call('LLEN', KEYS[1]) < tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[1])
+redis.call('LTRIM', KEYS[1], ARGV[3], -1)
+return 1
+"""
+
+
 class ConversationStateManager:
     """Gère l'état des conversations en Redis (mémoire court-terme)"""
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        max_messages: int = CONVERSATION_MAX_MESSAGES,
+        claims: Optional[ClaimCheck] = None
+    ):
         self.redis = redis_client
         self.ttl = 3600  # 1 heure
+        self.max_messages = max_messages
+        self.claims = claims
+        self._append = redis_client.register_script(APPEND_MESSAGES_SCRIPT)
+        self._apply_summary = redis_client.register_script(APPLY_SUMMARY_SCRIPT)
     
     async def get_conversation(self, session_id: str) -> List[Dict[str, str]]:
         """Récupère l'historique de conversation"""
         key = f"conversation:{session_id}"
-        data = await self.redis.get(key)
-        if data:
-            return json.loads(data)
-        return []
+        try:
+            items = await self.redis.lrange(key, 0, -1)
+        except redis.ResponseError:
+            # Ancien format (chaîne JSON), pas encore migré
+            data = await self.redis.get(key)
+            return json.loads(data) if data else []
+        return await self._decode_messages(items)
+    
+    async def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        prospect_info: Optional[Dict[str, Any]] = None,
+        window: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Ajoute un message à la conversation et retourne l'historique.
+        
+        Un seul aller-retour Redis (script Lua): les infos prospect éventuelles
+        sont écrites dans le même appel, et les `window` derniers messages
+        (par défaut tout l'historique conservé, 0 pour aucun) sont renvoyés.
+        """
+        messages = [{"role": role, "content": content}]
+        return await self._append_messages(
+            session_id,
+            messages,
+            prospect_info,
+            self.max_messages if window is None else window,
+            qualification_update(messages, prospect_info)
+        )
+    
+    async def _append_messages(
+        self,
+        session_id: str,
+        messages: List[Dict[str, str]],
+        prospect_info: Optional[Dict[str, Any]],
+        window: int,
+        update: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, str]]:
+        items = await self._append(
+            keys=[
+                f"conversation:{session_id}",
+                f"prospect:{session_id}",
+                ACTIVE_INDEX_KEY,
+                f"summary:{session_id}",
+                f"qualification:{session_id}"
+            ],
+            args=[
+                self.ttl,
+                self.max_messages,
+                window,
+                json.dumps(prospect_info) if prospect_info is not None else "",
+                int(time.time() * 1000),
+                session_id,
+                json.dumps(update) if update else "",
+                *await self._encode_messages(messages)
+            ]
+        )
+        return await self._decode_messages(items)
+    
+    async def _encode_messages(self, messages: List[Dict[str, str]]) -> List[str]:
+        """Sérialise les messages; les contenus volumineux deviennent des références de blob"""
+        if self.claims is None:
+            return [json.dumps(m) for m in messages]
+        return [
+            json.dumps({**m, "content": await self.claims.offload(m["content"], "history")})
+            for m in messages
+        ]
+    
+    async def _decode_messages(self, items: List[bytes]) -> List[Dict[str, str]]:
+        messages = [json.loads(item) for item in items]
+        if self.claims is None:
+            return messages
+        for message in messages:
+            if is_ref(message.get("content")):
+                try:
+                    message["content"] = await self.claims.resolve(message["content"])
+                except BlobNotFound:
+                    print(f"⚠️ Missing blob {message['content'].get('$blob')} in conversation history")
+                    message["content"] = ""
+        return messages
+    
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère le résumé glissant ({"text", "covered"}) s'il existe"""
+        data = await self.redis.get(f"summary:{session_id}")
+        return json.loads(data) if data else None
     
-    async def add_message(self, session_id: str, role: str, content: str):
-        """Ajoute un message à la conversation"""
+    async def apply_summary(self, session_id: str, summary: Dict[str, Any], folded: int) -> bool:
+        """Enregistre le résumé et retire de l'historique les `folded` messages qu'il couvre"""
+        applied = await self._apply_summary(
+            keys=[f"conversation:{session_id}", f"summary:{session_id}"],
+            args=[self.ttl, json.dumps(summary), folded]
+        )
+        return bool(applied)
+    
+    async def replace_history(self, session_id: str, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Remplace l'historique par celui renvoyé par le client (resync du
+        protocole delta). Le résumé est abandonné et l'état de qualification
+        sera reconstruit depuis le nouvel historique.
+        """
+        messages = messages[-self.max_messages:]
         key = f"conversation:{session_id}"
-        history = await self.get_conversation(session_id)
-        history.append({"role": role, "content": content})
-        await self.redis.setex(key, self.ttl, json.dumps(history))
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key, f"summary:{session_id}", f"qualification:{session_id}")
+            if messages:
+                pipe.rpush(key, *await self._encode_messages(messages))
+                pipe.expire(key, self.ttl)
+            await pipe.execute()
+        return messages
+    
+    async def get_qualification(self, session_id: str) -> QualificationState:
+        """
+        État de qualification cumulé de la session (une lecture de hash).
+        
+        Pour une session antérieure au suivi incrémental, l'état est
+        reconstruit une fois depuis l'historique conservé et le résumé,
+        lus dans Redis même derrière un cache local: la session peut
+        appartenir à un autre consommateur.
+        """
+        key = f"qualification:{session_id}"
+        data = await self.redis.hgetall(key)
+        if data and b"partial" not in data:
+            return QualificationState.from_hash(data)
+        
+        history = await ConversationStateManager.get_conversation(self, session_id)
+        if not history:
+            return QualificationState()
+        summary = await ConversationStateManager.get_summary(self, session_id) or {}
+        prospect_info = await ConversationStateManager.get_prospect_info(self, session_id)
+        state = QualificationState()
+        state.apply(qualification_update(history, prospect_info))
+        state.messages += summary.get("covered", 0)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={
+                "messages": state.messages,
+                "phone": int(state.phone),
+                **{f"kw:{kw}": 1 for kw in state.keywords}
+            })
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        return state
+    
+    async def migrate_legacy(self, batch_size: int = 500) -> int:
+        """Convertit les historiques au format chaîne JSON en listes; retourne le nombre migré"""
+        migrated = 0
+        async for key in self.redis.scan_iter(match="conversation:*", count=batch_size, _type="string"):
+            session_id = key.decode("utf-8").split(":", 1)[1]
+            await self._append_messages(session_id, [], None, 0)
+            migrated += 1
+        return migrated
     
     async def get_prospect_info(self, session_id: str) -> Dict[str, Any]:
         """Récupère les infos du prospect"""
@@ -265,10 +949,171 @@ class ConversationStateManager:
         key = f"prospect:{session_id}"
         await self.redis.setex(key, self.ttl, json.dumps(info))
     
+    def track_partition(self, session_id: str, partition: Any):
+        """Associe une session à la partition Kafka qui la porte (sans effet ici)"""
+    
+    def invalidate_partitions(self, partitions: Any):
+        """Oublie l'état local des partitions révoquées (sans effet ici)"""
+    
     async def count_active(self) -> int:
-        """Compte les conversations actives"""
-        keys = await self.redis.keys("conversation:*")
-        return len(keys)
+        """Compte les conversations actives (dernier message il y a moins de `ttl`)"""
+        cutoff = int(time.time() * 1000) - self.ttl * 1000
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(ACTIVE_INDEX_KEY, "-inf", cutoff)
+            pipe.zcard(ACTIVE_INDEX_KEY)
+            _, count = await pipe.execute()
+        return count
+    
+    async def active_since(self, minutes: float, limit: int = 100) -> Dict[str, Any]:
+        """Sessions actives durant les `minutes` dernières minutes (plus récentes d'abord)"""
+        cutoff = int(time.time() * 1000 - minutes * 60000)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcount(ACTIVE_INDEX_KEY, cutoff, "+inf")
+            pipe.zrevrangebyscore(ACTIVE_INDEX_KEY, "+inf", cutoff, start=0, num=limit, withscores=True)
+            count, sessions = await pipe.execute()
+        return {
+            "count": count,
+            "sessions": [
+                {"session_id": sid.decode("utf-8"), "last_seen": int(score)}
+                for sid, score in sessions
+            ]
+        }
+
+
+class CachedConversationStateManager(ConversationStateManager):
+    """
+    État des conversations avec cache LRU local devant Redis.
+    
+    Les sessions d'une partition Kafka ne sont traitées que par un seul
+    consommateur: les lectures sont servies localement, les écritures
+    traversent vers Redis, et le cache d'une partition est vidé quand un
+    rebalancing la révoque.
+    """
+    
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        max_messages: int = CONVERSATION_MAX_MESSAGES,
+        cache_size: int = CONVERSATION_CACHE_SIZE,
+        cache_ttl: float = CONVERSATION_CACHE_TTL_SECONDS,
+        claims: Optional[ClaimCheck] = None
+    ):
+        super().__init__(redis_client, max_messages, claims)
+        # Le TTL local reste inférieur au TTL Redis
+        cache_ttl = min(cache_ttl, self.ttl)
+        self.histories = LRUCache(cache_size, cache_ttl, name="conversation")
+        self.prospects = LRUCache(cache_size, cache_ttl, name="prospect")
+        self.summaries = LRUCache(cache_size, cache_ttl, name="summary")
+        self.qualifications = LRUCache(cache_size, cache_ttl, name="qualification")
+        self._partitions = LRUCache(cache_size, cache_ttl)
+    
+    def track_partition(self, session_id: str, partition: Any):
+        self._partitions.set(session_id, partition)
+    
+    def invalidate_partitions(self, partitions: Any):
+        # Ne sont gardées que les sessions d'une partition encore assignée: celles
+        # dont l'index a été évincé ou a expiré avant leurs données sont oubliées
+        revoked = set(partitions)
+        kept = {sid for sid, partition in self._partitions.items() if partition not in revoked}
+        for cache in (self.histories, self.prospects, self.summaries, self.qualifications, self._partitions):
+            cache.evict_where(lambda sid, value: sid not in kept)
+    
+    async def get_conversation(self, session_id: str) -> List[Dict[str, str]]:
+        history = self.histories.get(session_id)
+        if history is None:
+            history = await super().get_conversation(session_id)
+            self.histories.set(session_id, history)
+        return list(history)
+    
+    async def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        prospect_info: Optional[Dict[str, Any]] = None,
+        window: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        window = self.max_messages if window is None else window
+        cached = self.histories.get(session_id)
+        
+        if cached is None:
+            # Lecture complète pour remplir le cache, sauf si aucune fenêtre n'est demandée
+            history = await super().add_message(
+                session_id, role, content, prospect_info,
+                window=self.max_messages if window else 0
+            )
+            if window:
+                self.histories.set(session_id, history)
+        else:
+            # Écriture seule: l'historique est déjà connu localement. La liste en
+            # cache est modifiée sur place, comme par `apply_summary`, pour que
+            # les deux mises à jour concurrentes se composent
+            await super().add_message(session_id, role, content, prospect_info, window=0)
+            cached.append({"role": role, "content": content})
+            del cached[:-self.max_messages]
+            self.histories.set(session_id, cached)
+            history = cached
+        
+        if prospect_info is not None:
+            self.prospects.set(session_id, prospect_info)
+        qualification = self.qualifications.get(session_id)
+        if qualification is not None:
+            qualification.apply(qualification_update([{"role": role, "content": content}], prospect_info))
+        return history[-window:] if window else []
+    
+    async def get_prospect_info(self, session_id: str) -> Dict[str, Any]:
+        info = self.prospects.get(session_id)
+        if info is None:
+            info = await super().get_prospect_info(session_id)
+            self.prospects.set(session_id, info)
+        return dict(info)
+    
+    async def set_prospect_info(self, session_id: str, info: Dict[str, Any]):
+        await super().set_prospect_info(session_id, info)
+        self.prospects.set(session_id, info)
+    
+    async def get_qualification(self, session_id: str) -> QualificationState:
+        qualification = self.qualifications.get(session_id)
+        if qualification is None:
+            qualification = await super().get_qualification(session_id)
+            self.qualifications.set(session_id, qualification)
+        return qualification
+    
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Absence de résumé mise en cache sous la forme {}
+        summary = self.summaries.get(session_id)
+        if summary is None:
+            summary = await super().get_summary(session_id) or {}
+            self.summaries.set(session_id, summary)
+        return summary or None
+    
+    async def replace_history(self, session_id: str, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        messages = await super().replace_history(session_id, messages)
+        self.histories.set(session_id, list(messages))
+        self.summaries.set(session_id, {})
+        self.qualifications.pop(session_id)
+        return messages
+    
+    async def apply_summary(self, session_id: str, summary: Dict[str, Any], folded: int) -> bool:
+        applied = await super().apply_summary(session_id, summary, folded)
+        if applied:
+            self.summaries.set(session_id, summary)
+            history = self.histories.get(session_id)
+            if history is not None and len(history) >= folded:
+                del history[:folded]
+            elif history is not None:
+                self.histories.pop(session_id)
+        return applied
+
+
+def create_state_manager(
+    redis_client: redis.Redis,
+    claims: Optional[ClaimCheck] = None
+) -> ConversationStateManager:
+    """Instancie le gestionnaire d'état, avec cache local si configuré"""
+    if CONVERSATION_CACHE_SIZE > 0:
+        return CachedConversationStateManager(redis_client, claims=claims)
+    return ConversationStateManager(redis_client, claims=claims)
 
 
 # ============================================
@@ -282,11 +1127,19 @@ class MessageProcessor:
         self,
         llm_client: LLMClient,
         state_manager: ConversationStateManager,
-        producer: AIOKafkaProducer
+        producer: AIOKafkaProducer,
+        claims: Optional[ClaimCheck] = None
     ):
         self.llm = llm_client
         self.state = state_manager
         self.producer = producer
+        self.claims = claims
+        self._summarizing: Dict[str, asyncio.Task] = {}
+        self.flights = SingleFlight(window=LLM_SINGLEFLIGHT_WINDOW_SECONDS)
+        # Dernier message prospect enregistré par session (forme normalisée)
+        self._last_turns = LRUCache(100_000, LLM_SINGLEFLIGHT_WINDOW_SECONDS)
+        self.codec = SignalCodec(SIGNAL_FORMAT)
+        self.intents = IntentEngine()
     
     async def process_lead_message(self, signal: Dict[str, Any]):
         """Traite un signal LEAD_MESSAGE_RECEIVED"""
@@ -296,54 +1149,80 @@ class MessageProcessor:
             session_id = payload.get("session_id")
             message = payload.get("message", "")
             prospect_info = payload.get("prospect_info", {})
-            correlation_id = signal.get("correlation_id", str(uuid.uuid4()))
-            
-            # Stocker les infos prospect
-            await self.state.set_prospect_info(session_id, prospect_info)
+            correlation_id = signal.get("correlation_id") or new_signal_id()
+            deadline = signal_deadline(signal)
+            deliveries = []
             
-            # Ajouter le message utilisateur à l'historique
-            await self.state.add_message(session_id, "user", message)
-            
-            # Récupérer l'historique complet
-            history = await self.state.get_conversation(session_id)
-            messages = [ConversationMessage(role=m["role"], content=m["content"]) for m in history]
+            # Protocole delta: trou de séquence signalé au client, historique
+            # complet renvoyé par le client en réponse
+            if payload.get("gap"):
+                deliveries.append(await self._request_resync(session_id, payload["gap"], correlation_id))
+            if "seq" in payload and "conversation_history" in payload:
+                await self.state.replace_history(session_id, [
+                    {"role": m["role"], "content": m["content"]}
+                    for m in payload["conversation_history"]
+                    if isinstance(m, dict) and "role" in m and "content" in m
+                ])
+                SESSION_RESYNCS.labels(event="applied").inc()
             
             # Analyser l'intention
             intent_signal = await self._detect_intent(session_id, message, correlation_id)
-            await self._produce_signal(TOPIC_INTELLIGENCE, intent_signal)
+            deliveries.append(await self._produce_signal(TOPIC_INTELLIGENCE, intent_signal))
+            intent = intent_signal.payload["intent"]
             
-            # Générer la réponse LLM
+            # Générer la réponse LLM: un renvoi du même texte (nouvel identifiant
+            # de signal: relance du frontend, WebSocket) déjà en cours ou tout
+            # juste traité est rejoint au lieu d'être regénéré, tant qu'aucun
+            # autre message de la session n'a été enregistré entre-temps. En
+            # protocole delta, les renvois sont déjà écartés par `seq` en amont:
+            # un même texte sous un nouveau `seq` est un nouveau message.
+            turn = normalize_text(message)
+            reuse = "seq" not in payload and self._last_turns.get(session_id) == turn
             try:
-                response = await self.llm.generate_response(messages, prospect_info)
-                
-                # Stocker la réponse dans l'historique
-                await self.state.add_message(session_id, "assistant", response)
+                (response, sequence, message_count), coalesced = await self.flights.do(
+                    (session_id, turn),
+                    lambda: self._generate(
+                        session_id, message, prospect_info, intent, correlation_id, deliveries, deadline
+                    ),
+                    reuse=reuse
+                )
+                if coalesced:
+                    LLM_COALESCED.labels(mode=coalesced).inc()
                 
-                # Émettre le signal de réponse
-                response_signal = SignalPondere(
+                # Émettre le signal de réponse (marqueur final en streaming)
+                response_signal = SignalPondere.trusted(
                     type="ASSISTANT_RESPONSE",
+                    source=CortexId.NLP,
                     payload={
                         "session_id": session_id,
                         "response": response,
-                        "message_count": len(messages) + 1
+                        "message_count": message_count + 1,
+                        "sequence": sequence,
+                        "final": True,
+                        "coalesced": coalesced is not None
                     },
                     confiance=0.9,
                     correlation_id=correlation_id,
-                    metadata=SignalMetadata(priority="NORMAL")
+                    priority="NORMAL"
                 )
-                await self._produce_signal(TOPIC_OUTPUT, response_signal)
+                deliveries.append(await self._produce_signal(TOPIC_OUTPUT, response_signal))
                 
-                # Vérifier si qualification nécessaire
-                if len(messages) >= 6:
+                # Vérifier si qualification nécessaire (une seule fois par génération)
+                if message_count >= 6 and not coalesced:
                     qualification = await self._evaluate_qualification(
-                        session_id, messages, prospect_info, correlation_id
+                        session_id, await self.state.get_qualification(session_id),
+                        prospect_info, correlation_id
                     )
-                    await self._produce_signal(TOPIC_QUALIFICATION, qualification)
+                    deliveries.append(await self._produce_signal(TOPIC_QUALIFICATION, qualification))
                 
+            except DeadlineExceeded:
+                # Budget épuisé en attente du LLM: inutile de répondre
+                deliveries.extend(await self.expire_signal(signal, "timeout"))
             except Exception as e:
                 # Émettre erreur
-                error_signal = SignalPondere(
+                error_signal = SignalPondere.trusted(
                     type="ERROR_PROCESSING_FAILED",
+                    source=CortexId.NLP,
                     payload={
                         "session_id": session_id,
                         "error": str(e),
@@ -351,13 +1230,200 @@ class MessageProcessor:
                     },
                     confiance=1.0,
                     correlation_id=correlation_id,
-                    metadata=SignalMetadata(priority="HIGH")
+                    priority="HIGH"
                 )
-                await self._produce_signal(TOPIC_ERRORS, error_signal)
+                deliveries.append(await self._produce_signal(TOPIC_ERRORS, error_signal))
             
-            # Mettre à jour les métriques
-            count = await self.state.count_active()
-            ACTIVE_CONVERSATIONS.set(count)
+            # Attendre les acks avant de rendre la main (l'offset sera committé ensuite);
+            # les échecs sont rapportés signal par signal
+            results = await asyncio.gather(*deliveries, return_exceptions=True)
+            failed = sum(1 for r in results if isinstance(r, BaseException))
+            if failed:
+                raise Exception(f"{failed} output signal(s) not delivered")
+    
+    async def _generate(
+        self,
+        session_id: str,
+        message: str,
+        prospect_info: Dict[str, Any],
+        intent: str,
+        correlation_id: str,
+        deliveries: List[asyncio.Future],
+        deadline: Optional[float] = None
+    ) -> Tuple[str, int, int]:
+        """Enregistre le message, génère et enregistre la réponse; retourne (réponse, fragments, nb messages)"""
+        
+        # Stocker les infos prospect et le message utilisateur,
+        # et récupérer l'historique dans le même aller-retour
+        history = await self.state.add_message(
+            session_id, "user", message, prospect_info=prospect_info
+        )
+        self._last_turns.set(session_id, normalize_text(message))
+        messages = [ConversationMessage(role=m["role"], content=m["content"]) for m in history]
+        
+        # Contexte LLM: résumé glissant + messages récents dans le budget de tokens
+        summary = await self.state.get_summary(session_id)
+        message_count = (summary or {}).get("covered", 0) + len(messages)
+        context = self.llm.build_context(messages, summary)
+        
+        if LLM_STREAMING:
+            response, sequence = await self._stream_response(
+                session_id, context, prospect_info, message_count,
+                intent, correlation_id, deliveries, deadline
+            )
+        else:
+            response = await self.llm.generate_response(
+                context, prospect_info, message_count=message_count,
+                cache_intent=intent, deadline=deadline
+            )
+            sequence = 0
+        
+        # Stocker la réponse complète dans l'historique
+        await self.state.add_message(session_id, "assistant", response, window=0)
+        self._schedule_summary(session_id, messages, summary, prospect_info)
+        
+        return response, sequence, message_count
+    
+    def _schedule_summary(
+        self,
+        session_id: str,
+        messages: List[ConversationMessage],
+        summary: Optional[Dict[str, Any]],
+        prospect_info: Dict[str, Any]
+    ):
+        """Lance en tâche de fond le repli des messages anciens dans le résumé glissant"""
+        folded = self.llm.messages_to_summarize(messages)
+        if not folded or session_id in self._summarizing:
+            return
+        task = asyncio.create_task(
+            self._summarize(session_id, messages[:folded], summary or {}, prospect_info)
+        )
+        self._summarizing[session_id] = task
+        task.add_done_callback(lambda _: self._summarizing.pop(session_id, None))
+    
+    async def _summarize(
+        self,
+        session_id: str,
+        messages: List[ConversationMessage],
+        summary: Dict[str, Any],
+        prospect_info: Dict[str, Any]
+    ):
+        try:
+            text = await self.llm.summarize(messages, prospect_info, summary.get("text"))
+            applied = await self.state.apply_summary(
+                session_id,
+                {"text": text, "covered": summary.get("covered", 0) + len(messages)},
+                len(messages)
+            )
+            SUMMARIES.labels(status="applied" if applied else "stale").inc()
+        except Exception as e:
+            SUMMARIES.labels(status="error").inc()
+            print(f"⚠️ Summary failed for session {session_id}: {e}")
+    
+    async def _stream_response(
+        self,
+        session_id: str,
+        messages: List[ConversationMessage],
+        prospect_info: Dict[str, Any],
+        message_count: int,
+        intent: str,
+        correlation_id: str,
+        deliveries: List[asyncio.Future],
+        deadline: Optional[float] = None
+    ) -> tuple:
+        """Émet les fragments de réponse au fil du streaming; retourne (réponse, nb fragments)"""
+        
+        parts = []
+        async for chunk in self.llm.stream_response(
+            messages, prospect_info, message_count=message_count,
+            cache_intent=intent, deadline=deadline
+        ):
+            chunk_signal = SignalPondere.trusted(
+                type="ASSISTANT_RESPONSE",
+                source=CortexId.NLP,
+                payload={
+                    "session_id": session_id,
+                    "chunk": chunk,
+                    "sequence": len(parts),
+                    "final": False
+                },
+                confiance=0.9,
+                correlation_id=correlation_id,
+                priority="NORMAL"
+            )
+            deliveries.append(await self._produce_signal(TOPIC_OUTPUT, chunk_signal))
+            parts.append(chunk)
+        
+        return "".join(parts), len(parts)
+    
+    async def dead_letter(self, signal: Dict[str, Any], error: Exception):
+        """
+        Met de côté un signal dont le traitement échoue malgré les tentatives:
+        ERROR_PROCESSING_FAILED sur signals.errors avec le signal d'origine,
+        pour rejeu. Attend l'ack: l'offset n'est committé qu'après.
+        """
+        payload = signal.get("payload") or {}
+        dead_letter_signal = SignalPondere.trusted(
+            type="ERROR_PROCESSING_FAILED",
+            source=CortexId.NLP,
+            payload={
+                "session_id": payload.get("session_id"),
+                "error": str(error),
+                "original_signal_id": signal.get("id"),
+                "dead_letter": True,
+                "signal": signal
+            },
+            confiance=1.0,
+            correlation_id=signal.get("correlation_id") or new_signal_id(),
+            priority="HIGH"
+        )
+        await (await self._produce_signal(TOPIC_ERRORS, dead_letter_signal))
+    
+    async def expire_signal(self, signal: Dict[str, Any], action: str) -> List[asyncio.Future]:
+        """Comptabilise un signal expiré et, selon NLP_EXPIRED_POLICY, le signale sur signals.errors"""
+        signal_type = signal.get("type", "")
+        EXPIRED_SIGNALS.labels(type=signal_type, action=action).inc()
+        if NLP_EXPIRED_POLICY != "dead-letter":
+            return []
+        
+        deadline = signal_deadline(signal)
+        expired_signal = SignalPondere.trusted(
+            type="ERROR_SIGNAL_EXPIRED",
+            source=CortexId.NLP,
+            payload={
+                "session_id": (signal.get("payload") or {}).get("session_id"),
+                "original_signal_id": signal.get("id"),
+                "original_type": signal_type,
+                "expired_ms": int((time.time() - deadline) * 1000) if deadline else None
+            },
+            confiance=1.0,
+            correlation_id=signal.get("correlation_id") or new_signal_id(),
+            priority="LOW"
+        )
+        return [await self._produce_signal(TOPIC_ERRORS, expired_signal)]
+    
+    async def _request_resync(
+        self,
+        session_id: str,
+        gap: Dict[str, int],
+        correlation_id: str
+    ) -> asyncio.Future:
+        """Demande au client (via le relais WebSocket) de renvoyer l'historique complet"""
+        SESSION_RESYNCS.labels(event="requested").inc()
+        print(f"🔁 Sequence gap for session {session_id}: expected {gap.get('expected')}, received {gap.get('received')}")
+        resync_signal = SignalPondere.trusted(
+            type="SESSION_RESYNC_REQUIRED",
+            source=CortexId.NLP,
+            payload={
+                "session_id": session_id,
+                "expected_seq": gap.get("expected"),
+                "received_seq": gap.get("received")
+            },
+            confiance=1.0,
+            correlation_id=correlation_id,
+            priority="HIGH"
+        )
+        return await self._produce_signal(TOPIC_OUTPUT, resync_signal)
     
     async def _detect_intent(
         self,
@@ -365,126 +1431,384 @@ class MessageProcessor:
         message: str,
         correlation_id: str
     ) -> SignalPondere:
-        """Détecte l'intention du message (implémentation simplifiée)"""
-        
-        # Mots-clés pour détection d'intention basique
-        intents = {
-            "budget": ["budget", "prix", "coût", "tarif", "combien", "price", "cost"],
-            "timeline": ["quand", "délai", "deadline", "timeline", "urgence", "rapide"],
-            "technical": ["technique", "tech", "api", "intégration", "stack", "développement"],
-            "demo": ["demo", "démonstration", "essai", "test", "voir"],
-            "contact": ["appeler", "téléphone", "rdv", "rendez-vous", "contact", "call"]
-        }
+        """Détecte l'intention du message (automate multi-motifs, toutes intentions scorées)"""
         
-        message_lower = message.lower()
-        detected_intent = "general"
-        confidence = 0.5
-        
-        for intent, keywords in intents.items():
-            if any(kw in message_lower for kw in keywords):
-                detected_intent = intent
-                confidence = 0.8
-                break
+        result = self.intents.detect(message)
         
-        return SignalPondere(
+        return SignalPondere.trusted(
             type="LEAD_INTENT_DETECTED",
+            source=CortexId.NLP,
             payload={
                 "session_id": session_id,
-                "intent": detected_intent,
+                "intent": result.intent,
                 "message": message,
-                "keywords_matched": []
+                "keywords_matched": result.keywords_matched,
+                "scores": result.scores
             },
-            confiance=confidence,
+            confiance=result.confidence,
             correlation_id=correlation_id
         )
     
     async def _evaluate_qualification(
         self,
         session_id: str,
-        messages: List[ConversationMessage],
+        qualification: QualificationState,
         prospect_info: Dict[str, Any],
         correlation_id: str
     ) -> SignalPondere:
-        """Évalue le niveau de qualification du lead"""
-        
-        # Score basé sur le nombre de messages et la qualité des échanges
-        message_count = len(messages)
-        base_score = min(message_count * 10, 50)
-        
-        # Bonus si téléphone fourni
-        if prospect_info.get("phone"):
-            base_score += 20
-        
-        # Bonus basé sur les mots-clés de conversion
-        conversion_keywords = ["intéressé", "budget", "quand", "commencer", "interested", "start"]
-        conversation_text = " ".join([m.content.lower() for m in messages])
-        for kw in conversion_keywords:
-            if kw in conversation_text:
-                base_score += 5
+        """Évalue le niveau de qualification du lead (score O(1) sur l'état incrémental)"""
         
-        final_score = min(base_score, 100)
+        final_score = qualification.score
+        qualified = final_score >= QUALIFIED_THRESHOLD
         
-        return SignalPondere(
+        return SignalPondere.trusted(
             type="LEAD_QUALIFIED",
+            source=CortexId.NLP,
             payload={
                 "session_id": session_id,
                 "prospect_info": prospect_info,
                 "score": final_score,
-                "message_count": message_count,
-                "recommended_action": "GENERATE_REPORT" if final_score >= 70 else "CONTINUE_CONVERSATION"
+                "message_count": qualification.messages,
+                "qualification": qualification.to_dict(),
+                "recommended_action": "GENERATE_REPORT" if qualified else "CONTINUE_CONVERSATION"
             },
             confiance=final_score / 100,
             correlation_id=correlation_id,
-            metadata=SignalMetadata(priority="HIGH" if final_score >= 70 else "NORMAL")
+            priority="HIGH" if qualified else "NORMAL"
         )
     
-    async def _produce_signal(self, topic: str, signal: SignalPondere):
-        """Produit un signal vers Kafka"""
-        await self.producer.send_and_wait(
+    async def _produce_signal(self, topic: str, signal: SignalPondere) -> asyncio.Future:
+        """
+        Produit un signal vers Kafka.
+        
+        En mode "batched", retourne le futur de livraison dès la mise en file;
+        en mode "sync", attend l'ack du broker. Les textes volumineux du
+        payload (`CLAIMCHECK_FIELDS`) sont remplacés par des références.
+        """
+        if self.claims is not None:
+            payload = await self.claims.offload_payload(signal.payload, CLAIMCHECK_FIELDS)
+            if payload is not signal.payload:
+                signal = signal.model_copy(update={"payload": payload})
+        delivery = await self.producer.send(
             topic,
-            value=json.dumps(signal.model_dump()).encode('utf-8'),
-            key=signal.correlation_id.encode('utf-8')
+            value=self.codec.encode(signal),
+            key=signal.correlation_id.encode('utf-8'),
+            headers=self.codec.headers
         )
-        MESSAGES_PRODUCED.labels(topic=topic, type=signal.type).inc()
+        delivery.add_done_callback(lambda fut: self._report_delivery(topic, signal, fut))
+        if KAFKA_PRODUCER_MODE == "sync":
+            await delivery
+        return delivery
+    
+    @staticmethod
+    def _report_delivery(topic: str, signal: SignalPondere, delivery: asyncio.Future):
+        """Rapporte le résultat de livraison d'un signal"""
+        if delivery.cancelled():
+            return
+        error = delivery.exception()
+        if error is None:
+            MESSAGES_PRODUCED.labels(topic=topic, type=signal.type).inc()
+        else:
+            PRODUCE_FAILURES.labels(topic=topic, type=signal.type).inc()
+            print(f"❌ Delivery failed for signal {signal.id} ({signal.type}) on {topic}: {error}")
 
 
 # ============================================
 # KAFKA CONSUMER LOOP
 # ============================================
 
-async def consume_messages(processor: MessageProcessor):
-    """Boucle principale de consommation Kafka"""
+async def dispatch_signal(
+    processor: MessageProcessor,
+    deduplicator: SignalDeduplicator,
+    signal: Dict[str, Any]
+):
+    """Route un signal vers son traitement, une seule fois par identifiant"""
+    signal_type = signal.get("type", "")
+    
+    if signal_type != "LEAD_MESSAGE_RECEIVED":
+        print(f"⚠️ Unknown signal type: {signal_type}")
+        return
+    
+    # Signal expiré (utilisateur parti): ni Redis ni LLM
+    if signal_expired(signal):
+        await asyncio.gather(*await processor.expire_signal(signal, "skipped"))
+        return
+    
+    signal_id = signal.get("id")
+    if signal_id and not await deduplicator.claim(signal_id):
+        return
+    
+    try:
+        await processor.process_lead_message(signal)
+    except Exception:
+        if signal_id:
+            await deduplicator.release(signal_id)
+        raise
+    
+    if signal_id:
+        await deduplicator.complete(signal_id)
+
+
+async def commit_completed(consumer: AIOKafkaConsumer, dispatcher: SessionOrderedDispatcher):
+    """Committe les offsets dont tous les enregistrements précédents sont traités"""
+    offsets = dispatcher.offsets.committable()
+    IN_FLIGHT_MESSAGES.set(dispatcher.pending)
+    if not offsets:
+        return
+    try:
+        await consumer.commit(offsets)
+        OFFSET_COMMITS.labels(status="success").inc()
+    except Exception as e:
+        # Les enregistrements seront redélivrés: le traitement reste at-least-once
+        OFFSET_COMMITS.labels(status="error").inc()
+        print(f"⚠️ Offset commit failed: {e}")
+
+
+class CommitOnRevoke(ConsumerRebalanceListener):
+    """Committe le travail terminé et abandonne l'état des partitions révoquées"""
+    
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        dispatcher: SessionOrderedDispatcher,
+        state: Optional[ConversationStateManager]
+    ):
+        self.consumer = consumer
+        self.dispatcher = dispatcher
+        self.state = state
+    
+    async def on_partitions_revoked(self, revoked):
+        await commit_completed(self.consumer, self.dispatcher)
+        self.dispatcher.revoke(revoked)
+        if self.state:
+            self.state.invalidate_partitions(revoked)
+    
+    async def on_partitions_assigned(self, assigned):
+        pass
+
+
+def apply_backpressure(consumer: AIOKafkaConsumer, breaker: CircuitBreaker):
+    """
+    Met en pause les partitions assignées tant que le disjoncteur LLM est
+    ouvert, et les reprend dès qu'un appel de test est autorisé. Les
+    messages déjà acceptés attendent le réarmement dans le garde LLM.
+    """
+    if breaker.is_open:
+        unpaused = consumer.assignment() - consumer.paused()
+        if unpaused:
+            consumer.pause(*unpaused)
+            print(f"⏸️ LLM circuit open: pausing {len(unpaused)} partition(s)")
+    else:
+        paused = consumer.paused()
+        if paused:
+            consumer.resume(*paused)
+            print(f"▶️ LLM circuit closing: resuming {len(paused)} partition(s)")
+    PAUSED_PARTITIONS.set(len(consumer.paused()))
+
+
+def signal_deadline(signal: Dict[str, Any]) -> Optional[float]:
+    """Échéance du signal (timestamp + ttl, en secondes epoch), None si non renseignée"""
+    timestamp, ttl = signal.get("timestamp"), signal.get("ttl")
+    if not isinstance(timestamp, (int, float)) or not isinstance(ttl, (int, float)) or ttl <= 0:
+        return None
+    return (timestamp + ttl) / 1000
+
+
+def signal_expired(signal: Dict[str, Any]) -> bool:
+    """SignalPondere.is_expired appliqué au signal brut (sans TTL valide: jamais expiré)"""
+    if signal_deadline(signal) is None:
+        return False
+    return is_expired_at(signal["timestamp"], signal["ttl"])
+
+
+def session_key(signal: Dict[str, Any], msg) -> str:
+    """Clé d'ordonnancement: session, sinon clé Kafka"""
+    session_id = (signal.get("payload") or {}).get("session_id")
+    if session_id:
+        return session_id
+    if msg.key:
+        return msg.key.decode('utf-8', errors='replace')
+    return signal.get("correlation_id") or f"{msg.partition}:{msg.offset}"
+
+
+async def consume_messages(processor: MessageProcessor, deduplicator: SignalDeduplicator):
+    """
+    Boucle principale de consommation Kafka.
+    
+    Les sessions différentes sont traitées en parallèle (jusqu'à
+    NLP_MAX_IN_FLIGHT) par ordre de priorité (metadata.priority), les
+    messages d'une même session restent ordonnés, et les offsets ne sont
+    committés qu'une fois tous les enregistrements précédents de la
+    partition terminés, sorties comprises. Un signal redélivré est écarté
+    par le déduplicateur. Les partitions sont mises en pause tant que le
+    disjoncteur de la passerelle LLM est ouvert.
+    """
     
     global consumer
     
     consumer = AIOKafkaConsumer(
-        TOPIC_INPUT,
         bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
         group_id=CONSUMER_GROUP,
         auto_offset_reset="earliest",
-        enable_auto_commit=True,
-        value_deserializer=lambda m: json.loads(m.decode('utf-8'))
+        enable_auto_commit=False
     )
+    dispatcher = SessionOrderedDispatcher(
+        lambda signal: dispatch_signal(processor, deduplicator, signal),
+        max_in_flight=NLP_MAX_IN_FLIGHT,
+        max_pending=NLP_MAX_PENDING,
+        aging_seconds=NLP_PRIORITY_AGING_SECONDS,
+        max_attempts=NLP_MAX_ATTEMPTS,
+        retry_backoff=NLP_RETRY_BACKOFF_SECONDS,
+        on_failure=processor.dead_letter
+    )
+    consumer.subscribe([TOPIC_INPUT], listener=CommitOnRevoke(consumer, dispatcher, processor.state))
     
     await consumer.start()
-    print(f"🧠 Cortex NLP: Consuming from {TOPIC_INPUT}")
+    dispatcher.start()
+    print(f"🧠 Cortex NLP: Consuming from {TOPIC_INPUT} (max in-flight: {dispatcher.max_in_flight})")
     
     try:
-        async for msg in consumer:
-            MESSAGES_CONSUMED.labels(topic=msg.topic).inc()
-            signal = msg.value
-            
-            signal_type = signal.get("type", "")
+        while True:
+            apply_backpressure(consumer, processor.llm.guard.breaker)
+            batches = await consumer.getmany(timeout_ms=NLP_COMMIT_INTERVAL_MS)
+            for tp, records in batches.items():
+                for msg in records:
+                    MESSAGES_CONSUMED.labels(topic=msg.topic).inc()
+                    try:
+                        signal = processor.codec.decode(msg.value, msg.headers)
+                    except CodecError as e:
+                        # Enregistrement illisible: non suivi, donc dépassé au prochain commit
+                        DECODE_FAILURES.labels(topic=msg.topic).inc()
+                        print(f"⚠️ Skipping undecodable record {tp}@{msg.offset}: {e}")
+                        continue
+                    key = session_key(signal, msg)
+                    if processor.state:
+                        processor.state.track_partition(key, tp)
+                    priority = (signal.get("metadata") or {}).get("priority")
+                    await dispatcher.submit(key, signal, tp, msg.offset, priority)
             
-            if signal_type == "LEAD_MESSAGE_RECEIVED":
-                await processor.process_lead_message(signal)
-            else:
-                print(f"⚠️ Unknown signal type: {signal_type}")
+            await commit_completed(consumer, dispatcher)
     
     finally:
+        # Arrêt gracieux: laisser finir les traitements en cours puis committer
+        await dispatcher.drain(NLP_SHUTDOWN_GRACE_SECONDS)
+        await dispatcher.stop()
+        await commit_completed(consumer, dispatcher)
         await consumer.stop()
 
 
+# ============================================
+# RAPPORTS DE QUALIFICATION
+# ============================================
+
+async def generate_report(llm: LLMClient, job: ReportJob) -> str:
+    """Génère le rapport d'une demande (résumé glissant en tête de conversation)"""
+    messages = [ConversationMessage(role=m["role"], content=m["content"]) for m in job.messages]
+    if job.summary:
+        messages.insert(0, ConversationMessage(role="system", content=f"Résumé des échanges précédents: {job.summary}"))
+    return await llm.generate_report(messages, job.prospect_info)
+
+
+async def emit_report(processor: MessageProcessor, job: ReportJob, report: str, cached: bool) -> asyncio.Future:
+    """Publie REPORT_GENERATED sur signals.actions (hors relais WebSocket)"""
+    report_signal = SignalPondere.trusted(
+        type="REPORT_GENERATED",
+        source=CortexId.NLP,
+        payload={
+            "session_id": job.session_id,
+            "prospect_info": job.prospect_info,
+            "score": job.score,
+            "conversation_hash": job.conversation_hash,
+            "message_count": len(job.messages),
+            "report": report,
+            "cached": cached
+        },
+        confiance=0.9,
+        correlation_id=job.correlation_id,
+        priority="HIGH"
+    )
+    return await processor._produce_signal(TOPIC_ACTIONS, report_signal)
+
+
+async def consume_qualifications(processor: MessageProcessor, reports: ReportWorker):
+    """
+    Met en file un rapport pour chaque LEAD_QUALIFIED recommandant
+    GENERATE_REPORT, avec un instantané de la conversation.
+    
+    Groupe de consommateurs distinct du chat, commit automatique: une
+    demande perdue (arrêt brutal) est renouvelée au prochain message du
+    lead, qui émet à nouveau LEAD_QUALIFIED.
+    """
+    qualifications = AIOKafkaConsumer(
+        TOPIC_QUALIFICATION,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        group_id=REPORT_CONSUMER_GROUP,
+        auto_offset_reset="latest",
+        enable_auto_commit=True
+    )
+    await qualifications.start()
+    print(f"📝 Reports: consuming {TOPIC_QUALIFICATION} ({reports.workers} workers)")
+    try:
+        async for msg in qualifications:
+            try:
+                signal = processor.codec.decode(msg.value, msg.headers)
+            except CodecError as e:
+                DECODE_FAILURES.labels(topic=msg.topic).inc()
+                print(f"⚠️ Skipping undecodable record on {msg.topic}: {e}")
+                continue
+            payload = signal.get("payload") or {}
+            if signal.get("type") != "LEAD_QUALIFIED" or payload.get("recommended_action") != "GENERATE_REPORT":
+                continue
+            
+            session_id = payload.get("session_id")
+            try:
+                # Lecture directe dans Redis: la session appartient le plus souvent
+                # à un autre consommateur, son état ne doit pas entrer dans le
+                # cache local (jamais invalidé au rebalancing pour cette partition)
+                history = await ConversationStateManager.get_conversation(processor.state, session_id)
+                summary = await ConversationStateManager.get_summary(processor.state, session_id)
+            except Exception as e:
+                print(f"⚠️ Report request for session {session_id} skipped: {e}")
+                continue
+            await reports.submit(ReportJob(
+                session_id=session_id,
+                conversation_hash=conversation_hash(history, summary),
+                messages=history,
+                prospect_info=payload.get("prospect_info") or {},
+                summary=(summary or {}).get("text"),
+                score=payload.get("score", 0),
+                correlation_id=signal.get("correlation_id")
+            ))
+    finally:
+        await qualifications.stop()
+
+
+# ============================================
+# TÂCHES PÉRIODIQUES
+# ============================================
+
+async def refresh_active_conversations(state: ConversationStateManager):
+    """Rafraîchit la jauge des conversations actives depuis l'index d'activité"""
+    while True:
+        try:
+            ACTIVE_CONVERSATIONS.set(await state.count_active())
+        except Exception as e:
+            print(f"⚠️ Active conversations refresh failed: {e}")
+        await asyncio.sleep(ACTIVE_REFRESH_SECONDS)
+
+
+async def prune_blobs(store: FileBlobStore):
+    """Retire du magasin les blobs plus anciens que `BLOB_TTL_SECONDS`"""
+    while True:
+        try:
+            removed = await asyncio.to_thread(store.prune, BLOB_TTL_SECONDS)
+            if removed:
+                print(f"🧹 Pruned {removed} expired blob(s)")
+        except Exception as e:
+            print(f"⚠️ Blob pruning failed: {e}")
+        await asyncio.sleep(BLOB_PRUNE_INTERVAL_SECONDS)
+
+
 # ============================================
 # FASTAPI APPLICATION
 # ============================================
@@ -492,13 +1816,16 @@ async def consume_messages(processor: MessageProcessor):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle management"""
-    global producer, redis_client, http_client
+    global producer, redis_client, state_manager, http_client
     
     print("🧠 Cortex NLP starting...")
     
     # Initialize clients
     producer = AIOKafkaProducer(
         bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        linger_ms=KAFKA_LINGER_MS,
+        max_batch_size=KAFKA_MAX_BATCH_SIZE,
+        compression_type=KAFKA_COMPRESSION,
     )
     await producer.start()
     print("✅ Kafka producer connected")
@@ -511,24 +1838,68 @@ async def lifespan(app: FastAPI):
         print(f"⚠️ Redis connection failed: {e}")
         redis_client = None
     
-    http_client = httpx.AsyncClient()
+    http_client = create_http_client(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive=LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_POOL_KEEPALIVE_SECONDS,
+        http2=LLM_HTTP2
+    )
+    if LLM_PREWARM_CONNECTIONS > 0:
+        # Connexions gardées au-delà de LLM_POOL_MAX_KEEPALIVE: refermées aussitôt
+        warmed = await prewarm(http_client, LLM_API_URLS, LLM_PREWARM_CONNECTIONS)
+        print(f"🔥 LLM pool pre-warmed: {warmed}/{len(LLM_API_URLS) * LLM_PREWARM_CONNECTIONS} connections")
     
     # Initialize processor
-    llm_client = LLMClient(http_client, LLM_API_KEY, LLM_API_URL)
-    state_manager = ConversationStateManager(redis_client) if redis_client else None
-    processor = MessageProcessor(llm_client, state_manager, producer)
+    llm_client = LLMClient(http_client, LLM_API_KEY, LLM_API_URLS)
+    claims = create_claim_check(BLOB_STORE_PATH, CLAIMCHECK_THRESHOLD_BYTES)
+    if claims:
+        print(f"📦 Claim-check: payloads > {CLAIMCHECK_THRESHOLD_BYTES} bytes → {BLOB_STORE_PATH}")
+    state_manager = create_state_manager(redis_client, claims) if redis_client else None
+    processor = MessageProcessor(llm_client, state_manager, producer, claims)
     
-    # Start consumer in background
-    consumer_task = asyncio.create_task(consume_messages(processor))
+    # Start consumer and periodic tasks in background
+    deduplicator = SignalDeduplicator(
+        redis_client,
+        local_size=DEDUP_LOCAL_SIZE,
+        lease_seconds=DEDUP_LEASE_SECONDS,
+        done_ttl=DEDUP_TTL_SECONDS
+    )
+    consumer_task = asyncio.create_task(consume_messages(processor, deduplicator))
+    background_tasks = [consumer_task]
+    if state_manager:
+        background_tasks.append(asyncio.create_task(refresh_active_conversations(state_manager)))
+    if claims:
+        background_tasks.append(asyncio.create_task(prune_blobs(claims.store)))
+    
+    # Rapports: client LLM distinct (limiteur et disjoncteur propres), pour
+    # que leur génération n'occupe pas la capacité des réponses chat
+    reports = None
+    if state_manager and REPORT_WORKERS > 0:
+        report_llm = LLMClient(http_client, LLM_API_KEY, LLM_API_URLS, name="report")
+        reports = ReportWorker(
+            lambda job: generate_report(report_llm, job),
+            lambda job, report, cached: emit_report(processor, job, report, cached),
+            workers=REPORT_WORKERS,
+            max_queued=REPORT_MAX_QUEUED,
+            cache_size=REPORT_CACHE_SIZE,
+            cache_ttl=REPORT_CACHE_TTL_SECONDS
+        )
+        reports.start()
+        background_tasks.append(asyncio.create_task(consume_qualifications(processor, reports)))
     
     yield
     
     # Shutdown
-    consumer_task.cancel()
-    try:
-        await consumer_task
-    except asyncio.CancelledError:
-        pass
+    for task in background_tasks:
+        task.cancel()
+    for task in background_tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    if reports is not None:
+        # Rapports en cours abandonnés: redemandés au prochain LEAD_QUALIFIED
+        await reports.stop()
     
     if producer:
         await producer.stop()
@@ -566,10 +1937,46 @@ async def metrics():
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
+@app.get("/api/v1/conversations/active")
+async def active_conversations(minutes: float = 15, limit: int = 100):
+    """Sessions actives durant les N dernières minutes (dashboards)"""
+    if not state_manager:
+        raise HTTPException(status_code=503, detail="Redis unavailable")
+    return {"minutes": minutes, **await state_manager.active_since(minutes, limit)}
+
+
+@app.get("/api/v1/conversations/{session_id}/qualification")
+async def conversation_qualification(session_id: str):
+    """État de qualification cumulé d'une session (score, mots-clés, téléphone)"""
+    if not state_manager:
+        raise HTTPException(status_code=503, detail="Redis unavailable")
+    # Lecture directe dans Redis: la session peut appartenir à un autre consommateur,
+    # dont l'état n'est pas dans le cache local
+    qualification = await ConversationStateManager.get_qualification(state_manager, session_id)
+    if not qualification.messages:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return {"session_id": session_id, **qualification.to_dict()}
+
+
 # ============================================
 # ENTRY POINT
 # ============================================
 
+async def migrate_conversations():
+    """Migre les historiques de l'ancien format JSON vers des listes Redis"""
+    client = redis.from_url(REDIS_URL)
+    try:
+        migrated = await ConversationStateManager(client).migrate_legacy()
+        print(f"✅ {migrated} conversation(s) migrated")
+    finally:
+        await client.close()
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    import sys
+    
+    if sys.argv[1:] == ["migrate-conversations"]:
+        asyncio.run(migrate_conversations())
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,80 @@
+"""
+Qualification incrémentale des leads
+
+L'état de qualification d'une session (messages, mots-clés de conversion
+rencontrés, téléphone fourni) est mis à jour à chaque message ajouté, dans
+le même script Redis que l'historique: le score se calcule ensuite en O(1),
+sans relire ni reparcourir la conversation.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Mots-clés de conversion (recherche de sous-chaîne, insensible à la casse)
+CONVERSION_KEYWORDS = ["intéressé", "budget", "quand", "commencer", "interested", "start"]
+
+QUALIFIED_THRESHOLD = 70
+
+
+def conversion_hits(content: str) -> List[str]:
+    """Mots-clés de conversion présents dans un message"""
+    content_lower = content.lower()
+    return [kw for kw in CONVERSION_KEYWORDS if kw in content_lower]
+
+
+def qualification_update(
+    messages: Iterable[Dict[str, str]],
+    prospect_info: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Delta de qualification pour des messages ajoutés (None si rien ne change)"""
+    messages = list(messages)
+    keywords = sorted({kw for m in messages for kw in conversion_hits(m["content"])})
+    phone = bool((prospect_info or {}).get("phone"))
+    if not messages and not phone:
+        return None
+    return {"messages": len(messages), "keywords": keywords, "phone": phone}
+
+
+@dataclass
+class QualificationState:
+    """État de qualification cumulé d'une session"""
+    messages: int = 0
+    keywords: Set[str] = field(default_factory=set)
+    phone: bool = False
+
+    @classmethod
+    def from_hash(cls, data: Dict[bytes, bytes]) -> "QualificationState":
+        """Construit l'état depuis le hash Redis `qualification:{session_id}`"""
+        fields = {key.decode("utf-8"): value for key, value in data.items()}
+        return cls(
+            messages=int(fields.get("messages", 0)),
+            keywords={key[3:] for key in fields if key.startswith("kw:")},
+            phone=fields.get("phone") == b"1"
+        )
+
+    def apply(self, update: Optional[Dict[str, Any]]):
+        """Applique un delta produit par `qualification_update`"""
+        if not update:
+            return
+        self.messages += update["messages"]
+        self.keywords.update(update["keywords"])
+        self.phone = self.phone or update["phone"]
+
+    @property
+    def score(self) -> int:
+        """Score sur 100: échanges (max 50), téléphone (+20), mots-clés de conversion (+5 chacun)"""
+        score = min(self.messages * 10, 50)
+        if self.phone:
+            score += 20
+        score += 5 * len(self.keywords)
+        return min(score, 100)
+
+    def to_dict(self) -> Dict[str, Any]:
+        score = self.score
+        return {
+            "score": score,
+            "message_count": self.messages,
+            "keywords": sorted(self.keywords),
+            "phone": self.phone,
+            "qualified": score >= QUALIFIED_THRESHOLD
+        }
@@ -0,0 +1,187 @@
+"""
+Rapports de qualification - pool de génération asynchrone
+
+Les leads qualifiés (LEAD_QUALIFIED avec `recommended_action:
+GENERATE_REPORT`) sont mis en file et leurs rapports générés par un pool
+borné de workers, hors du chemin des réponses chat. Une session n'a qu'un
+rapport en attente (le plus récent remplace le précédent) et un seul en
+cours; une conversation identique (même empreinte) n'est générée qu'une
+fois, puis servie depuis le cache des rapports terminés.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.cache import LRUCache
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+REPORT_REQUESTS = Counter(
+    'cortex_nlp_report_requests_total',
+    'Report requests by outcome',
+    ['status']
+)
+
+REPORT_QUEUE_DEPTH = Gauge(
+    'cortex_nlp_report_queue_depth',
+    'Sessions waiting for report generation'
+)
+
+REPORT_WORKERS_BUSY = Gauge(
+    'cortex_nlp_report_workers_busy',
+    'Report workers currently generating'
+)
+
+REPORT_QUEUE_WAIT = Histogram(
+    'cortex_nlp_report_queue_wait_seconds',
+    'Time from report request to generation start',
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+REPORT_GENERATION_TIME = Histogram(
+    'cortex_nlp_report_generation_seconds',
+    'Report generation time',
+    buckets=(1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120)
+)
+
+# ============================================
+# FILE ET WORKERS
+# ============================================
+
+@dataclass
+class ReportJob:
+    """Demande de rapport pour un état de conversation"""
+    session_id: str
+    conversation_hash: str
+    messages: List[Dict[str, str]]
+    prospect_info: Dict[str, Any]
+    summary: Optional[str] = None  # Résumé glissant des messages repliés
+    score: float = 0.0
+    correlation_id: Optional[str] = None
+    requested_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.session_id, self.conversation_hash)
+
+
+def conversation_hash(messages: List[Dict[str, str]], summary: Optional[Dict[str, Any]] = None) -> str:
+    """Empreinte d'une conversation (résumé glissant compris)"""
+    digest = hashlib.sha256()
+    if summary:
+        digest.update(summary.get("text", "").encode("utf-8"))
+    for message in messages:
+        digest.update(b"\x00" + message["role"].encode("utf-8") + b"\x00" + message["content"].encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ReportWorker:
+    """
+    Pool de `workers` tâches qui génèrent les rapports en file.
+
+    `generate(job)` retourne le rapport; `emit(job, report, cached)` le
+    publie. Au-delà de `max_queued` sessions en attente, `submit` attend
+    qu'une place se libère (le consommateur Kafka ralentit d'autant).
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[ReportJob], Awaitable[str]],
+        emit: Callable[[ReportJob, str, bool], Awaitable[Any]],
+        workers: int = 2,
+        max_queued: int = 100,
+        cache_size: int = 1000,
+        cache_ttl: float = 86400
+    ):
+        self.generate = generate
+        self.emit = emit
+        self.workers = workers
+        self.max_queued = max_queued
+        self.reports = LRUCache(cache_size, cache_ttl, name="report")
+        self._pending: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._running: Dict[str, Tuple[str, str]] = {}
+        self._changed = asyncio.Condition()
+        self._tasks: List[asyncio.Task] = []
+
+    async def submit(self, job: ReportJob) -> str:
+        """Met un rapport en file; retourne le statut de la demande"""
+        report = self.reports.get(job.key)
+        if report is not None:
+            await self.emit(job, report, True)
+            return self._count("cached")
+
+        async with self._changed:
+            pending = self._pending.get(job.session_id)
+            if self._running.get(job.session_id) == job.key or (pending and pending.key == job.key):
+                return self._count("deduplicated")
+            if pending is not None:
+                # Conversation plus récente: remplace la demande, garde sa place
+                job.requested_at = pending.requested_at
+                self._pending[job.session_id] = job
+                return self._count("superseded")
+            await self._changed.wait_for(lambda: len(self._pending) < self.max_queued)
+            self._pending[job.session_id] = job
+            REPORT_QUEUE_DEPTH.set(len(self._pending))
+            self._changed.notify_all()
+        return self._count("queued")
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def _work(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._next() is not None)
+                job = self._pending.pop(self._next())
+                self._running[job.session_id] = job.key
+                REPORT_QUEUE_DEPTH.set(len(self._pending))
+                self._changed.notify_all()
+
+            REPORT_QUEUE_WAIT.observe(time.monotonic() - job.requested_at)
+            REPORT_WORKERS_BUSY.inc()
+            try:
+                with REPORT_GENERATION_TIME.time():
+                    report = await self.generate(job)
+                self.reports.set(job.key, report)
+                await self.emit(job, report, False)
+                self._count("generated")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._count("failed")
+                print(f"⚠️ Report generation failed for session {job.session_id}: {e}")
+            finally:
+                REPORT_WORKERS_BUSY.dec()
+                async with self._changed:
+                    del self._running[job.session_id]
+                    self._changed.notify_all()
+
+    def _next(self) -> Optional[str]:
+        """Première session en attente sans rapport en cours"""
+        for session_id in self._pending:
+            if session_id not in self._running:
+                return session_id
+        return None
+
+    @staticmethod
+    def _count(status: str) -> str:
+        REPORT_REQUESTS.labels(status=status).inc()
+        return status
+
@@ -0,0 +1,253 @@
+"""
+Résilience de la passerelle LLM - Limiteur adaptatif et disjoncteur
+
+Le limiteur ajuste la concurrence des appels LLM selon la latence et les
+erreurs observées (AIMD: +1/limite par succès rapide, ×backoff sur erreur
+ou lenteur). Le disjoncteur s'ouvre quand le taux d'erreur dépasse un
+seuil; la boucle Kafka met alors ses partitions en pause jusqu'à ce qu'un
+appel de test réussisse.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional
+
+from prometheus_client import Gauge
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+LLM_CONCURRENCY_LIMIT = Gauge(
+    'cortex_nlp_llm_concurrency_limit',
+    'Current adaptive concurrency limit for LLM calls'
+)
+
+LLM_IN_FLIGHT = Gauge(
+    'cortex_nlp_llm_in_flight',
+    'LLM calls currently running'
+)
+
+LLM_QUEUE_DEPTH = Gauge(
+    'cortex_nlp_llm_queue_depth',
+    'LLM calls waiting for a concurrency slot or a closed circuit'
+)
+
+LLM_CIRCUIT_STATE = Gauge(
+    'cortex_nlp_llm_circuit_state',
+    'LLM gateway circuit breaker state (0=closed, 1=half-open, 2=open)'
+)
+
+# ============================================
+# DISJONCTEUR
+# ============================================
+
+class CircuitOpenError(Exception):
+    """La passerelle LLM est considérée indisponible"""
+
+
+class DeadlineExceeded(Exception):
+    """Le budget de temps du signal (timestamp + ttl) est épuisé"""
+
+
+class CircuitBreaker:
+    """Disjoncteur à taux d'erreur sur une fenêtre glissante d'appels"""
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        error_rate: float = 0.5,
+        min_requests: int = 10,
+        window: int = 20,
+        reset_seconds: float = 30.0
+    ):
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._changed = asyncio.Event()
+        LLM_CIRCUIT_STATE.set(0)
+
+    @property
+    def is_open(self) -> bool:
+        """Vrai tant que le délai de réarmement n'est pas écoulé"""
+        return self.state == self.OPEN and time.monotonic() < self._opened_at + self.reset_seconds
+
+    def allow(self) -> bool:
+        """Autorise un appel; en demi-ouverture, un seul appel de test à la fois"""
+        if self.state == self.OPEN:
+            if self.is_open:
+                return False
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record(self, success: Optional[bool], probe: bool = False):
+        """
+        Enregistre l'issue d'un appel (None: issue non imputable à la passerelle).
+
+        En demi-ouverture, seul l'appel de test (`probe`) décide de l'état;
+        un appel lancé avant l'ouverture qui se termine entre-temps est ignoré.
+        """
+        if self.state == self.HALF_OPEN:
+            if not probe:
+                return
+            self._probing = False
+            if success is None:
+                return
+            if success:
+                self._outcomes.clear()
+                self._transition(self.CLOSED)
+            else:
+                self._open()
+            return
+
+        if success is None:
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.error_rate:
+            self._open()
+
+    async def wait_changed(self, timeout: float):
+        """Attend un changement d'état (ou l'expiration du délai)"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            print(f"⚡ LLM circuit breaker: {self.state} → {state}")
+        self.state = state
+        LLM_CIRCUIT_STATE.set(self._STATE_VALUES[state])
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+# ============================================
+# LIMITEUR ADAPTATIF
+# ============================================
+
+class AdaptiveLimiter:
+    """Limite de concurrence AIMD pilotée par la latence et les erreurs"""
+
+    def __init__(
+        self,
+        initial: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_target: float = 15.0,
+        backoff: float = 0.5,
+        cooldown: float = 1.0
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_decrease = 0.0
+        self._available = asyncio.Condition()
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    async def acquire(self):
+        async with self._available:
+            self.waiting += 1
+            LLM_QUEUE_DEPTH.inc()
+            try:
+                await self._available.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.waiting -= 1
+                LLM_QUEUE_DEPTH.dec()
+            self.in_flight += 1
+            LLM_IN_FLIGHT.set(self.in_flight)
+
+    async def release(self, latency: float, success: Optional[bool]):
+        now = time.monotonic()
+        if success is None:
+            pass
+        elif success and latency <= self.latency_target:
+            # Augmentation additive: ~+1 par "fenêtre" complète d'appels rapides
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        elif now - self._last_decrease >= self.cooldown:
+            # Diminution multiplicative, au plus une fois par cooldown
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._last_decrease = now
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+        async with self._available:
+            self.in_flight -= 1
+            LLM_IN_FLIGHT.set(self.in_flight)
+            self._available.notify_all()
+
+# ============================================
+# GARDE DE LA PASSERELLE
+# ============================================
+
+class GatewayGuard:
+    """Combine disjoncteur et limiteur autour de chaque appel LLM"""
+
+    def __init__(self, limiter: AdaptiveLimiter, breaker: CircuitBreaker):
+        self.limiter = limiter
+        self.breaker = breaker
+
+    @asynccontextmanager
+    async def slot(self, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Réserve un créneau d'appel et enregistre son issue.
+
+        Tant que le disjoncteur refuse, attend au plus `max_wait` secondes
+        (les partitions Kafka sont en pause pendant ce temps) puis lève
+        CircuitOpenError.
+        """
+        deadline = time.monotonic() + (max_wait or 0.0)
+        while not self.breaker.allow():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CircuitOpenError("LLM gateway circuit is open")
+            LLM_QUEUE_DEPTH.inc()
+            try:
+                await self.breaker.wait_changed(min(remaining, self.breaker.reset_seconds))
+            finally:
+                LLM_QUEUE_DEPTH.dec()
+
+        # `allow` vient de passer en demi-ouverture: cet appel est le test
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+        try:
+            await self.limiter.acquire()
+        except BaseException:
+            if probe:
+                self.breaker.record(None, probe=True)
+            raise
+        started = time.monotonic()
+        success: Optional[bool] = False
+        try:
+            yield
+            success = True
+        except (DeadlineExceeded, asyncio.CancelledError):
+            # Budget du signal trop court ou arrêt: la passerelle n'est pas en cause
+            success = None
+            raise
+        finally:
+            self.breaker.record(success, probe=probe)
+            await self.limiter.release(time.monotonic() - started, success)
@@ -0,0 +1,72 @@
+"""
+Single-flight - Coalescence des requêtes identiques
+
+Les appels concurrents portant la même clé partagent une seule exécution
+et reçoivent tous son résultat. Un résultat réussi reste partagé pendant
+une courte fenêtre, pour absorber les doublons qui arrivent juste après
+(renvois du frontend traités séquentiellement dans la même session).
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """Regroupe les exécutions concurrentes d'une même clé"""
+
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self._calls: Dict[Hashable, Tuple[asyncio.Future, float]] = {}
+        self._expiries: Deque[Tuple[float, Hashable]] = deque()
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        reuse: bool = True
+    ) -> Tuple[Any, Optional[str]]:
+        """
+        Exécute `fn` ou rejoint l'exécution en cours pour `key`.
+
+        Retourne (résultat, mode) où mode vaut None pour l'appel qui a
+        exécuté `fn`, "inflight" s'il a rejoint un appel en cours et
+        "recent" s'il réutilise un résultat de la fenêtre. Avec `reuse`
+        faux, un résultat de la fenêtre est ignoré et remplacé.
+        """
+        self._prune()
+        entry = self._calls.get(key)
+        if entry is not None and (reuse or not entry[0].done()):
+            future, _ = entry
+            mode = "recent" if future.done() else "inflight"
+            # shield: l'annulation d'un appelant n'annule pas l'appel partagé
+            return await asyncio.shield(future), mode
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = (future, float("inf"))
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._calls.pop(key, None)
+            future.set_exception(e)
+            future.exception()  # Marque l'exception comme consommée s'il n'y a aucun autre appelant
+            raise
+
+        future.set_result(result)
+        if self.window > 0:
+            expires_at = time.monotonic() + self.window
+            self._calls[key] = (future, expires_at)
+            self._expiries.append((expires_at, key))
+        else:
+            self._calls.pop(key, None)
+        return result, None
+
+    def _prune(self):
+        now = time.monotonic()
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = self._expiries.popleft()
+            entry = self._calls.get(key)
+            # La clé a pu être réutilisée depuis: ne retirer que l'entrée expirée
+            if entry is not None and entry[1] == expires_at:
+                del self._calls[key]
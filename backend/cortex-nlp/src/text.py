@@ -0,0 +1,22 @@
+"""
+Normalisation de texte
+
+Utilitaires partagés pour comparer des messages indépendamment de la casse,
+des accents, de la ponctuation et des espaces.
+"""
+
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def fold_accents(text: str) -> str:
+    """Retire les accents et passe en minuscules ("Démo" -> "demo")"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_text(text: str) -> str:
+    """Forme canonique d'un message: sans accents, ponctuation ni espaces superflus"""
+    return " ".join(_NON_WORD.sub(" ", fold_accents(text)).split())
@@ -0,0 +1,71 @@
+import asyncio
+
+import fakeredis
+
+from src.dedup import SignalDeduplicator
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def instances(count=2, **kwargs):
+    """Consommateurs distincts (filtres locaux séparés) partageant un même Redis"""
+    shared = fakeredis.FakeAsyncRedis()
+    return shared, [SignalDeduplicator(shared, **kwargs) for _ in range(count)]
+
+
+def test_signal_is_claimed_by_a_single_consumer():
+    async def scenario():
+        _, (a, b) = instances()
+        return await a.claim("sig-1"), await b.claim("sig-1"), await a.claim("sig-1")
+
+    assert run(scenario()) == (True, False, False)
+
+
+def test_claim_is_a_lease_that_expires():
+    async def scenario():
+        redis, (a, b) = instances(lease_seconds=30, done_ttl=3600)
+        await a.claim("sig-1")
+        lease = await redis.ttl("signal:sig-1")
+        # Consommateur mort avant `complete`: le bail expire, le signal redevient traitable
+        await redis.delete("signal:sig-1")
+        return lease, await b.claim("sig-1")
+
+    lease, reclaimed = run(scenario())
+    assert 0 < lease <= 30
+    assert reclaimed is True
+
+
+def test_released_signal_can_be_claimed_again():
+    async def scenario():
+        _, (a, b) = instances()
+        await a.claim("sig-1")
+        await a.release("sig-1")
+        return await b.claim("sig-1")
+
+    assert run(scenario()) is True
+
+
+def test_completed_signal_is_rejected_by_other_consumers_and_locally():
+    async def scenario():
+        redis, (a, b) = instances(lease_seconds=30, done_ttl=3600)
+        await a.claim("sig-1")
+        await a.complete("sig-1")
+        state = await redis.get("signal:sig-1"), await redis.ttl("signal:sig-1")
+        other = await b.claim("sig-1")
+        await redis.flushall()  # Doublon récent: le filtre local suffit, sans Redis
+        return state, other, await a.claim("sig-1")
+
+    (value, ttl), other, local = run(scenario())
+    assert value == b"done" and 30 < ttl <= 3600
+    assert other is False
+    assert local is False
+
+
+def test_claim_is_allowed_when_redis_is_unavailable():
+    class Down:
+        async def set(self, *args, **kwargs):
+            raise ConnectionError("redis down")
+
+    assert run(SignalDeduplicator(Down()).claim("sig-1")) is True
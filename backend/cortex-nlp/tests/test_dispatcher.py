@@ -0,0 +1,184 @@
+import asyncio
+
+from src.dispatcher import ReadyQueue, SessionOrderedDispatcher, priority_level
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def dispatch(dispatcher, records):
+    dispatcher.start()
+    for key, value, offset in records:
+        await dispatcher.submit(key, value, "tp0", offset)
+    assert await dispatcher.drain(timeout=5)
+    await dispatcher.stop()
+    return dispatcher.offsets.committable()
+
+
+def test_failed_record_is_retried_before_its_offset_is_committed():
+    attempts = []
+
+    async def handler(value):
+        attempts.append(value)
+        if value == "flaky" and attempts.count("flaky") < 3:
+            raise RuntimeError("redis down")
+
+    dispatcher = SessionOrderedDispatcher(handler, max_attempts=5, retry_backoff=0)
+    committable = run(dispatch(dispatcher, [("s1", "ok", 9), ("s1", "flaky", 10), ("s1", "next", 11)]))
+
+    assert attempts == ["ok", "flaky", "flaky", "flaky", "next"]
+    assert committable == {"tp0": 12}
+
+
+def test_raising_handler_does_not_advance_committable_offset():
+    async def scenario():
+        async def handler(value):
+            raise RuntimeError("boom")
+
+        dispatcher = SessionOrderedDispatcher(handler, max_attempts=2, retry_backoff=0.01)
+        dispatcher.start()
+        await dispatcher.submit("s1", "bad", "tp0", 10)
+        await dispatcher.submit("s2", "other", "tp0", 11)
+        await asyncio.sleep(0.1)
+        committable = dispatcher.offsets.committable()
+        await dispatcher.stop()
+        return committable
+
+    # Sans dead-letter, l'enregistrement est réessayé indéfiniment: rien à committer
+    assert run(scenario()) == {}
+
+
+def test_record_is_committed_only_after_dead_letter():
+    dead_letters = []
+
+    async def handler(value):
+        if value == "bad":
+            raise RuntimeError("boom")
+
+    async def on_failure(value, error):
+        dead_letters.append((value, str(error)))
+
+    dispatcher = SessionOrderedDispatcher(handler, max_attempts=3, retry_backoff=0, on_failure=on_failure)
+    committable = run(dispatch(dispatcher, [("s1", "bad", 10), ("s1", "good", 11)]))
+
+    assert dead_letters == [("bad", "boom")]
+    assert committable == {"tp0": 12}
+
+
+def test_failed_dead_letter_keeps_retrying():
+    calls = {"handler": 0, "dead_letter": 0}
+
+    async def handler(value):
+        calls["handler"] += 1
+        if calls["handler"] < 4:
+            raise RuntimeError("boom")
+
+    async def on_failure(value, error):
+        calls["dead_letter"] += 1
+        raise RuntimeError("kafka down")
+
+    dispatcher = SessionOrderedDispatcher(handler, max_attempts=2, retry_backoff=0, on_failure=on_failure)
+    committable = run(dispatch(dispatcher, [("s1", "bad", 10)]))
+
+    assert calls == {"handler": 4, "dead_letter": 2}
+    assert committable == {"tp0": 11}
+
+
+def test_revoked_partition_stops_retries_without_committing():
+    async def scenario():
+        attempts = []
+
+        async def handler(value):
+            attempts.append(value)
+            raise RuntimeError("boom")
+
+        dispatcher = SessionOrderedDispatcher(handler, max_attempts=100, retry_backoff=0.01)
+        dispatcher.start()
+        await dispatcher.submit("s1", "bad", "tp0", 10)
+        await asyncio.sleep(0.05)
+        dispatcher.revoke(["tp0"])
+        assert await dispatcher.drain(timeout=1)
+        await dispatcher.stop()
+        return attempts, dispatcher.offsets.committable()
+
+    attempts, committable = run(scenario())
+    assert attempts
+    assert committable == {}
+
+
+def test_records_of_a_session_run_in_order_while_sessions_run_in_parallel():
+    async def scenario():
+        events = []
+        running = set()
+        peak = 0
+
+        async def handler(value):
+            nonlocal peak
+            key, n = value
+            assert key not in running
+            running.add(key)
+            peak = max(peak, len(running))
+            await asyncio.sleep(0.01 * (3 - n))  # Les premiers messages sont les plus lents
+            running.discard(key)
+            events.append(value)
+
+        dispatcher = SessionOrderedDispatcher(handler, max_in_flight=4)
+        records = [(key, (key, n), offset) for offset, (n, key) in enumerate((n, key) for n in range(3) for key in ("s1", "s2"))]
+        committable = await dispatch(dispatcher, records)
+        return events, peak, committable
+
+    events, peak, committable = run(scenario())
+    assert [n for key, n in events if key == "s1"] == [0, 1, 2]
+    assert [n for key, n in events if key == "s2"] == [0, 1, 2]
+    assert peak == 2
+    assert committable == {"tp0": 6}
+
+
+def test_ready_sessions_are_served_by_priority():
+    async def scenario():
+        order = []
+        gate = asyncio.Event()
+
+        async def handler(value):
+            if value == "busy":
+                await gate.wait()
+            order.append(value)
+
+        dispatcher = SessionOrderedDispatcher(handler, max_in_flight=1, max_pending=8)
+        dispatcher.start()
+        await dispatcher.submit("s0", "busy", "tp0", 0)
+        while not dispatcher.running:
+            await asyncio.sleep(0)
+        for offset, (key, priority) in enumerate((("s1", "LOW"), ("s2", "NORMAL"), ("s3", "CRITICAL"), ("s4", "HIGH")), 1):
+            await dispatcher.submit(key, priority, "tp0", offset, priority=priority)
+        gate.set()
+        assert await dispatcher.drain(timeout=5)
+        await dispatcher.stop()
+        return order
+
+    assert run(scenario()) == ["busy", "CRITICAL", "HIGH", "NORMAL", "LOW"]
+
+
+def test_aged_session_is_served_before_higher_priorities():
+    async def scenario():
+        queue = ReadyQueue(aging_seconds=0.05)
+        queue.put("low", priority_level("LOW"))
+        await asyncio.sleep(0.06)
+        queue.put("high", priority_level("HIGH"))
+        queue.put("critical", priority_level("CRITICAL"))
+        return [await queue.get() for _ in range(3)]
+
+    assert run(scenario()) == ["low", "critical", "high"]
+
+
+def test_waiting_session_is_raised_to_its_most_urgent_message():
+    async def scenario():
+        queue = ReadyQueue(aging_seconds=60)
+        queue.put("s1", priority_level("LOW"))
+        queue.put("s2", priority_level("NORMAL"))
+        queue.put("s1", priority_level("CRITICAL"))
+        queue.put("s1", priority_level("LOW"))  # Ne rabaisse pas
+        return [await queue.get() for _ in range(2)]
+
+    assert run(scenario()) == ["s1", "s2"]
@@ -0,0 +1,39 @@
+from src.intents import DEFAULT_INTENT, IntentEngine
+
+
+def test_keywords_match_whole_words_only():
+    engine = IntentEngine()
+    assert engine.detect("Une intégration rapide de l'API ?").keywords_matched == ["intégration", "rapide", "api"]
+    assert engine.detect("Ça se déploie rapidement, l'apiculture").intent == DEFAULT_INTENT
+
+
+def test_matching_ignores_accents_case_and_spacing():
+    engine = IntentEngine()
+    assert engine.detect("QUEL COUT ?").keywords_matched == ["coût"]
+    assert engine.detect("Un Rendez-Vous demain").intent == "contact"
+    composed = IntentEngine({"contact": ["prendre rendez-vous"]})
+    assert composed.detect("Pour PRENDRE \n  rendez-vous").intent == "contact"
+
+
+def test_overlapping_keywords_are_all_found():
+    engine = IntentEngine({"a": ["tech", "technique"], "b": ["nique", "que"]})
+    result = engine.detect("technique")
+    # "tech" n'est pas un mot entier ici; "nique" et "que" non plus
+    assert result.keywords_matched == ["technique"]
+    assert result.scores == {"a": 1, "b": 0}
+
+
+def test_best_intent_by_score_then_lexicon_order():
+    engine = IntentEngine()
+    result = engine.detect("Quel prix et quel délai ? Le budget compte")
+    assert result.scores["budget"] == 2 and result.scores["timeline"] == 1
+    assert result.intent == "budget"
+    assert result.confidence == 0.85
+    # Égalité: l'intention déclarée en premier l'emporte
+    assert engine.detect("Quel délai pour le prix ?").intent == "budget"
+
+
+def test_batch_detection_matches_single_detection():
+    engine = IntentEngine()
+    messages = ["Combien ?", "", "Une démo, puis un appel", "api", "bonjour"]
+    assert engine.detect_many(messages) == [engine.detect(m) for m in messages]
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import httpx
+
+from src.main import ConversationMessage, LLMClient
+
+OPENING = [ConversationMessage(role="user", content="Quel budget pour un chatbot ?")]
+ALICE = {"name": "Alice Martin", "company": "Acme SAS"}
+BOB = {"name": "Bob Durand", "company": "Globex"}
+
+
+def gateway(calls):
+    """Passerelle qui répond avec le prospect vu dans le prompt système"""
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        system = body["messages"][0]["content"]
+        calls.append(system)
+        prospect = " / ".join(line for line in system.splitlines() if line.startswith(("- Nom", "- Entreprise")))
+        if body.get("stream"):
+            chunk = json.dumps({"choices": [{"delta": {"content": prospect}}]})
+            return httpx.Response(200, content=f"data: {chunk}\n\ndata: [DONE]\n\n".encode())
+        return httpx.Response(200, json={"choices": [{"message": {"content": prospect}}]})
+    return httpx.MockTransport(handle)
+
+
+async def replies(stream: bool):
+    calls = []
+    async with httpx.AsyncClient(transport=gateway(calls)) as http:
+        llm = LLMClient(http, "key", "http://llm/v1/chat/completions", cache_intents={"budget"})
+        out = []
+        for prospect in (ALICE, BOB):
+            if stream:
+                parts = [c async for c in llm.stream_response(OPENING, prospect, cache_intent="budget")]
+                out.append("".join(parts))
+            else:
+                out.append(await llm.generate_response(OPENING, prospect, cache_intent="budget"))
+        return out, calls
+
+
+def test_cached_reply_never_carries_another_prospects_details():
+    for stream in (False, True):
+        (alice_reply, bob_reply), calls = asyncio.run(replies(stream))
+        assert len(calls) == 1  # Deuxième prospect servi par le cache
+        for text in (alice_reply, bob_reply, calls[0]):
+            for detail in (*ALICE.values(), *BOB.values()):
+                assert detail not in text
+
+
+def test_uncached_intent_keeps_personalized_prompt():
+    async def scenario():
+        calls = []
+        async with httpx.AsyncClient(transport=gateway(calls)) as http:
+            llm = LLMClient(http, "key", "http://llm/v1/chat/completions", cache_intents={"budget"})
+            alice = await llm.generate_response(OPENING, ALICE, cache_intent="demo")
+            bob = await llm.generate_response(OPENING, BOB, cache_intent="demo")
+        return alice, bob, calls
+
+    alice, bob, calls = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert "Alice Martin" in alice and "Acme SAS" in alice
+    assert "Bob Durand" in bob and "Alice" not in bob
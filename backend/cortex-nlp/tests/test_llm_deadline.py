@@ -0,0 +1,45 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from src.main import ConversationMessage, LLMClient
+from src.resilience import DeadlineExceeded
+
+MESSAGES = [ConversationMessage(role="user", content="Bonjour")]
+
+
+def trickling_gateway(chunks: int, interval: float):
+    """Passerelle SSE qui envoie un fragment toutes les `interval` secondes"""
+    async def body():
+        for i in range(chunks):
+            await asyncio.sleep(interval)
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': str(i)}}]})}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+    return httpx.MockTransport(handle)
+
+
+async def consume(deadline):
+    async with httpx.AsyncClient(transport=trickling_gateway(chunks=50, interval=0.02)) as http:
+        llm = LLMClient(http, "key", "http://llm/v1/chat/completions", cache_intents=set())
+        parts = []
+        async for chunk in llm.stream_response(MESSAGES, {}, deadline=deadline):
+            parts.append(chunk)
+        return parts
+
+
+def test_trickling_stream_stops_at_signal_deadline():
+    started = time.time()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(consume(deadline=started + 0.2))
+    # Chaque lecture reste sous le timeout httpx; seule l'échéance globale arrête le flux
+    assert time.time() - started < 0.5
+
+
+def test_stream_without_deadline_runs_to_completion():
+    assert len(asyncio.run(consume(deadline=None))) == 50
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import fakeredis
+import httpx
+
+from src.main import ConversationStateManager, LLMClient, MessageProcessor
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Producer:
+    """Producteur Kafka factice: chaque envoi est acquitté immédiatement"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, topic, value=None, key=None, headers=None):
+        self.sent.append((topic, json.loads(value)))
+        delivery = asyncio.get_running_loop().create_future()
+        delivery.set_result(None)
+        return delivery
+
+
+def gateway(calls):
+    def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        chunk = json.dumps({"choices": [{"delta": {"content": f"réponse {len(calls)}"}}]})
+        body = json.loads(request.content)
+        if body.get("stream"):
+            return httpx.Response(200, content=f"data: {chunk}\n\ndata: [DONE]\n\n".encode())
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"réponse {len(calls)}"}}]})
+    return httpx.MockTransport(handle)
+
+
+def signal(signal_id, message, **payload):
+    return {
+        "id": signal_id,
+        "type": "LEAD_MESSAGE_RECEIVED",
+        "payload": {"session_id": "s1", "message": message, "prospect_info": {"name": "Alice"}, **payload}
+    }
+
+
+async def process(signals):
+    calls = []
+    producer = Producer()
+    async with httpx.AsyncClient(transport=gateway(calls)) as http:
+        processor = MessageProcessor(
+            LLMClient(http, "key", "http://llm/v1/chat/completions"),
+            ConversationStateManager(fakeredis.FakeAsyncRedis()),
+            producer
+        )
+        for s in signals:
+            await processor.process_lead_message(s)
+    responses = [
+        payload["payload"] for topic, payload in producer.sent
+        if payload["type"] == "ASSISTANT_RESPONSE" and payload["payload"].get("final")
+    ]
+    return calls, responses
+
+
+def test_resent_message_with_a_new_signal_id_is_generated_once():
+    calls, responses = run(process([signal("sig-1", "Bonjour !"), signal("sig-2", "bonjour")]))
+
+    assert len(calls) == 1
+    assert [r["response"] for r in responses] == ["réponse 1", "réponse 1"]
+    assert [r["coalesced"] for r in responses] == [False, True]
+
+
+def test_repeated_text_after_another_message_gets_its_own_reply():
+    calls, responses = run(process([signal("sig-1", "oui"), signal("sig-2", "non"), signal("sig-3", "oui")]))
+
+    assert len(calls) == 3
+    assert not any(r["coalesced"] for r in responses)
+
+
+def test_delta_protocol_repeats_are_new_messages():
+    calls, _ = run(process([signal("sig-1", "oui", seq=1), signal("sig-2", "oui", seq=2)]))
+
+    assert len(calls) == 2
+
+
+def test_signal_expiry_matches_the_shared_type(monkeypatch):
+    import shared.types
+    from shared.types import CortexId, SignalPondere
+    from src.main import signal_expired
+
+    sent = SignalPondere.trusted(type="LEAD_MESSAGE_RECEIVED", source=CortexId.SENSORIEL, payload={}, ttl=1000)
+    raw = sent.model_dump(mode="json")
+    for elapsed in (999, 1000, 1001):
+        monkeypatch.setattr(shared.types, "now_ms", lambda: sent.timestamp + elapsed)
+        assert signal_expired(raw) == sent.is_expired() == (elapsed > 1000)
+    assert not signal_expired({"timestamp": 0})
@@ -0,0 +1,81 @@
+import asyncio
+
+from src.reports import ReportJob, ReportWorker, conversation_hash
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def job(session_id, *contents):
+    messages = [{"role": "user", "content": c} for c in contents]
+    return ReportJob(session_id, conversation_hash(messages), messages, {"name": "Alice"})
+
+
+class Reports:
+    """`generate`/`emit` factices; `gate` retient les générations"""
+
+    def __init__(self):
+        self.generated = []
+        self.emitted = []
+        self.gate = asyncio.Event()
+
+    async def generate(self, job):
+        await self.gate.wait()
+        self.generated.append(job.messages[-1]["content"])
+        return f"rapport {job.messages[-1]['content']}"
+
+    async def emit(self, job, report, cached):
+        self.emitted.append((job.session_id, report, cached))
+
+
+async def settle(worker):
+    while len(worker) or worker._running:
+        await asyncio.sleep(0.01)
+
+
+def test_newer_conversation_supersedes_the_pending_job():
+    async def scenario():
+        reports = Reports()
+        worker = ReportWorker(reports.generate, reports.emit, workers=1)
+        worker.start()
+        busy = await worker.submit(job("other", "a"))  # Occupe le seul worker
+        await asyncio.sleep(0)
+        statuses = [busy, await worker.submit(job("s1", "m1")), await worker.submit(job("s1", "m1", "m2"))]
+        queued = len(worker)
+        reports.gate.set()
+        await settle(worker)
+        await worker.stop()
+        return statuses, queued, reports.generated
+
+    statuses, queued, generated = run(scenario())
+    assert statuses == ["queued", "queued", "superseded"]
+    assert queued == 1
+    assert generated == ["a", "m2"]
+
+
+def test_identical_conversation_is_deduplicated_then_served_from_cache():
+    async def scenario():
+        reports = Reports()
+        worker = ReportWorker(reports.generate, reports.emit, workers=1)
+        worker.start()
+        first = await worker.submit(job("s1", "m1", "m2"))
+        await asyncio.sleep(0)
+        while_running = await worker.submit(job("s1", "m1", "m2"))
+        reports.gate.set()
+        await settle(worker)
+        after = await worker.submit(job("s1", "m1", "m2"))
+        await worker.stop()
+        return [first, while_running, after], reports.generated, reports.emitted
+
+    statuses, generated, emitted = run(scenario())
+    assert statuses == ["queued", "deduplicated", "cached"]
+    assert generated == ["m2"]
+    assert emitted == [("s1", "rapport m2", False), ("s1", "rapport m2", True)]
+
+
+def test_conversation_hash_covers_summary_and_roles():
+    messages = [{"role": "user", "content": "bonjour"}]
+    assert conversation_hash(messages) == conversation_hash([dict(m) for m in messages])
+    assert conversation_hash(messages) != conversation_hash([{"role": "assistant", "content": "bonjour"}])
+    assert conversation_hash(messages) != conversation_hash(messages, {"text": "résumé"})
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from src.resilience import AdaptiveLimiter, CircuitBreaker, CircuitOpenError, DeadlineExceeded, GatewayGuard
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def guard(min_limit=1, **breaker):
+    return GatewayGuard(
+        AdaptiveLimiter(initial=4, min_limit=min_limit, max_limit=8, latency_target=1.0, cooldown=0),
+        CircuitBreaker(**{"error_rate": 0.5, "min_requests": 2, "window": 4, "reset_seconds": 0.05, **breaker})
+    )
+
+
+async def call(gateway, outcome=None, max_wait=None):
+    async with gateway.slot(max_wait=max_wait):
+        if outcome is not None:
+            raise outcome
+
+
+async def fail(gateway, count):
+    for _ in range(count):
+        with pytest.raises(RuntimeError):
+            await call(gateway, RuntimeError("502"))
+
+
+def test_errors_open_the_circuit_and_halve_the_limit():
+    async def scenario():
+        gateway = guard()
+        await fail(gateway, 2)
+        with pytest.raises(CircuitOpenError):
+            await call(gateway)
+        return gateway
+
+    gateway = run(scenario())
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+    assert gateway.limiter.limit == 1.0
+
+
+def test_fast_successes_raise_the_limit_additively():
+    async def scenario():
+        gateway = guard()
+        for _ in range(4):
+            await call(gateway)
+        return gateway.limiter.limit
+
+    assert 4.9 < run(scenario()) < 5.0
+
+
+def test_deadline_and_cancellation_are_not_gateway_failures():
+    async def scenario():
+        gateway = guard(min_requests=1)
+        with pytest.raises(DeadlineExceeded):
+            await call(gateway, DeadlineExceeded("ttl"))
+
+        entered = asyncio.Event()
+
+        async def slow():
+            async with gateway.slot():
+                entered.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(slow())
+        await entered.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return gateway
+
+    gateway = run(scenario())
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+    assert list(gateway.breaker._outcomes) == []
+    assert gateway.limiter.limit == 4.0
+    assert gateway.limiter.in_flight == 0
+
+
+def test_only_the_probe_call_decides_the_half_open_state():
+    async def scenario():
+        gateway = guard(min_limit=2)  # Place pour l'appel de test à côté de l'appel en cours
+        release_stale = asyncio.Event()
+
+        async def stale():
+            # Appel lancé circuit fermé, terminé pendant la demi-ouverture
+            async with gateway.slot():
+                await release_stale.wait()
+
+        stale_task = asyncio.create_task(stale())
+        await asyncio.sleep(0)
+        await fail(gateway, 2)
+        await asyncio.sleep(0.06)  # Délai de réarmement écoulé
+
+        probe_started = asyncio.Event()
+        finish_probe = asyncio.Event()
+
+        async def probe():
+            async with gateway.slot():
+                probe_started.set()
+                await finish_probe.wait()
+
+        probe_task = asyncio.create_task(probe())
+        await probe_started.wait()
+        release_stale.set()
+        await stale_task
+        after_stale = gateway.breaker.state, gateway.breaker.allow()
+
+        finish_probe.set()
+        await probe_task
+        return after_stale, gateway.breaker.state
+
+    (state, second_probe_allowed), final = run(scenario())
+    assert state == CircuitBreaker.HALF_OPEN
+    assert second_probe_allowed is False
+    assert final == CircuitBreaker.CLOSED
+
+
+def test_cancelled_probe_lets_the_next_call_probe():
+    async def scenario():
+        gateway = guard()
+        await fail(gateway, 2)
+        await asyncio.sleep(0.06)
+
+        started = asyncio.Event()
+
+        async def probe():
+            async with gateway.slot():
+                started.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(probe())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await call(gateway)
+        return gateway.breaker.state
+
+    assert run(scenario()) == CircuitBreaker.CLOSED
@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import fakeredis
+
+from src.main import ACTIVE_INDEX_KEY, CachedConversationStateManager, ConversationStateManager
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def manager(max_messages=4):
+    return ConversationStateManager(fakeredis.FakeAsyncRedis(), max_messages=max_messages)
+
+
+def test_append_trims_history_to_max_messages():
+    async def scenario():
+        state = manager(max_messages=4)
+        for i in range(6):
+            history = await state.add_message("s1", "user", f"m{i}")
+        return history, await state.get_conversation("s1"), await state.redis.ttl("conversation:s1")
+
+    history, stored, ttl = run(scenario())
+    assert [m["content"] for m in history] == ["m2", "m3", "m4", "m5"]
+    assert stored == history
+    assert 0 < ttl <= 3600
+
+
+def test_append_returns_the_requested_window():
+    async def scenario():
+        state = manager()
+        await state.add_message("s1", "user", "bonjour")
+        await state.add_message("s1", "assistant", "bonjour !")
+        return (
+            await state.add_message("s1", "user", "tarifs ?", window=2),
+            await state.add_message("s1", "assistant", "dès 49 €", window=0)
+        )
+
+    last_two, nothing = run(scenario())
+    assert last_two == [{"role": "assistant", "content": "bonjour !"}, {"role": "user", "content": "tarifs ?"}]
+    assert nothing == []
+
+
+def test_append_writes_prospect_and_activity_index():
+    async def scenario():
+        state = manager()
+        await state.add_message("s1", "user", "bonjour", prospect_info={"name": "Alice"})
+        await state.add_message("s1", "assistant", "bonjour Alice")  # Infos prospect inchangées
+        return await state.get_prospect_info("s1"), await state.redis.zscore(ACTIVE_INDEX_KEY, "s1")
+
+    prospect, last_seen = run(scenario())
+    assert prospect == {"name": "Alice"}
+    assert last_seen is not None
+
+
+def test_append_updates_qualification_incrementally():
+    async def scenario():
+        state = manager(max_messages=2)
+        await state.add_message("s1", "user", "Quel budget ?", prospect_info={"phone": "0600000000"})
+        await state.add_message("s1", "assistant", "Dès 49 €")
+        await state.add_message("s1", "user", "On peut commencer quand ?")
+        return await state.get_qualification("s1")
+
+    qualification = run(scenario())
+    # Cumul sur toute la session, au-delà des messages conservés
+    assert qualification.messages == 3
+    assert qualification.keywords == {"budget", "commencer", "quand"}
+    assert qualification.phone is True
+
+
+def test_append_migrates_legacy_json_history():
+    async def scenario():
+        state = manager()
+        legacy = [{"role": "user", "content": "ancien"}]
+        await state.redis.set("conversation:s1", json.dumps(legacy))
+        await state.add_message("s1", "assistant", "nouveau")
+        return await state.redis.type("conversation:s1"), await state.get_conversation("s1")
+
+    kind, history = run(scenario())
+    assert kind == b"list"
+    assert [m["content"] for m in history] == ["ancien", "nouveau"]
+
+
+def test_summary_folds_the_covered_messages():
+    async def scenario():
+        state = manager(max_messages=10)
+        for i in range(5):
+            await state.add_message("s1", "user", f"m{i}")
+        applied = await state.apply_summary("s1", {"text": "m0 à m2", "covered": 3}, 3)
+        return applied, await state.get_summary("s1"), await state.get_conversation("s1"), await state.redis.ttl("summary:s1")
+
+    applied, summary, history, ttl = run(scenario())
+    assert applied is True
+    assert summary == {"text": "m0 à m2", "covered": 3}
+    assert [m["content"] for m in history] == ["m3", "m4"]
+    assert 0 < ttl <= 3600
+
+
+def test_summary_keeps_messages_appended_meanwhile():
+    async def scenario():
+        state = manager(max_messages=10)
+        for i in range(3):
+            await state.add_message("s1", "user", f"m{i}")
+        # Message ajouté pendant la génération du résumé: conservé en queue
+        await state.add_message("s1", "assistant", "m3")
+        applied = await state.apply_summary("s1", {"text": "m0 à m1", "covered": 2}, 2)
+        return applied, await state.get_conversation("s1")
+
+    applied, history = run(scenario())
+    assert applied is True
+    assert [m["content"] for m in history] == ["m2", "m3"]
+
+
+def test_stale_summary_is_not_applied():
+    async def scenario():
+        state = manager(max_messages=10)
+        for i in range(4):
+            await state.add_message("s1", "user", f"m{i}")
+        # Historique remplacé (resync) entre la lecture et l'application du résumé
+        await state.replace_history("s1", [{"role": "user", "content": "r0"}])
+        applied = await state.apply_summary("s1", {"text": "m0 à m2", "covered": 3}, 3)
+        return applied, await state.get_summary("s1"), await state.get_conversation("s1")
+
+    applied, summary, history = run(scenario())
+    assert applied is False
+    assert summary is None
+    assert history == [{"role": "user", "content": "r0"}]
+
+
+def test_foreign_session_rebuild_does_not_fill_the_local_cache():
+    async def scenario():
+        shared = fakeredis.FakeAsyncRedis()
+        owner = ConversationStateManager(shared)
+        await owner.add_message("s1", "user", "Quel budget ?", prospect_info={"phone": "0600000000"})
+        await shared.delete("qualification:s1")  # Session antérieure au suivi incrémental
+
+        other = CachedConversationStateManager(shared)
+        # Lecture directe de l'endpoint de qualification sur un autre consommateur
+        qualification = await ConversationStateManager.get_qualification(other, "s1")
+        caches = (other.histories, other.summaries, other.prospects, other.qualifications)
+        return qualification, [len(cache) for cache in caches]
+
+    qualification, sizes = run(scenario())
+    assert qualification.messages == 1
+    assert qualification.keywords == {"budget"} and qualification.phone is True
+    assert sizes == [0, 0, 0, 0]
+
+
+def test_revoke_forgets_sessions_whose_partition_index_was_evicted():
+    async def scenario():
+        state = CachedConversationStateManager(fakeredis.FakeAsyncRedis(), cache_size=2)
+        for session_id, partition in (("s1", "tp0"), ("s2", "tp1"), ("s3", "tp1")):
+            state.track_partition(session_id, partition)
+            await state.add_message(session_id, "user", "bonjour")
+        await state.get_conversation("s1")  # s1 reste dans l'historique local, pas dans l'index
+        cached = sorted(sid for sid, _ in state.histories.items())
+
+        state.invalidate_partitions(["tp0"])
+        return cached, sorted(sid for sid, _ in state.histories.items())
+
+    cached, kept = run(scenario())
+    assert cached == ["s1", "s3"]
+    assert kept == ["s3"]
@@ -0,0 +1,260 @@
+"""
+Ingestion en masse - lots JSON et flux NDJSON
+
+Les intégrations qui transfèrent des historiques de chat envoient de
+nombreux messages d'un coup. Les enregistrements sont validés par lots
+(un seul appel Pydantic tant qu'ils sont tous valides), produits sans
+attendre l'ack de chacun (au plus `max_in_flight` envois non acquittés),
+et chaque enregistrement reçoit son propre résultat, dans l'ordre:
+`accepted`, `invalid` (erreurs de validation), `duplicate` (`seq` déjà
+transmis, protocole delta) ou `failed` (livraison).
+
+Les enregistrements avec `seq` passent par le même suivi de séquences que
+`POST /api/v1/chat`: renvois ignorés, trous signalés (`gap`), séquence
+libérée si la livraison échoue.
+"""
+
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Type
+
+from prometheus_client import Counter, Histogram
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from starlette.responses import StreamingResponse
+
+from shared.codec import loads_json
+from shared.types import SignalPondere
+from src.sequence import DUPLICATE, SequenceTracker
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+INGESTED_RECORDS = Counter(
+    'cortex_sensoriel_ingest_records_total',
+    'Records received by the bulk ingestion endpoints',
+    ['endpoint', 'status']
+)
+
+INGEST_REQUEST_RECORDS = Histogram(
+    'cortex_sensoriel_ingest_request_records',
+    'Records per bulk ingestion request',
+    ['endpoint'],
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+)
+
+# ============================================
+# INGESTION
+# ============================================
+
+# (index, modèle validé ou None, erreurs ou None)
+Validated = Tuple[int, Optional[BaseModel], Optional[List[Dict[str, Any]]]]
+
+# (index, modèle validé ou None, signal ou None, erreurs / ack / exception)
+Pending = Tuple[int, Optional[BaseModel], Optional[SignalPondere], Any]
+
+
+class BulkIngestor:
+    """Valide, produit et rapporte des enregistrements de chat par lots"""
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        build_signal: Callable[[Any, Optional[Dict[str, int]]], SignalPondere],
+        produce: Callable[[SignalPondere, str], Awaitable[asyncio.Future]],
+        max_in_flight: int = 500,
+        max_line_bytes: int = 1 << 20,
+        sequences: Optional[SequenceTracker] = None
+    ):
+        self.model = model
+        self.build_signal = build_signal
+        self.produce = produce
+        self.sequences = sequences
+        self.max_in_flight = max_in_flight
+        self.max_line_bytes = max_line_bytes
+        self._adapter = TypeAdapter(List[model])
+
+    def validate(self, records: List[Any], start: int = 0) -> List[Validated]:
+        """Valide des enregistrements bruts; les invalides portent leurs erreurs"""
+        try:
+            return [(start + i, item, None) for i, item in enumerate(self._adapter.validate_python(records))]
+        except ValidationError as e:
+            errors: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+            for error in e.errors(include_url=False):
+                index, *loc = error["loc"]
+                errors[index].append({"loc": loc, "msg": error["msg"], "type": error["type"]})
+        valid = [i for i in range(len(records)) if i not in errors]
+        models = iter(self._adapter.validate_python([records[i] for i in valid]))
+        return [
+            (start + i, None, errors[i]) if i in errors else (start + i, next(models), None)
+            for i in range(len(records))
+        ]
+
+    async def ingest(self, records: List[Any], endpoint: str = "batch") -> List[Dict[str, Any]]:
+        """Ingère un lot complet et retourne un résultat par enregistrement"""
+        INGEST_REQUEST_RECORDS.labels(endpoint=endpoint).observe(len(records))
+        return [result async for result in self._produce(_once(self.validate(records)), endpoint)]
+
+    async def ingest_ndjson(self, chunks: AsyncIterable[bytes], endpoint: str = "stream") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Ingère un flux NDJSON (un enregistrement par ligne, lignes vides
+        ignorées) et produit les résultats au fil des acks. Les lignes
+        complètes de chaque fragment reçu sont validées ensemble.
+        """
+        counted = _Counted(self._parse_ndjson(chunks))
+        async for result in self._produce(counted, endpoint):
+            yield result
+        INGEST_REQUEST_RECORDS.labels(endpoint=endpoint).observe(counted.records)
+
+    async def _parse_ndjson(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[List[Validated]]:
+        index = 0
+        buffer = b""
+        skipping = False  # Ligne trop longue: ignorée jusqu'au prochain saut de ligne
+        async for chunk in chunks:
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            if skipping and lines:
+                lines, skipping = lines[1:], False
+            batch = self._parse_lines(lines, index)
+            index += len(batch)
+            if not skipping and len(buffer) > self.max_line_bytes:
+                batch.append((index, None, [self._too_long()]))
+                index += 1
+                buffer, skipping = b"", True
+            elif skipping:
+                buffer = b""
+            if batch:
+                yield batch
+        if not skipping:
+            batch = self._parse_lines([buffer], index)
+            if batch:
+                yield batch
+
+    def _parse_lines(self, lines: List[bytes], start: int) -> List[Validated]:
+        parsed: List[Any] = []
+        malformed: Dict[int, Dict[str, Any]] = {}
+        for line in lines:
+            if not line.strip():
+                continue
+            if len(line) > self.max_line_bytes:
+                # Ligne complète reçue d'un seul fragment: même limite que le reste en attente
+                malformed[len(parsed)] = self._too_long()
+                parsed.append(None)
+                continue
+            try:
+                parsed.append(loads_json(line))
+            except ValueError as e:
+                malformed[len(parsed)] = {"loc": [], "msg": f"Invalid JSON: {e}", "type": "json_invalid"}
+                parsed.append(None)
+        if not malformed:
+            return self.validate(parsed, start)
+        valid = [i for i in range(len(parsed)) if i not in malformed]
+        validated = {i: v for i, v in zip(valid, self.validate([parsed[i] for i in valid]))}
+        return [
+            (start + i, None, [malformed[i]]) if i in malformed else (start + i, validated[i][1], validated[i][2])
+            for i in range(len(parsed))
+        ]
+
+    def _too_long(self) -> Dict[str, Any]:
+        return {"loc": [], "msg": f"Line exceeds {self.max_line_bytes} bytes", "type": "line_too_long"}
+
+    async def _produce(self, batches: AsyncIterable[List[Validated]], endpoint: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Produit les enregistrements valides sans attendre leurs acks, et
+        rend les résultats dans l'ordre dès que celui de tête est connu.
+        """
+        window: Deque[Pending] = deque()
+        async for batch in batches:
+            for index, request, errors in batch:
+                if errors is not None:
+                    window.append((index, None, None, errors))
+                    continue
+                gap = None
+                if self.sequences is not None and request.seq is not None:
+                    status, gap = self.sequences.observe(request.session_id, request.seq, request.resync)
+                    if status == DUPLICATE:
+                        window.append((index, request, None, None))
+                        continue
+                signal = self.build_signal(request, gap)
+                try:
+                    delivery = await self.produce(signal, request.session_id)
+                except Exception as e:
+                    delivery = e
+                window.append((index, request, signal, delivery))
+                if len(window) >= self.max_in_flight:
+                    yield await self._settled(endpoint, window.popleft())
+                while window and _ready(window[0][3]):
+                    yield await self._settled(endpoint, window.popleft())
+        while window:
+            yield await self._settled(endpoint, window.popleft())
+
+    async def _settled(self, endpoint: str, entry: Pending) -> Dict[str, Any]:
+        index, request, signal, outcome = entry
+        if request is None:
+            INGESTED_RECORDS.labels(endpoint=endpoint, status="invalid").inc()
+            return {"index": index, "status": "invalid", "errors": outcome}
+        if signal is None:
+            INGESTED_RECORDS.labels(endpoint=endpoint, status="duplicate").inc()
+            return {"index": index, "status": "duplicate", "seq": request.seq}
+        if isinstance(outcome, asyncio.Future):
+            try:
+                await outcome
+                outcome = None
+            except Exception as e:
+                outcome = e
+        if outcome is not None:
+            if self.sequences is not None and request.seq is not None:
+                self.sequences.release(request.session_id, request.seq)
+            INGESTED_RECORDS.labels(endpoint=endpoint, status="failed").inc()
+            return {"index": index, "status": "failed", "error": str(outcome)}
+        INGESTED_RECORDS.labels(endpoint=endpoint, status="accepted").inc()
+        return {
+            "index": index,
+            "status": "accepted",
+            "signal_id": signal.id,
+            "correlation_id": signal.correlation_id
+        }
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Réponse en flux dont le générateur lit lui-même le corps de la requête.
+
+    `StreamingResponse` surveille la déconnexion du client en appelant
+    `receive()` en parallèle (ASGI < 2.4), ce qui lui ferait consommer le
+    corps à la place de `request.stream()`. Ici la déconnexion est détectée
+    par la lecture du corps (`ClientDisconnect`) ou par l'envoi.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Nombre d'enregistrements par statut"""
+    counts = {"records": len(results), "accepted": 0, "invalid": 0, "duplicate": 0, "failed": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return counts
+
+
+def _ready(outcome: Any) -> bool:
+    return not isinstance(outcome, asyncio.Future) or outcome.done()
+
+
+async def _once(batch: List[Validated]) -> AsyncIterator[List[Validated]]:
+    yield batch
+
+
+class _Counted:
+    """Compte les enregistrements d'un flux de lots validés"""
+
+    def __init__(self, batches: AsyncIterable[List[Validated]]):
+        self.batches = batches
+        self.records = 0
+
+    async def __aiter__(self):
+        async for batch in self.batches:
+            self.records += len(batch)
+            yield batch
@@ -11,13 +11,11 @@ en signaux pondérés pour le système Acteur-Organique.
 externes et les transmet aux aires de traitement spécialisées.
 """
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime
-import uuid
-import json
 import asyncio
 from contextlib import asynccontextmanager
 from opentelemetry import trace
@@ -30,13 +28,61 @@ from aiokafka import AIOKafkaProducer
 
 import os
 
+from shared.claimcheck import create_claim_check
+from shared.codec import SignalCodec, dumps_json, loads_json
+from shared.types import CortexId, SignalPondere
+from src.ingest import BulkIngestor, DuplexStreamingResponse, summarize
+from src.output_relay import OutputRelay
+from src.sequence import DUPLICATE, SequenceTracker, protocol
+from src.webhooks import WEBHOOKS_RECEIVED, BufferFull, SignatureError, WebhookBuffer, parse_sources
+
 # ============================================
 # CONFIGURATION
 # ============================================
 
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
 TOPIC_INPUT_CHAT = "signals.input.chat"
+TOPIC_INPUT_WEBHOOK = "signals.input.webhook"
 TOPIC_ERRORS = "signals.errors"
+TOPIC_OUTPUT_CHAT = "signals.output.chat"
+TOPIC_QUALIFICATION = "signals.qualification"
+
+# Relais sortie → WebSocket: attente max d'un signal sans connexion locale
+RELAY_BUFFER_SECONDS = float(os.getenv("RELAY_BUFFER_SECONDS", "5"))
+RELAY_BUFFER_MAX = int(os.getenv("RELAY_BUFFER_MAX", "50"))
+
+# Producteur Kafka: "sync" attend l'ack du broker pour chaque signal,
+# "batched" met en file et laisse le producteur regrouper les envois
+KAFKA_PRODUCER_MODE = os.getenv("KAFKA_PRODUCER_MODE", "batched")
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", "5"))
+KAFKA_MAX_BATCH_SIZE = int(os.getenv("KAFKA_MAX_BATCH_SIZE", "65536"))
+KAFKA_COMPRESSION = os.getenv("KAFKA_COMPRESSION") or None  # gzip, snappy, lz4, zstd
+# Format des signaux émis ("json" ou "msgpack"), annoncé par l'en-tête content-type
+SIGNAL_FORMAT = os.getenv("SIGNAL_FORMAT", "json")
+
+# Ingestion en masse (/api/v1/chat/batch et /api/v1/chat/stream)
+INGEST_MAX_BATCH_RECORDS = int(os.getenv("INGEST_MAX_BATCH_RECORDS", "1000"))
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", "500"))  # Envois non acquittés
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", "1048576"))
+
+# Webhooks partenaires: secrets HMAC par source ("source:secret[|secret2],...")
+WEBHOOK_SECRETS = os.getenv("WEBHOOK_SECRETS", "")
+WEBHOOK_TOLERANCE_SECONDS = float(os.getenv("WEBHOOK_TOLERANCE_SECONDS", "300"))  # 0 = sans horodatage
+WEBHOOK_MAX_BODY_BYTES = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", "1048576"))
+# Tampon mémoire vers Kafka: au-delà de WEBHOOK_BUFFER_MAX signaux, 429
+WEBHOOK_BUFFER_MAX = int(os.getenv("WEBHOOK_BUFFER_MAX", "10000"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "500"))
+WEBHOOK_FLUSH_MS = int(os.getenv("WEBHOOK_FLUSH_MS", "50"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "3"))
+WEBHOOK_SHUTDOWN_GRACE_SECONDS = float(os.getenv("WEBHOOK_SHUTDOWN_GRACE_SECONDS", "5"))
+
+# Claim-check: magasin de blobs partagé avec cortex-nlp, pour résoudre les
+# références des signaux relayés (vide = désactivé)
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", "")
+CLAIMCHECK_THRESHOLD_BYTES = int(os.getenv("CLAIMCHECK_THRESHOLD_BYTES", "16384"))
+
+# Protocole delta (messages avec `seq`): sessions suivies pour la détection des trous
+CHAT_SEQUENCE_SESSIONS = int(os.getenv("CHAT_SEQUENCE_SESSIONS", "100000"))
 
 # ============================================
 # MODÈLES DE DONNÉES
@@ -58,21 +104,10 @@ class ChatRequest(BaseModel):
     prospect_info: ProspectInfo
     conversation_history: List[ChatMessage] = []
     language: str = "fr"
-
-class SignalPondere(BaseModel):
-    """Signal pondéré - unité de communication inter-cortex"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    type: str
-    source: str = "cortex-sensoriel"
-    timestamp: int = Field(default_factory=lambda: int(datetime.now().timestamp() * 1000))
-    payload: Dict[str, Any]
-    confiance: float = Field(ge=0.0, le=1.0, default=1.0)
-    ttl: int = 60000  # 60 secondes par défaut
-    correlation_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    metadata: Dict[str, Any] = Field(default_factory=lambda: {
-        "version": "1.0.0",
-        "priority": "NORMAL"
-    })
+    # Protocole delta: numéro du message dans la session (historique non transmis),
+    # `resync` pour renvoyer l'historique complet à la demande de cortex-nlp
+    seq: Optional[int] = Field(None, ge=1)
+    resync: bool = False
 
 # ============================================
 # MÉTRIQUES PROMETHEUS
@@ -96,6 +131,19 @@ PROCESSING_TIME = Histogram(
     ['type']
 )
 
+PRODUCE_FAILURES = Counter(
+    'cortex_sensoriel_produce_failures_total',
+    'Signals whose delivery to Kafka failed',
+    ['topic']
+)
+
+CHAT_SIGNAL_BYTES = Histogram(
+    'cortex_sensoriel_chat_signal_bytes',
+    'Encoded size of LEAD_MESSAGE_RECEIVED signals',
+    ['protocol'],
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+)
+
 ACTIVE_WEBSOCKETS = Counter(
     'cortex_sensoriel_websocket_connections_total',
     'Total WebSocket connections',
@@ -107,27 +155,130 @@ ACTIVE_WEBSOCKETS = Counter(
 # ============================================
 
 producer: Optional[AIOKafkaProducer] = None
+codec = SignalCodec(SIGNAL_FORMAT)
 
 async def get_producer() -> AIOKafkaProducer:
     global producer
     if producer is None:
         producer = AIOKafkaProducer(
             bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
             key_serializer=lambda k: k.encode('utf-8') if k else None,
+            linger_ms=KAFKA_LINGER_MS,
+            max_batch_size=KAFKA_MAX_BATCH_SIZE,
+            compression_type=KAFKA_COMPRESSION,
         )
         await producer.start()
     return producer
 
-async def produce_signal(topic: str, signal: SignalPondere, key: Optional[str] = None):
-    """Produit un signal vers Kafka"""
+def _report_delivery(
+    topic: str,
+    signal: SignalPondere,
+    on_error: Optional[Callable[[Exception], Any]],
+    delivery: asyncio.Future
+):
+    """Rapporte le résultat de livraison d'un signal"""
+    if delivery.cancelled():
+        return
+    error = delivery.exception()
+    if error is None:
+        MESSAGES_PRODUCED.labels(topic=topic).inc()
+        return
+    PRODUCE_FAILURES.labels(topic=topic).inc()
+    print(f"❌ Delivery failed for signal {signal.id} ({signal.type}) on {topic}: {error}")
+    if on_error:
+        on_error(error)
+
+async def produce_signal(
+    topic: str,
+    signal: SignalPondere,
+    key: Optional[str] = None,
+    wait: Optional[bool] = None,
+    on_error: Optional[Callable[[Exception], Any]] = None
+) -> asyncio.Future:
+    """
+    Produit un signal vers Kafka.
+    
+    En mode "sync" (ou avec wait=True), attend l'ack du broker et lève
+    l'erreur éventuelle. En mode "batched", retourne dès la mise en file;
+    l'échec de livraison est rapporté par signal (métrique, log, `on_error`).
+    """
     prod = await get_producer()
-    await prod.send_and_wait(
+    value = codec.encode(signal)
+    if topic == TOPIC_INPUT_CHAT:
+        CHAT_SIGNAL_BYTES.labels(protocol=protocol(signal.payload)).observe(len(value))
+    delivery = await prod.send(
         topic,
-        value=signal.model_dump(),
-        key=key or signal.correlation_id
+        value=value,
+        key=key or signal.correlation_id,
+        headers=codec.headers
+    )
+    delivery.add_done_callback(
+        lambda fut: _report_delivery(topic, signal, on_error, fut)
+    )
+    if wait is None:
+        wait = KAFKA_PRODUCER_MODE == "sync"
+    if wait:
+        await delivery
+    return delivery
+
+# ============================================
+# SIGNAUX CHAT
+# ============================================
+
+def chat_signal(request: ChatRequest, gap: Optional[Dict[str, int]] = None) -> SignalPondere:
+    """
+    Traduit un message chat en signal LEAD_MESSAGE_RECEIVED.
+    
+    Avec `seq` (protocole delta), seul le nouveau message est transmis:
+    cortex-nlp lit l'historique dans Redis. `gap` signale les messages
+    manquants détectés pour la session.
+    """
+    if request.seq is not None:
+        payload = {
+            "session_id": request.session_id,
+            "message": request.message,
+            "prospect_info": request.prospect_info.model_dump(),
+            "language": request.language,
+            "seq": request.seq
+        }
+        if request.resync:
+            payload["conversation_history"] = [m.model_dump() for m in request.conversation_history]
+        if gap:
+            payload["gap"] = gap
+        return SignalPondere.trusted(
+            type="LEAD_MESSAGE_RECEIVED",
+            source=CortexId.SENSORIEL,
+            payload=payload,
+            confiance=1.0,
+            # Même seuil que l'historique complet (6 messages, réponses comprises)
+            priority="NORMAL" if request.seq <= 3 else "HIGH"
+        )
+    return SignalPondere.trusted(
+        type="LEAD_MESSAGE_RECEIVED",
+        source=CortexId.SENSORIEL,
+        payload={
+            "session_id": request.session_id,
+            "message": request.message,
+            "prospect_info": request.prospect_info.model_dump(),
+            "conversation_history": [m.model_dump() for m in request.conversation_history],
+            "language": request.language,
+            "message_count": len(request.conversation_history) + 1
+        },
+        confiance=1.0,  # Signal brut, confiance maximale
+        priority="NORMAL" if len(request.conversation_history) < 6 else "HIGH"
     )
-    MESSAGES_PRODUCED.labels(topic=topic).inc()
+
+chat_sequences = SequenceTracker(max_sessions=CHAT_SEQUENCE_SESSIONS)
+
+# Ingestion en masse: envois pipelinés, un résultat par enregistrement une fois acquitté
+bulk_ingestor = BulkIngestor(
+    ChatRequest,
+    chat_signal,
+    lambda signal, key: produce_signal(TOPIC_INPUT_CHAT, signal, key=key, wait=False),
+    max_in_flight=INGEST_MAX_IN_FLIGHT,
+    max_line_bytes=INGEST_MAX_LINE_BYTES,
+    sequences=chat_sequences
+)
 
 # ============================================
 # WEBSOCKET MANAGER
@@ -144,14 +295,30 @@ class WebSocketManager:
         self.active_connections[session_id] = websocket
         ACTIVE_WEBSOCKETS.labels(status="connected").inc()
     
-    def disconnect(self, session_id: str):
-        if session_id in self.active_connections:
+    def disconnect(self, session_id: str, websocket: Optional[WebSocket] = None):
+        # Avec `websocket`: seulement si la session n'a pas été reprise par une nouvelle connexion
+        current = self.active_connections.get(session_id)
+        if current is not None and (websocket is None or current is websocket):
             del self.active_connections[session_id]
             ACTIVE_WEBSOCKETS.labels(status="disconnected").inc()
     
-    async def send_to_session(self, session_id: str, message: dict):
-        if session_id in self.active_connections:
-            await self.active_connections[session_id].send_json(message)
+    async def close(self, session_id: str, code: int = 1011):
+        """Ferme la WebSocket d'une session (le client se reconnecte)"""
+        websocket = self.active_connections.get(session_id)
+        if websocket is None:
+            return
+        self.disconnect(session_id, websocket)
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass  # Socket déjà fermée
+    
+    async def send_to_session(self, session_id: str, message: dict) -> bool:
+        websocket = self.active_connections.get(session_id)
+        if websocket is None:
+            return False
+        await websocket.send_json(message)
+        return True
     
     async def broadcast(self, message: dict):
         for connection in self.active_connections.values():
@@ -159,6 +326,27 @@ class WebSocketManager:
 
 ws_manager = WebSocketManager()
 
+output_relay = OutputRelay(
+    ws_manager,
+    bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+    topics=[TOPIC_OUTPUT_CHAT, TOPIC_QUALIFICATION, TOPIC_ERRORS],
+    buffer_seconds=RELAY_BUFFER_SECONDS,
+    buffer_max=RELAY_BUFFER_MAX,
+    codec=codec,
+    claims=create_claim_check(BLOB_STORE_PATH, CLAIMCHECK_THRESHOLD_BYTES)
+)
+
+webhook_sources = parse_sources(WEBHOOK_SECRETS, WEBHOOK_TOLERANCE_SECONDS)
+
+# Acquittement immédiat des webhooks, envoi vers Kafka par lots en arrière-plan
+webhook_buffer = WebhookBuffer(
+    lambda signal, key: produce_signal(TOPIC_INPUT_WEBHOOK, signal, key=key, wait=False),
+    max_records=WEBHOOK_BUFFER_MAX,
+    batch_size=WEBHOOK_BATCH_SIZE,
+    flush_interval=WEBHOOK_FLUSH_MS / 1000,
+    max_attempts=WEBHOOK_MAX_ATTEMPTS
+)
+
 # ============================================
 # APPLICATION FASTAPI
 # ============================================
@@ -174,9 +362,27 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Kafka connection failed (will retry): {e}")
     
+    relay_task = asyncio.create_task(output_relay.run())
+    webhook_task = asyncio.create_task(webhook_buffer.run())
+    if webhook_sources:
+        print(f"🪝 Webhook sources: {', '.join(webhook_sources)}")
+    
     yield
     
     # Shutdown
+    for task in (relay_task, webhook_task):
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+    
+    # Webhooks déjà acquittés: vider le tampon avant d'arrêter le producteur
+    if len(webhook_buffer):
+        await webhook_buffer.drain(WEBHOOK_SHUTDOWN_GRACE_SECONDS)
+        if len(webhook_buffer):
+            print(f"⚠️ {len(webhook_buffer)} webhook signal(s) not delivered at shutdown")
+    
     global producer
     if producer:
         await producer.stop()
@@ -228,30 +434,25 @@ async def handle_chat_message(request: ChatRequest):
     Reçoit un message chat et le traduit en signal pondéré.
     
     Ce endpoint remplacera progressivement l'appel direct à la Supabase Edge Function.
+    Avec `seq` (protocole delta), un message déjà transmis n'est pas renvoyé
+    vers Kafka (statut "duplicate").
     """
     with PROCESSING_TIME.labels(type="chat").time():
         MESSAGES_RECEIVED.labels(type="chat", language=request.language).inc()
         
+        gap = None
+        if request.seq is not None:
+            status, gap = chat_sequences.observe(request.session_id, request.seq, request.resync)
+            if status == DUPLICATE:
+                return {"status": "duplicate", "seq": request.seq, "message": "Message already transmitted"}
+        
         # Créer le signal pondéré
-        signal = SignalPondere(
-            type="LEAD_MESSAGE_RECEIVED",
-            payload={
-                "session_id": request.session_id,
-                "message": request.message,
-                "prospect_info": request.prospect_info.model_dump(),
-                "conversation_history": [m.model_dump() for m in request.conversation_history],
-                "language": request.language,
-                "message_count": len(request.conversation_history) + 1
-            },
-            confiance=1.0,  # Signal brut, confiance maximale
-            metadata={
-                "version": "1.0.0",
-                "priority": "NORMAL" if len(request.conversation_history) < 6 else "HIGH"
-            }
-        )
+        signal = chat_signal(request, gap)
         
         try:
-            await produce_signal(TOPIC_INPUT_CHAT, signal, key=request.session_id)
+            # "accepted" seulement après l'ack du broker, même en mode batched:
+            # les requêtes simultanées partagent toujours les lots (linger)
+            await produce_signal(TOPIC_INPUT_CHAT, signal, key=request.session_id, wait=True)
             
             return {
                 "status": "accepted",
@@ -260,15 +461,18 @@ async def handle_chat_message(request: ChatRequest):
                 "message": "Signal transmitted to cortex-nlp"
             }
         except Exception as e:
+            if request.seq is not None:
+                chat_sequences.release(request.session_id, request.seq)
             # Log l'erreur et notifier le système
-            error_signal = SignalPondere(
+            error_signal = SignalPondere.trusted(
                 type="ERROR_INGESTION_FAILED",
+                source=CortexId.SENSORIEL,
                 payload={
                     "original_request": request.model_dump(),
                     "error": str(e)
                 },
                 confiance=1.0,
-                metadata={"version": "1.0.0", "priority": "HIGH"}
+                priority="HIGH"
             )
             # Essayer de produire l'erreur (best effort)
             try:
@@ -278,6 +482,103 @@ async def handle_chat_message(request: ChatRequest):
             
             raise HTTPException(status_code=503, detail="Signal transmission failed")
 
+@app.post("/api/v1/chat/batch")
+async def handle_chat_batch(request: Request):
+    """
+    Reçoit un tableau JSON de messages chat (même format que /api/v1/chat).
+    
+    Les messages valides sont produits en lots pipelinés vers
+    signals.input.chat (clé: session_id); la réponse donne un résultat par
+    enregistrement, dans l'ordre, une fois les acks reçus. Les `seq` déjà
+    transmis ne sont pas renvoyés (statut "duplicate").
+    """
+    try:
+        records = loads_json(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of chat messages")
+    if len(records) > INGEST_MAX_BATCH_RECORDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {INGEST_MAX_BATCH_RECORDS} records; use /api/v1/chat/stream"
+        )
+    
+    with PROCESSING_TIME.labels(type="chat_batch").time():
+        results = await bulk_ingestor.ingest(records, endpoint="batch")
+    
+    return {**summarize(results), "results": results}
+
+@app.post("/api/v1/chat/stream")
+async def handle_chat_stream(request: Request):
+    """
+    Reçoit un flux NDJSON de messages chat (un objet par ligne).
+    
+    Les enregistrements sont traités au fil de la lecture, sans limite de
+    nombre; la réponse est elle-même un flux NDJSON avec un résultat par
+    enregistrement, dans l'ordre, puis une ligne de synthèse `{"summary": ...}`.
+    """
+    async def results():
+        counts = {"records": 0, "accepted": 0, "invalid": 0, "duplicate": 0, "failed": 0}
+        async for result in bulk_ingestor.ingest_ndjson(request.stream(), endpoint="stream"):
+            counts["records"] += 1
+            counts[result["status"]] += 1
+            yield dumps_json(result) + b"\n"
+        yield dumps_json({"summary": counts}) + b"\n"
+    
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.post("/api/v1/webhooks/{source}", status_code=202)
+async def handle_webhook(source: str, request: Request):
+    """
+    Reçoit un webhook partenaire signé (HMAC-SHA256).
+    
+    Après vérification, le corps est normalisé en signal WEBHOOK_RECEIVED
+    et placé dans le tampon vers signals.input.webhook: la réponse 202 ne
+    dépend pas du broker. Tampon plein: 429 avec Retry-After.
+    """
+    webhook_source = webhook_sources.get(source)
+    if webhook_source is None:
+        WEBHOOKS_RECEIVED.labels(source="unknown", status="unknown_source").inc()
+        raise HTTPException(status_code=404, detail="Unknown webhook source")
+    
+    try:
+        declared_length = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        WEBHOOKS_RECEIVED.labels(source=source, status="invalid").inc()
+        raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+    if declared_length > WEBHOOK_MAX_BODY_BYTES:
+        WEBHOOKS_RECEIVED.labels(source=source, status="too_large").inc()
+        raise HTTPException(status_code=413, detail="Webhook body too large")
+    body = await request.body()
+    if len(body) > WEBHOOK_MAX_BODY_BYTES:
+        WEBHOOKS_RECEIVED.labels(source=source, status="too_large").inc()
+        raise HTTPException(status_code=413, detail="Webhook body too large")
+    
+    try:
+        webhook_source.verify(request.headers, body)
+    except SignatureError as e:
+        WEBHOOKS_RECEIVED.labels(source=source, status="unauthorized").inc()
+        raise HTTPException(status_code=401, detail=str(e))
+    
+    try:
+        event = loads_json(body)
+    except ValueError as e:
+        event = e
+    if not isinstance(event, dict):
+        WEBHOOKS_RECEIVED.labels(source=source, status="invalid").inc()
+        raise HTTPException(status_code=400, detail="Expected a JSON object")
+    
+    signal, key = webhook_source.to_signal(event)
+    try:
+        webhook_buffer.offer(signal, key)
+    except BufferFull:
+        WEBHOOKS_RECEIVED.labels(source=source, status="throttled").inc()
+        raise HTTPException(status_code=429, detail="Webhook buffer full", headers={"Retry-After": "1"})
+    
+    WEBHOOKS_RECEIVED.labels(source=source, status="accepted").inc()
+    return {"status": "accepted", "signal_id": signal.id}
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """
@@ -287,8 +588,12 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     - Recevoir les messages du frontend
     - Envoyer les réponses du cortex-nlp (streaming)
     - Notifications de qualification
+    
+    Un message avec `seq` suit le protocole delta (voir `chat_signal`);
+    son `conversation_history` n'est transmis qu'avec `resync`.
     """
     await ws_manager.connect(session_id, websocket)
+    await output_relay.flush(session_id)
     
     try:
         while True:
@@ -296,31 +601,58 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             
             MESSAGES_RECEIVED.labels(type="websocket", language=data.get("language", "fr")).inc()
             
+            payload = {"session_id": session_id, **data}
+            seq = data.get("seq")
+            if seq is not None:
+                if not isinstance(seq, int) or isinstance(seq, bool) or seq < 1:
+                    await websocket.send_json({"type": "error", "message": "seq must be a positive integer"})
+                    continue
+                resync = bool(data.get("resync"))
+                if not resync:
+                    payload.pop("conversation_history", None)
+                payload.pop("resync", None)
+                status, gap = chat_sequences.observe(session_id, seq, resync)
+                if status == DUPLICATE:
+                    await websocket.send_json({"type": "duplicate", "seq": seq})
+                    continue
+                if gap:
+                    payload["gap"] = gap
+            
             # Convertir en signal
-            signal = SignalPondere(
+            signal = SignalPondere.trusted(
                 type="LEAD_MESSAGE_RECEIVED",
-                payload={
-                    "session_id": session_id,
-                    **data
-                },
-                confiance=1.0,
-                metadata={"version": "1.0.0", "priority": "NORMAL"}
+                source=CortexId.SENSORIEL,
+                payload=payload,
+                confiance=1.0
             )
             
+            def delivery_failed(e: Exception, signal_id: str = signal.id, seq: Optional[int] = seq):
+                if seq is not None:
+                    chat_sequences.release(session_id, seq)
+                asyncio.create_task(
+                    websocket.send_json({
+                        "type": "error",
+                        "signal_id": signal_id,
+                        "message": str(e)
+                    })
+                )
+            
             try:
-                await produce_signal(TOPIC_INPUT_CHAT, signal, key=session_id)
+                await produce_signal(TOPIC_INPUT_CHAT, signal, key=session_id, on_error=delivery_failed)
                 await websocket.send_json({
                     "type": "ack",
                     "signal_id": signal.id
                 })
             except Exception as e:
+                if seq is not None:
+                    chat_sequences.release(session_id, seq)
                 await websocket.send_json({
                     "type": "error",
                     "message": str(e)
                 })
     
     except WebSocketDisconnect:
-        ws_manager.disconnect(session_id)
+        ws_manager.disconnect(session_id, websocket)
 
 # ============================================
 # ENTRY POINT
@@ -0,0 +1,204 @@
+"""
+Relais de sortie - Kafka → WebSocket
+
+Consomme les signaux destinés au frontend (réponses, qualification, erreurs)
+et les pousse vers la WebSocket de la session concernée. Les signaux d'une
+session sans connexion locale sont conservés brièvement, puis abandonnés.
+Les textes déportés par claim-check (références de blob) sont résolus au
+moment d'envoyer sur une WebSocket locale: le frontend reçoit toujours le
+contenu, et une instance ne lit pas les blobs des sessions qu'elle ne sert pas.
+Un envoi en échec (client lent, socket rompue) ferme la WebSocket: le
+signal est mis en attente et remis à la reconnexion du client.
+
+Équivalent biologique: voies motrices descendantes qui transmettent la
+réponse élaborée par le cortex vers l'effecteur.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiokafka import AIOKafkaConsumer
+from prometheus_client import Counter, Gauge
+
+from shared.claimcheck import BlobNotFound, ClaimCheck
+from shared.codec import CodecError, SignalCodec
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+RELAYED_SIGNALS = Counter(
+    'cortex_sensoriel_relay_signals_total',
+    'Output signals relayed to WebSocket sessions',
+    ['topic', 'status']
+)
+
+RELAY_BUFFERED = Gauge(
+    'cortex_sensoriel_relay_buffered_signals',
+    'Signals buffered for sessions without a local WebSocket'
+)
+
+# ============================================
+# RELAIS
+# ============================================
+
+class OutputRelay:
+    """Relaie les signaux de sortie Kafka vers les WebSockets des sessions"""
+
+    def __init__(
+        self,
+        ws_manager,
+        bootstrap_servers: str,
+        topics: List[str],
+        buffer_seconds: float = 5.0,
+        buffer_max: int = 50,
+        send_timeout: float = 5.0,
+        codec: Optional[SignalCodec] = None,
+        claims: Optional[ClaimCheck] = None
+    ):
+        self.ws_manager = ws_manager
+        self.bootstrap_servers = bootstrap_servers
+        self.topics = topics
+        self.buffer_seconds = buffer_seconds
+        self.buffer_max = buffer_max
+        self.send_timeout = send_timeout
+        self.codec = codec or SignalCodec()
+        self.claims = claims
+        self._buffers: Dict[str, Deque[Tuple[float, Dict[str, Any]]]] = {}
+        self._buffered = 0
+        self._last_prune = time.monotonic()
+
+    async def run(self, retry_seconds: float = 5.0):
+        """Boucle de consommation (à lancer en tâche de fond), relancée en cas d'erreur"""
+        while True:
+            try:
+                await self._consume()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Output relay failed (retrying in {retry_seconds}s): {e}")
+                await asyncio.sleep(retry_seconds)
+
+    async def _consume(self):
+        # Pas de groupe: chaque instance lit toutes les partitions, car les
+        # WebSockets sont locales à l'instance
+        consumer = AIOKafkaConsumer(
+            *self.topics,
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=None,
+            auto_offset_reset="latest"
+        )
+        await consumer.start()
+        print(f"📡 Output relay: {', '.join(self.topics)} → WebSocket")
+        try:
+            async for msg in consumer:
+                try:
+                    signal = self.codec.decode(msg.value, msg.headers)
+                except CodecError as e:
+                    RELAYED_SIGNALS.labels(topic=msg.topic, status="undecodable").inc()
+                    print(f"⚠️ Output relay: skipping undecodable record on {msg.topic}: {e}")
+                    continue
+                await self.relay(msg.topic, signal)
+        finally:
+            await consumer.stop()
+
+    async def relay(self, topic: str, signal: Dict[str, Any]):
+        """Pousse un signal vers sa session, ou le met en attente"""
+        session_id = (signal.get("payload") or {}).get("session_id")
+        if not session_id:
+            RELAYED_SIGNALS.labels(topic=topic, status="no_session").inc()
+            return
+
+        # Références de blobs résolues à l'envoi seulement: chaque instance lit
+        # tous les signaux, mais ne sert que ses propres sessions
+        message = {"type": "signal", "topic": topic, "signal": signal}
+        if session_id in self.ws_manager.active_connections:
+            if await self._send(session_id, message):
+                RELAYED_SIGNALS.labels(topic=topic, status="delivered").inc()
+                return
+
+        if self.buffer_seconds > 0:
+            self._buffer(session_id, message)
+            RELAYED_SIGNALS.labels(topic=topic, status="buffered").inc()
+        else:
+            RELAYED_SIGNALS.labels(topic=topic, status="dropped").inc()
+
+        self._prune()
+
+    async def flush(self, session_id: str):
+        """Envoie les signaux en attente d'une session qui vient de se connecter"""
+        buffer = self._buffers.pop(session_id, None)
+        if not buffer:
+            return
+        self._buffered -= len(buffer)
+        RELAY_BUFFERED.set(self._buffered)
+
+        deadline = time.monotonic() - self.buffer_seconds
+        for buffered_at, message in buffer:
+            topic = message["topic"]
+            if buffered_at < deadline:
+                RELAYED_SIGNALS.labels(topic=topic, status="expired").inc()
+            elif session_id in self._buffers:
+                # Envoi précédent en échec: la suite attend la prochaine connexion, dans l'ordre
+                self._requeue(session_id, buffered_at, message)
+            elif await self._send(session_id, message):
+                RELAYED_SIGNALS.labels(topic=topic, status="delivered").inc()
+            else:
+                self._requeue(session_id, buffered_at, message)
+
+    async def _send(self, session_id: str, message: Dict[str, Any]) -> bool:
+        if self.claims is not None:
+            signal = message["signal"]
+            try:
+                signal["payload"] = await self.claims.resolve_payload(signal["payload"])
+            except BlobNotFound as e:
+                print(f"⚠️ Output relay: unresolved blob reference {e} on {message['topic']}")
+        try:
+            return await asyncio.wait_for(
+                self.ws_manager.send_to_session(session_id, message),
+                timeout=self.send_timeout
+            )
+        except Exception as e:
+            # Client lent ou socket rompue: fermer la WebSocket pour que le
+            # client se reconnecte, plutôt que d'abandonner la session en silence
+            print(f"⚠️ Output relay: send to session {session_id} failed, closing its WebSocket: {e!r}")
+            await self.ws_manager.close(session_id, code=1011)
+            return False
+
+    def _buffer(self, session_id: str, message: Dict[str, Any], buffered_at: Optional[float] = None):
+        buffer = self._buffers.setdefault(session_id, deque())
+        if len(buffer) >= self.buffer_max:
+            dropped = buffer.popleft()
+            self._buffered -= 1
+            RELAYED_SIGNALS.labels(topic=dropped[1]["topic"], status="dropped").inc()
+        buffer.append((time.monotonic() if buffered_at is None else buffered_at, message))
+        self._buffered += 1
+        RELAY_BUFFERED.set(self._buffered)
+
+    def _requeue(self, session_id: str, buffered_at: float, message: Dict[str, Any]):
+        """Remet en attente un signal non remis lors d'un `flush` (même échéance)"""
+        if self.buffer_seconds > 0:
+            self._buffer(session_id, message, buffered_at)
+            RELAYED_SIGNALS.labels(topic=message["topic"], status="buffered").inc()
+        else:
+            RELAYED_SIGNALS.labels(topic=message["topic"], status="dropped").inc()
+
+    def _prune(self):
+        """Abandonne les signaux en attente depuis plus de `buffer_seconds`"""
+        now = time.monotonic()
+        if now - self._last_prune < self.buffer_seconds:
+            return
+        self._last_prune = now
+
+        deadline = now - self.buffer_seconds
+        for session_id in list(self._buffers):
+            buffer = self._buffers[session_id]
+            while buffer and buffer[0][0] < deadline:
+                _, message = buffer.popleft()
+                self._buffered -= 1
+                RELAYED_SIGNALS.labels(topic=message["topic"], status="expired").inc()
+            if not buffer:
+                del self._buffers[session_id]
+        RELAY_BUFFERED.set(self._buffered)
@@ -0,0 +1,111 @@
+"""
+Protocole delta - numéros de séquence des messages chat
+
+En mode delta, le client n'envoie que le nouveau message et son numéro de
+séquence (`seq`, 1 pour le premier message de la session); l'historique
+est tenu par cortex-nlp dans Redis. Le suivi local des séquences permet de
+détecter les trous (message perdu ou parti vers une autre instance), que
+cortex-nlp signale au client pour qu'il renvoie l'historique complet
+(`resync`), et d'ignorer les renvois d'un message déjà transmis.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from prometheus_client import Counter
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+CHAT_SEQUENCES = Counter(
+    'cortex_sensoriel_chat_sequence_total',
+    'Delta-protocol chat messages by sequence check outcome',
+    ['status']
+)
+
+# ============================================
+# SUIVI DES SÉQUENCES
+# ============================================
+
+# Statuts de `SequenceTracker.observe`
+IN_ORDER = "in_order"      # seq attendu
+GAP = "gap"                # seq au-delà de l'attendu: messages manquants
+LATE = "late"              # seq manquant arrivé après un trou
+DUPLICATE = "duplicate"    # seq déjà transmis: renvoi du client
+UNTRACKED = "untracked"    # session inconnue de cette instance, seq > 1
+RESYNC = "resync"          # historique complet renvoyé: le suivi repart de ce seq
+
+
+class SequenceTracker:
+    """
+    Dernière séquence transmise par session (LRU borné), avec les
+    séquences manquantes encore acceptées en retard.
+    """
+
+    def __init__(self, max_sessions: int = 100000, max_missing: int = 64):
+        self.max_sessions = max_sessions
+        self.max_missing = max_missing
+        self._sessions: "OrderedDict[str, Tuple[int, Set[int]]]" = OrderedDict()
+
+    def observe(self, session_id: str, seq: int, resync: bool = False) -> Tuple[str, Optional[Dict[str, int]]]:
+        """
+        Enregistre `seq` pour la session; retourne le statut et, en cas de
+        trou, `{"expected": ..., "received": ...}` à joindre au signal.
+
+        Avec `resync`, le client renvoie tout son historique: le suivi repart
+        de `seq` (séquences manquantes oubliées), sauf renvoi du même message.
+        """
+        entry = self._sessions.get(session_id)
+        if resync and entry is not None and entry[0] != seq:
+            status, gap = RESYNC, None
+            self._sessions.move_to_end(session_id)
+            self._sessions[session_id] = (seq, set())
+        elif entry is None:
+            status, gap = (IN_ORDER if seq == 1 else UNTRACKED), None
+            self._store(session_id, seq, set())
+        else:
+            last, missing = entry
+            self._sessions.move_to_end(session_id)
+            if seq == last + 1:
+                status, gap = IN_ORDER, None
+                self._sessions[session_id] = (seq, missing)
+            elif seq > last + 1:
+                status, gap = GAP, {"expected": last + 1, "received": seq}
+                missing.update(range(max(last + 1, seq - self.max_missing), seq))
+                self._trim(missing)
+                self._sessions[session_id] = (seq, missing)
+            elif seq in missing:
+                status, gap = LATE, None
+                missing.discard(seq)
+            else:
+                status, gap = DUPLICATE, None
+        CHAT_SEQUENCES.labels(status=status).inc()
+        return status, gap
+
+    def release(self, session_id: str, seq: int):
+        """Annule l'enregistrement de `seq` (livraison échouée): un renvoi sera accepté"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return
+        last, missing = entry
+        if seq <= last:
+            missing.add(seq)
+            self._trim(missing)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _store(self, session_id: str, seq: int, missing: Set[int]):
+        self._sessions[session_id] = (seq, missing)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def _trim(self, missing: Set[int]):
+        while len(missing) > self.max_missing:
+            missing.discard(min(missing))
+
+
+def protocol(payload: Dict[str, Any]) -> str:
+    """Protocole d'un payload LEAD_MESSAGE_RECEIVED: "delta" ou "full\""""
+    return "delta" if "seq" in payload else "full"
@@ -0,0 +1,317 @@
+"""
+Webhooks partenaires - vérification, normalisation, tampon vers Kafka
+
+Chaque source (partenaire) signe ses appels par HMAC-SHA256 avec un secret
+partagé; la requête est vérifiée, son corps normalisé en signal
+WEBHOOK_RECEIVED, puis acquittée aussitôt: le signal rejoint un tampon
+mémoire borné qu'une tâche de fond vide vers `signals.input.webhook` par
+lots. Les rafales sont absorbées par le tampon; une fois plein, les
+appels reçoivent 429 (le partenaire réessaiera).
+
+Équivalent biologique: récepteurs périphériques dont les influx sont
+regroupés avant de remonter vers le cortex.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Mapping, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from shared.types import CortexId, SignalPondere
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+WEBHOOKS_RECEIVED = Counter(
+    'cortex_sensoriel_webhooks_total',
+    'Webhook calls by source and outcome',
+    ['source', 'status']
+)
+
+WEBHOOK_BUFFERED = Gauge(
+    'cortex_sensoriel_webhook_buffer_records',
+    'Webhook signals waiting in the buffer for Kafka'
+)
+
+WEBHOOK_BUFFER_CAPACITY = Gauge(
+    'cortex_sensoriel_webhook_buffer_capacity',
+    'Maximum number of webhook signals held in the buffer'
+)
+
+WEBHOOK_FLUSH_RECORDS = Histogram(
+    'cortex_sensoriel_webhook_flush_records',
+    'Webhook signals sent to Kafka per flush',
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 5000)
+)
+
+WEBHOOK_FLUSH_TIME = Histogram(
+    'cortex_sensoriel_webhook_flush_seconds',
+    'Time to send a webhook batch and receive its acks'
+)
+
+WEBHOOK_BUFFER_WAIT = Histogram(
+    'cortex_sensoriel_webhook_buffer_wait_seconds',
+    'Time from webhook acceptance to Kafka ack',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+WEBHOOK_DELIVERIES = Counter(
+    'cortex_sensoriel_webhook_deliveries_total',
+    'Webhook signal deliveries to Kafka by outcome',
+    ['status']
+)
+
+# ============================================
+# SIGNATURE ET NORMALISATION PAR SOURCE
+# ============================================
+
+class SignatureError(ValueError):
+    """Signature absente, invalide ou horodatage hors tolérance"""
+
+
+def generic_signature(headers: Mapping[str, str]) -> Tuple[Optional[str], str]:
+    """`X-Signature: sha256=<hex>` sur `<X-Webhook-Timestamp>.<corps>` (ou le corps seul)"""
+    signature = headers.get("x-signature", "")
+    if signature.startswith("sha256="):
+        signature = signature[7:]
+    return headers.get("x-webhook-timestamp"), signature
+
+
+def calendly_signature(headers: Mapping[str, str]) -> Tuple[Optional[str], str]:
+    """`Calendly-Webhook-Signature: t=<timestamp>,v1=<hex>` sur `<t>.<corps>`"""
+    parts = dict(
+        part.strip().split("=", 1)
+        for part in headers.get("calendly-webhook-signature", "").split(",")
+        if "=" in part
+    )
+    return parts.get("t"), parts.get("v1", "")
+
+
+def _contact(data: Mapping[str, Any]) -> Dict[str, Any]:
+    return {key: data[key] for key in ("email", "name", "company", "phone") if data.get(key)}
+
+
+def normalize_generic(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Événement générique: `type`/`event`, `id`, données sous `data` ou à la racine"""
+    data = body.get("data") if isinstance(body.get("data"), dict) else body
+    event_id = body.get("id") or body.get("event_id")
+    return {
+        "event": str(body.get("type") or body.get("event") or body.get("event_type") or "unknown"),
+        "event_id": str(event_id) if event_id else None,
+        "contact": _contact(data),
+        "data": data
+    }
+
+
+def normalize_calendly(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Réservation Calendly (`invitee.created`, `invitee.canceled`)"""
+    payload = body.get("payload") if isinstance(body.get("payload"), dict) else {}
+    scheduled = payload.get("scheduled_event") if isinstance(payload.get("scheduled_event"), dict) else {}
+    return {
+        "event": str(body.get("event") or "unknown"),
+        "event_id": payload.get("uri"),
+        "contact": _contact(payload),
+        "data": {
+            "start_time": scheduled.get("start_time"),
+            "end_time": scheduled.get("end_time"),
+            "event_name": scheduled.get("name"),
+            "answers": payload.get("questions_and_answers") or [],
+            "status": payload.get("status")
+        }
+    }
+
+
+@dataclass(frozen=True)
+class WebhookAdapter:
+    """Lecture de la signature et normalisation propres à un partenaire"""
+    signature: Callable[[Mapping[str, str]], Tuple[Optional[str], str]]
+    normalize: Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+# Les sources configurées sans adaptateur dédié utilisent "generic"
+ADAPTERS: Dict[str, WebhookAdapter] = {
+    "generic": WebhookAdapter(generic_signature, normalize_generic),
+    "calendly": WebhookAdapter(calendly_signature, normalize_calendly),
+}
+
+
+class WebhookSource:
+    """Source configurée: secrets (rotation possible) et adaptateur"""
+
+    def __init__(self, name: str, secrets: List[str], tolerance_seconds: float = 300):
+        self.name = name
+        self.adapter = ADAPTERS.get(name, ADAPTERS["generic"])
+        self.tolerance_seconds = tolerance_seconds
+        # Clés HMAC préparées une fois: chaque vérification copie l'état
+        # initial au lieu de redériver la clé
+        self._macs = [hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256) for secret in secrets]
+
+    def verify(self, headers: Mapping[str, str], body: bytes, now: Optional[float] = None):
+        """Lève SignatureError si aucun secret ne valide la signature"""
+        timestamp, signature = self.adapter.signature(headers)
+        if not signature:
+            raise SignatureError("Missing signature")
+        if self.tolerance_seconds > 0:
+            if timestamp is None:
+                raise SignatureError("Missing timestamp")
+            try:
+                skew = abs((now or time.time()) - float(timestamp))
+            except ValueError:
+                raise SignatureError("Invalid timestamp")
+            if skew > self.tolerance_seconds:
+                raise SignatureError("Timestamp outside tolerance")
+        signed = timestamp.encode("ascii", "replace") + b"." + body if timestamp is not None else body
+        expected = signature.lower().encode("utf-8", "replace")
+        for base in self._macs:
+            mac = base.copy()
+            mac.update(signed)
+            if hmac.compare_digest(mac.hexdigest().encode("ascii"), expected):
+                return
+        raise SignatureError("Invalid signature")
+
+    def to_signal(self, body: Dict[str, Any]) -> Tuple[SignalPondere, str]:
+        """Signal WEBHOOK_RECEIVED et clé de partition (contact, sinon événement)"""
+        event = self.adapter.normalize(body)
+        signal = SignalPondere.trusted(
+            type="WEBHOOK_RECEIVED",
+            source=CortexId.SENSORIEL,
+            payload={"webhook_source": self.name, **event},
+            confiance=1.0
+        )
+        key = event["contact"].get("email") or event["event_id"] or signal.id
+        return signal, f"{self.name}:{key}"
+
+
+def parse_sources(spec: str, tolerance_seconds: float = 300) -> Dict[str, WebhookSource]:
+    """`WEBHOOK_SECRETS`: `source:secret[|secret2],autre:secret`"""
+    sources = {}
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        name, _, secrets = entry.partition(":")
+        if not name or not secrets:
+            raise ValueError(f"Invalid WEBHOOK_SECRETS entry: {entry} (expected source:secret)")
+        sources[name] = WebhookSource(name, secrets.split("|"), tolerance_seconds)
+    return sources
+
+# ============================================
+# TAMPON VERS KAFKA
+# ============================================
+
+class BufferFull(Exception):
+    """Tampon plein: l'appel doit être refusé (429)"""
+
+
+class WebhookBuffer:
+    """
+    Tampon mémoire borné vidé par lots vers Kafka.
+
+    `offer` est synchrone et ne touche pas au broker. La tâche `run` envoie
+    jusqu'à `batch_size` signaux dès qu'un lot est plein ou que le plus
+    ancien attend depuis `flush_interval`, puis attend leurs acks. Un signal
+    dont la livraison échoue est remis en tête du tampon, au plus
+    `max_attempts` fois, après une pause de `retry_backoff` secondes.
+    """
+
+    def __init__(
+        self,
+        produce: Callable[[SignalPondere, str], Awaitable[asyncio.Future]],
+        max_records: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.05,
+        max_attempts: int = 3,
+        retry_backoff: float = 1.0
+    ):
+        self.produce = produce
+        self.max_records = max_records
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        # (signal, clé, accepté à, tentatives)
+        self._records: Deque[Tuple[SignalPondere, str, float, int]] = deque()
+        self._batch_ready = asyncio.Event()
+        self._not_empty = asyncio.Event()
+        WEBHOOK_BUFFER_CAPACITY.set(max_records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def offer(self, signal: SignalPondere, key: str):
+        """Ajoute un signal au tampon; lève BufferFull s'il est plein"""
+        if len(self._records) >= self.max_records:
+            raise BufferFull()
+        self._records.append((signal, key, time.perf_counter(), 0))
+        WEBHOOK_BUFFERED.set(len(self._records))
+        self._not_empty.set()
+        if len(self._records) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def run(self):
+        """Boucle de vidage (à lancer en tâche de fond)"""
+        while True:
+            await self._not_empty.wait()
+            if len(self._records) < self.batch_size:
+                # Laisser le lot se remplir, au plus flush_interval
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if await self.flush():
+                # Broker en échec: ne pas renvoyer aussitôt les signaux remis en tête
+                await asyncio.sleep(self.retry_backoff)
+
+    async def flush(self) -> int:
+        """Envoie un lot et attend ses acks; retourne le nombre de signaux remis en tête"""
+        batch = [self._records.popleft() for _ in range(min(self.batch_size, len(self._records)))]
+        if not self._records:
+            self._not_empty.clear()
+        WEBHOOK_BUFFERED.set(len(self._records))
+        if not batch:
+            return 0
+
+        WEBHOOK_FLUSH_RECORDS.observe(len(batch))
+        with WEBHOOK_FLUSH_TIME.time():
+            deliveries = []
+            for signal, key, _, _ in batch:
+                try:
+                    deliveries.append(await self.produce(signal, key))
+                except Exception as e:
+                    deliveries.append(e)
+            outcomes = await asyncio.gather(
+                *(d for d in deliveries if not isinstance(d, Exception)),
+                return_exceptions=True
+            )
+
+        outcomes = iter(outcomes)
+        retries = []
+        now = time.perf_counter()
+        for (signal, key, accepted_at, attempts), delivery in zip(batch, deliveries):
+            error = delivery if isinstance(delivery, Exception) else next(outcomes)
+            if not isinstance(error, BaseException):
+                WEBHOOK_DELIVERIES.labels(status="delivered").inc()
+                WEBHOOK_BUFFER_WAIT.observe(now - accepted_at)
+            elif attempts + 1 < self.max_attempts:
+                WEBHOOK_DELIVERIES.labels(status="retried").inc()
+                retries.append((signal, key, accepted_at, attempts + 1))
+            else:
+                WEBHOOK_DELIVERIES.labels(status="dropped").inc()
+                print(f"❌ Webhook signal {signal.id} dropped after {self.max_attempts} attempts: {error}")
+
+        if retries:
+            # En tête, pour conserver l'ordre par clé
+            self._records.extendleft(reversed(retries))
+            WEBHOOK_BUFFERED.set(len(self._records))
+            self._not_empty.set()
+        return len(retries)
+
+    async def drain(self, timeout: float):
+        """Vide le tampon à l'arrêt, dans la limite de `timeout` secondes"""
+        deadline = time.monotonic() + timeout
+        while self._records and time.monotonic() < deadline:
+            await self.flush()
@@ -0,0 +1,11 @@
+"""
+Tests cortex-sensoriel - `src` (le service) et `shared` (backend/) importables
+
+    cd backend/cortex-sensoriel && python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+SERVICE = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(SERVICE.parent), str(SERVICE)]
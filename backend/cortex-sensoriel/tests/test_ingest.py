@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+from src.ingest import BulkIngestor, summarize
+from src.main import ChatRequest, chat_signal
+from src.sequence import SequenceTracker
+
+PROSPECT = {"name": "Alice", "email": "alice@acme.fr", "company": "Acme"}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def record(message="bonjour", session_id="s1", **fields):
+    return {"session_id": session_id, "message": message, "prospect_info": PROSPECT, **fields}
+
+
+class Broker:
+    """Acks asynchrones, résolus dans l'ordre inverse de l'envoi; `fail` = messages en échec"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.sent = []
+        self._pending = []
+
+    async def produce(self, signal, key):
+        delivery = asyncio.get_running_loop().create_future()
+        self.sent.append((key, signal.payload))
+        self._pending.append((delivery, signal.payload["message"] in self.fail))
+        asyncio.get_running_loop().call_soon(self._ack_latest)
+        return delivery
+
+    def _ack_latest(self):
+        while self._pending:
+            delivery, failed = self._pending.pop()
+            if failed:
+                delivery.set_exception(RuntimeError("broker down"))
+            else:
+                delivery.set_result(None)
+
+
+def ingestor(broker, **kwargs):
+    return BulkIngestor(ChatRequest, chat_signal, broker.produce, **kwargs)
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def collect(stream):
+    return [result async for result in stream]
+
+
+def test_batch_reports_one_result_per_record_in_order():
+    broker = Broker(fail={"m3"})
+    records = [record("m0"), {"session_id": "s1"}, record("m2"), record("m3"), record("m4")]
+    results = run(ingestor(broker, max_in_flight=2).ingest(records))
+
+    assert [(r["index"], r["status"]) for r in results] == [
+        (0, "accepted"), (1, "invalid"), (2, "accepted"), (3, "failed"), (4, "accepted")
+    ]
+    assert {e["loc"][0] for e in results[1]["errors"]} == {"message", "prospect_info"}
+    assert results[3]["error"] == "broker down"
+    assert summarize(results) == {"records": 5, "accepted": 3, "invalid": 1, "duplicate": 0, "failed": 1}
+    assert [payload["message"] for _, payload in broker.sent] == ["m0", "m2", "m3", "m4"]
+
+
+def test_ndjson_mixes_valid_invalid_and_malformed_lines_across_chunks():
+    body = b"\n".join([
+        json.dumps(record("m0")).encode(),
+        b"",
+        b"{not json",
+        json.dumps({"message": "sans session"}).encode(),
+        json.dumps(record("m4")).encode(),
+    ])
+    middle = len(body) // 2
+    results = run(collect(ingestor(Broker()).ingest_ndjson(chunks(body[:middle], body[middle:]))))
+
+    assert [(r["index"], r["status"]) for r in results] == [
+        (0, "accepted"), (1, "invalid"), (2, "invalid"), (3, "accepted")
+    ]
+    assert results[1]["errors"][0]["type"] == "json_invalid"
+
+
+def test_oversized_lines_are_rejected_whole_or_split():
+    long_record = json.dumps(record("x" * 500)).encode()
+    short = json.dumps(record("ok")).encode()
+    ingest = ingestor(Broker(), max_line_bytes=200)
+
+    # Ligne complète dans un seul fragment
+    whole = run(collect(ingest.ingest_ndjson(chunks(long_record + b"\n" + short + b"\n"))))
+    # Ligne répartie sur plusieurs fragments
+    split = run(collect(ingest.ingest_ndjson(chunks(long_record[:300], long_record[300:] + b"\n" + short))))
+
+    for results in (whole, split):
+        assert [r["status"] for r in results] == ["invalid", "accepted"]
+        assert results[0]["errors"][0]["type"] == "line_too_long"
+
+
+def test_delta_records_are_sequenced_like_single_messages():
+    broker = Broker(fail={"m3"})
+    sequences = SequenceTracker()
+    ingest = ingestor(broker, sequences=sequences)
+    records = [record("m1", seq=1), record("m2", seq=2), record("m2", seq=2), record("m3", seq=3), record("m5", seq=5)]
+    results = run(ingest.ingest(records))
+
+    assert [r["status"] for r in results] == ["accepted", "accepted", "duplicate", "failed", "accepted"]
+    assert results[2]["seq"] == 2
+    assert broker.sent[-1][1]["gap"] == {"expected": 4, "received": 5}
+
+    # Livraison en échec: la séquence est libérée, le renvoi est accepté
+    broker.fail.clear()
+    assert [r["status"] for r in run(ingest.ingest([record("m3", seq=3)]))] == ["accepted"]
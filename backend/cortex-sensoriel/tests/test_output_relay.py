@@ -0,0 +1,81 @@
+import asyncio
+
+from src.main import WebSocketManager
+from src.output_relay import OutputRelay
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Socket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed = None
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.delay)
+        self.sent.append(message["signal"]["id"])
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def reply(signal_id):
+    return {"id": signal_id, "payload": {"session_id": "s1", "response": "..."}}
+
+
+def test_slow_client_is_closed_and_gets_the_reply_on_reconnect():
+    async def scenario():
+        sessions = WebSocketManager()
+        relay = OutputRelay(sessions, "kafka:9092", [], send_timeout=0.05)
+        slow = Socket(delay=1)
+        sessions.active_connections["s1"] = slow
+        await relay.relay("signals.output.chat", reply("r1"))
+        await relay.relay("signals.output.chat", reply("r2"))
+
+        fresh = Socket()
+        sessions.active_connections["s1"] = fresh
+        await relay.flush("s1")
+        return slow, fresh
+
+    slow, fresh = run(scenario())
+    assert slow.closed == 1011
+    assert fresh.sent == ["r1", "r2"]
+
+
+def test_broken_socket_is_closed_instead_of_silently_dropped():
+    class Broken(Socket):
+        async def send_json(self, message):
+            raise RuntimeError("socket closed")
+
+    async def scenario():
+        sessions = WebSocketManager()
+        relay = OutputRelay(sessions, "kafka:9092", [])
+        broken = Broken()
+        sessions.active_connections["s1"] = broken
+        await relay.relay("signals.output.chat", reply("r1"))
+        return broken, sessions.active_connections, relay._buffered
+
+    broken, connections, buffered = run(scenario())
+    assert broken.closed == 1011
+    assert connections == {}
+    assert buffered == 1
+
+
+def test_failed_flush_keeps_the_remaining_replies_in_order():
+    async def scenario():
+        sessions = WebSocketManager()
+        relay = OutputRelay(sessions, "kafka:9092", [], send_timeout=0.05)
+        for signal_id in ("r1", "r2"):
+            await relay.relay("signals.output.chat", reply(signal_id))
+        sessions.active_connections["s1"] = Socket(delay=1)
+        await relay.flush("s1")
+
+        fresh = Socket()
+        sessions.active_connections["s1"] = fresh
+        await relay.flush("s1")
+        return fresh
+
+    assert run(scenario()).sent == ["r1", "r2"]
@@ -0,0 +1,52 @@
+from src.sequence import DUPLICATE, GAP, IN_ORDER, LATE, RESYNC, UNTRACKED, SequenceTracker, protocol
+
+
+def test_sequences_in_order_then_duplicate_is_dropped():
+    tracker = SequenceTracker()
+    assert tracker.observe("s1", 1) == (IN_ORDER, None)
+    assert tracker.observe("s1", 2) == (IN_ORDER, None)
+    assert tracker.observe("s1", 2) == (DUPLICATE, None)
+    assert tracker.observe("s1", 1) == (DUPLICATE, None)
+
+
+def test_gap_is_reported_and_missing_seq_accepted_late():
+    tracker = SequenceTracker()
+    tracker.observe("s1", 1)
+    assert tracker.observe("s1", 4) == (GAP, {"expected": 2, "received": 4})
+    assert tracker.observe("s1", 3) == (LATE, None)
+    assert tracker.observe("s1", 3) == (DUPLICATE, None)
+    assert tracker.observe("s1", 5) == (IN_ORDER, None)
+
+
+def test_released_seq_is_accepted_again_after_a_failed_delivery():
+    tracker = SequenceTracker()
+    tracker.observe("s1", 1)
+    tracker.observe("s1", 2)
+    tracker.release("s1", 2)
+    assert tracker.observe("s1", 2) == (LATE, None)
+    assert tracker.observe("s1", 2) == (DUPLICATE, None)
+
+
+def test_resync_resets_the_session():
+    tracker = SequenceTracker()
+    tracker.observe("s1", 1)
+    tracker.observe("s1", 6)  # Trou: 2 à 5 manquants
+    # Le client renvoie tout son historique, avec un compteur reparti plus bas
+    assert tracker.observe("s1", 3, resync=True) == (RESYNC, None)
+    assert tracker.observe("s1", 3, resync=True) == (DUPLICATE, None)
+    assert tracker.observe("s1", 2) == (DUPLICATE, None)  # Plus attendu après le resync
+    assert tracker.observe("s1", 4) == (IN_ORDER, None)
+
+
+def test_unknown_session_is_untracked_and_oldest_sessions_are_evicted():
+    tracker = SequenceTracker(max_sessions=2)
+    assert tracker.observe("s1", 7) == (UNTRACKED, None)
+    tracker.observe("s2", 1)
+    tracker.observe("s3", 1)
+    assert len(tracker) == 2
+    assert tracker.observe("s1", 7) == (UNTRACKED, None)
+
+
+def test_protocol_of_a_payload():
+    assert protocol({"seq": 1}) == "delta"
+    assert protocol({"conversation_history": []}) == "full"
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+import httpx
+import pytest
+
+import src.main as main
+from src.webhooks import SignatureError, WebhookSource, parse_sources
+
+NOW = 1_700_000_000.0
+BODY = json.dumps({"type": "lead.created", "id": "evt-1", "data": {"email": "a@acme.fr"}}).encode()
+
+
+def sign(secret: str, body: bytes, timestamp=None) -> str:
+    signed = f"{timestamp}.".encode() + body if timestamp is not None else body
+    return hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+
+
+def generic_headers(secret: str, body: bytes = BODY, timestamp=NOW):
+    return {"x-webhook-timestamp": str(int(timestamp)), "x-signature": "sha256=" + sign(secret, body, int(timestamp))}
+
+
+def test_valid_signature_is_accepted():
+    WebhookSource("partner", ["s3cret"]).verify(generic_headers("s3cret"), BODY, now=NOW)
+
+
+def test_tampered_body_is_rejected():
+    headers = generic_headers("s3cret")
+    with pytest.raises(SignatureError, match="Invalid signature"):
+        WebhookSource("partner", ["s3cret"]).verify(headers, BODY.replace(b"a@acme", b"b@acme"), now=NOW)
+
+
+def test_wrong_secret_and_missing_signature_are_rejected():
+    source = WebhookSource("partner", ["s3cret"])
+    with pytest.raises(SignatureError, match="Invalid signature"):
+        source.verify(generic_headers("other"), BODY, now=NOW)
+    with pytest.raises(SignatureError, match="Missing signature"):
+        source.verify({"x-webhook-timestamp": str(int(NOW))}, BODY, now=NOW)
+
+
+def test_timestamp_outside_tolerance_is_rejected():
+    source = WebhookSource("partner", ["s3cret"], tolerance_seconds=300)
+    source.verify(generic_headers("s3cret", timestamp=NOW - 299), BODY, now=NOW)
+    with pytest.raises(SignatureError, match="outside tolerance"):
+        source.verify(generic_headers("s3cret", timestamp=NOW - 301), BODY, now=NOW)
+    with pytest.raises(SignatureError, match="outside tolerance"):
+        source.verify(generic_headers("s3cret", timestamp=NOW + 301), BODY, now=NOW)
+    with pytest.raises(SignatureError, match="Missing timestamp"):
+        source.verify({"x-signature": sign("s3cret", BODY)}, BODY, now=NOW)
+
+
+def test_rotated_secrets_are_both_accepted():
+    sources = parse_sources("partner:new-secret|old-secret")
+    for secret in ("new-secret", "old-secret"):
+        sources["partner"].verify(generic_headers(secret), BODY, now=NOW)
+    with pytest.raises(SignatureError):
+        sources["partner"].verify(generic_headers("retired-secret"), BODY, now=NOW)
+
+
+def test_calendly_signature_header():
+    source = WebhookSource("calendly", ["cal-secret"])
+    t = int(NOW)
+    header = f"t={t},v1={sign('cal-secret', BODY, t)}"
+    source.verify({"calendly-webhook-signature": header}, BODY, now=NOW)
+    with pytest.raises(SignatureError, match="Invalid signature"):
+        source.verify({"calendly-webhook-signature": f"t={t + 1},v1={sign('cal-secret', BODY, t)}"}, BODY, now=NOW)
+    with pytest.raises(SignatureError, match="Missing signature"):
+        source.verify({"calendly-webhook-signature": f"t={t}"}, BODY, now=NOW)
+
+
+def test_malformed_content_length_is_a_client_error(monkeypatch):
+    monkeypatch.setattr(main, "webhook_sources", parse_sources("partner:s3cret"))
+
+    async def post():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://sensoriel") as client:
+            return await client.post(
+                "/api/v1/webhooks/partner", content=BODY,
+                headers={**generic_headers("s3cret"), "content-length": "abc"}
+            )
+
+    assert asyncio.run(post()).status_code == 400
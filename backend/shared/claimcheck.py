@@ -0,0 +1,204 @@
+"""
+NEOCORTEX - Claim-check des textes volumineux
+
+Les textes volumineux (réponses LLM, rapports) ne transitent pas en entier
+par Kafka ni par Redis: au-delà de `threshold` octets, le texte est stocké
+une fois dans un magasin adressé par son contenu (SHA-256) et le payload ne
+porte qu'une référence `{"$blob": "sha256:<hex>", "size": <octets>}`. Les
+consommateurs qui n'ont besoin que des métadonnées ne lisent jamais le
+blob; les autres résolvent la référence à la demande (`resolve`,
+`resolve_payload`).
+
+Le magasin fourni est un répertoire local, partagé entre cortices par un
+volume. Un même texte n'est stocké qu'une fois; chaque nouvel envoi
+rafraîchit sa date, et `prune` retire les blobs plus anciens que la
+rétention des topics et de l'historique.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from prometheus_client import Counter, Histogram
+
+# ============================================
+# MÉTRIQUES PROMETHEUS
+# ============================================
+
+CLAIMCHECK_OFFLOADED = Counter(
+    'neocortex_claimcheck_offloaded_total',
+    'Payload fields replaced by a blob reference',
+    ['field']
+)
+
+CLAIMCHECK_OFFLOADED_BYTES = Counter(
+    'neocortex_claimcheck_offloaded_bytes_total',
+    'Bytes kept off Kafka and Redis by blob references',
+    ['field']
+)
+
+CLAIMCHECK_RESOLVED_BYTES = Counter(
+    'neocortex_claimcheck_resolved_bytes_total',
+    'Bytes read back from the blob store to resolve references'
+)
+
+BLOB_STORE_TIME = Histogram(
+    'neocortex_blob_store_seconds',
+    'Blob store operation latency',
+    ['operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+# ============================================
+# MAGASIN DE BLOBS
+# ============================================
+
+REF_KEY = "$blob"
+_KEY_PATTERN = re.compile(r"^sha256:([0-9a-f]{64})$")
+
+
+class BlobNotFound(LookupError):
+    """Référence vers un blob absent (jamais stocké ou expiré)"""
+
+
+class FileBlobStore:
+    """
+    Blobs adressés par contenu dans un répertoire local:
+    `<root>/<hex[:2]>/<hex[2:4]>/<hex>`. L'écriture passe par un fichier
+    temporaire renommé, un lecteur ne voit donc jamais de blob partiel.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    async def put(self, data: bytes) -> str:
+        """Stocke `data` et retourne sa clé `sha256:<hex>`"""
+        with BLOB_STORE_TIME.labels(operation="put").time():
+            return await asyncio.to_thread(self.put_sync, data)
+
+    async def get(self, key: str) -> bytes:
+        """Contenu du blob `key` (BlobNotFound s'il n'existe pas)"""
+        with BLOB_STORE_TIME.labels(operation="get").time():
+            return await asyncio.to_thread(self.get_sync, key)
+
+    def put_sync(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if path.exists():
+            os.utime(path)  # Référencé à nouveau: repousse son expiration
+            return f"sha256:{digest}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return f"sha256:{digest}"
+
+    def get_sync(self, key: str) -> bytes:
+        match = _KEY_PATTERN.match(key)
+        if match is None:
+            raise BlobNotFound(key)
+        try:
+            return self._path(match.group(1)).read_bytes()
+        except FileNotFoundError:
+            raise BlobNotFound(key) from None
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Supprime les blobs non référencés depuis `max_age_seconds`; retourne leur nombre"""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for path in self.root.glob("*/*/*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+
+# ============================================
+# CLAIM-CHECK
+# ============================================
+
+def is_ref(value: Any) -> bool:
+    """Vrai si `value` est une référence de blob"""
+    return isinstance(value, dict) and REF_KEY in value
+
+
+class ClaimCheck:
+    """Remplace les textes au-delà de `threshold` octets par des références, et les résout"""
+
+    def __init__(self, store: FileBlobStore, threshold: int = 16384):
+        self.store = store
+        self.threshold = threshold
+
+    async def offload(self, value: Any, field: str = "") -> Any:
+        """Référence vers `value` si c'est un texte volumineux, sinon `value` inchangé"""
+        # UTF-8: au plus 4 octets par caractère, l'encodage est inutile en dessous
+        if not isinstance(value, str) or len(value) * 4 <= self.threshold:
+            return value
+        data = value.encode("utf-8")
+        if len(data) <= self.threshold:
+            return value
+        key = await self.store.put(data)
+        CLAIMCHECK_OFFLOADED.labels(field=field).inc()
+        CLAIMCHECK_OFFLOADED_BYTES.labels(field=field).inc(len(data))
+        return {REF_KEY: key, "size": len(data)}
+
+    async def offload_payload(self, payload: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+        """
+        Copie de `payload` où les `fields` volumineux sont des références;
+        le payload lui-même est retourné si rien n'est déporté.
+        """
+        offloaded: Optional[Dict[str, Any]] = None
+        for field in fields:
+            value = payload.get(field)
+            ref = await self.offload(value, field)
+            if ref is not value:
+                offloaded = offloaded or dict(payload)
+                offloaded[field] = ref
+        return payload if offloaded is None else offloaded
+
+    async def resolve(self, value: Any) -> Any:
+        """Texte référencé par `value` (BlobNotFound si absent), sinon `value` inchangé"""
+        if not is_ref(value):
+            return value
+        data = await self.store.get(value[REF_KEY])
+        CLAIMCHECK_RESOLVED_BYTES.inc(len(data))
+        return data.decode("utf-8")
+
+    async def resolve_payload(self, payload: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Copie de `payload` dont les références (parmi `fields`, par défaut
+        tous les champs) sont résolues; le payload lui-même s'il n'en a pas.
+        """
+        resolved: Optional[Dict[str, Any]] = None
+        for field in payload if fields is None else fields:
+            value = payload.get(field)
+            if is_ref(value):
+                resolved = resolved or dict(payload)
+                resolved[field] = await self.resolve(value)
+        return payload if resolved is None else resolved
+
+
+def create_claim_check(root: Optional[str], threshold: int) -> Optional[ClaimCheck]:
+    """Claim-check sur le répertoire `root`, ou None si non configuré"""
+    if not root:
+        return None
+    return ClaimCheck(FileBlobStore(root), threshold)
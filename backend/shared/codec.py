@@ -0,0 +1,96 @@
+"""
+NEOCORTEX - Codec des signaux sur Kafka
+
+Encode et décode les `SignalPondere` échangés entre cortices. Le format est
+indiqué par l'en-tête Kafka `content-type`, ce qui permet de faire cohabiter
+plusieurs formats pendant un déploiement: un consommateur décode chaque
+message selon son en-tête (JSON si absent, comme pour les anciens
+producteurs), et chaque producteur choisit son format d'émission.
+
+- JSON: orjson si installé, sinon json de la bibliothèque standard
+- MessagePack: format binaire compact, si `msgpack` est installé
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    msgpack = None
+
+CONTENT_TYPE_HEADER = "content-type"
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+# Noms de formats acceptés en configuration (ex: SIGNAL_FORMAT=msgpack)
+FORMATS = {"json": JSON, "msgpack": MSGPACK}
+
+Headers = Sequence[Tuple[str, bytes]]
+
+
+class CodecError(ValueError):
+    """Message illisible ou format non supporté"""
+
+
+def dumps_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def content_type(headers: Optional[Headers]) -> str:
+    """Format d'un message d'après ses en-têtes Kafka (JSON par défaut)"""
+    for name, value in headers or ():
+        if name.lower() == CONTENT_TYPE_HEADER:
+            return value.decode("latin-1") if isinstance(value, bytes) else value
+    return JSON
+
+
+class SignalCodec:
+    """Encode dans le format configuré, décode selon l'en-tête de chaque message"""
+
+    def __init__(self, name: str = "json"):
+        if name not in FORMATS:
+            raise ValueError(f"Unknown signal format: {name} (expected one of {', '.join(FORMATS)})")
+        if name == "msgpack" and msgpack is None:
+            raise RuntimeError("SIGNAL_FORMAT=msgpack requires the 'msgpack' package")
+        self.name = name
+        self.content_type = FORMATS[name]
+        self.headers: List[Tuple[str, bytes]] = [(CONTENT_TYPE_HEADER, self.content_type.encode("latin-1"))]
+
+    def encode(self, signal: Any) -> bytes:
+        """Sérialise un signal (modèle Pydantic ou dict)"""
+        if self.content_type == JSON:
+            if isinstance(signal, BaseModel):
+                # Sérialisation directe par pydantic-core, sans dict intermédiaire
+                return signal.__pydantic_serializer__.to_json(signal)
+            return dumps_json(signal)
+        if isinstance(signal, BaseModel):
+            signal = signal.model_dump()
+        return msgpack.packb(signal, use_bin_type=True)
+
+    def decode(self, data: bytes, headers: Optional[Headers] = None) -> Dict[str, Any]:
+        """Désérialise un message selon son en-tête `content-type`"""
+        kind = content_type(headers)
+        try:
+            if kind == JSON:
+                return loads_json(data)
+            if kind == MSGPACK and msgpack is not None:
+                return msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise CodecError(f"Cannot decode {kind} message: {e}") from e
+        raise CodecError(f"Unsupported content type: {kind}")
@@ -6,16 +6,60 @@ du système Acteur-Organique.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List, Literal
-from datetime import datetime
+from typing import Optional, Dict, Any, List, Literal, Union
 from enum import Enum
-import uuid
+import random
+import time
+
+
+def now_ms() -> int:
+    """Horodatage courant en millisecondes (epoch)"""
+    return time.time_ns() // 1_000_000
+
+
+def is_expired_at(timestamp: float, ttl: float) -> bool:
+    """Vérifie si un signal émis à `timestamp` (ms) avec ce `ttl` (ms) a expiré"""
+    return (now_ms() - timestamp) > ttl
+
+
+def new_signal_id() -> str:
+    """
+    Identifiant UUIDv7 (RFC 9562): horodatage ms sur 48 bits puis 74 bits
+    aléatoires. Triable par date de création, et environ deux fois moins
+    coûteux que str(uuid.uuid4()) (pas d'appel système ni d'objet UUID).
+    """
+    h = "%012x7%03x%016x" % (
+        now_ms(),
+        random.getrandbits(12),
+        0x8000000000000000 | random.getrandbits(62)  # Variante RFC 4122
+    )
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _construct(cls, values: Dict[str, Any]):
+    """
+    Instancie un modèle Pydantic à partir de valeurs complètes, sans
+    validation. Équivalent à `cls.model_construct(**values)` sans le
+    parcours des champs et de leurs valeurs par défaut: `values` doit
+    contenir tous les champs du modèle.
+    """
+    obj = cls.__new__(cls)
+    object.__setattr__(obj, "__dict__", values)
+    object.__setattr__(obj, "__pydantic_fields_set__", set(values))
+    object.__setattr__(obj, "__pydantic_extra__", None)
+    object.__setattr__(obj, "__pydantic_private__", None)
+    return obj
 
 
 class SignalType(str, Enum):
     """Types de signaux dans le système"""
+    
+    def __str__(self) -> str:
+        return self.value
+    
     # Entrée
     LEAD_MESSAGE_RECEIVED = "LEAD_MESSAGE_RECEIVED"
+    WEBHOOK_RECEIVED = "WEBHOOK_RECEIVED"
     
     # Intelligence
     LEAD_INTENT_DETECTED = "LEAD_INTENT_DETECTED"
@@ -25,6 +69,7 @@ class SignalType(str, Enum):
     REPORT_REQUESTED = "REPORT_REQUESTED"
     REPORT_GENERATED = "REPORT_GENERATED"
     ASSISTANT_RESPONSE = "ASSISTANT_RESPONSE"
+    SESSION_RESYNC_REQUIRED = "SESSION_RESYNC_REQUIRED"
     
     # Décisions
     DECISION_GENERATE_REPORT = "DECISION_GENERATE_REPORT"
@@ -34,10 +79,15 @@ class SignalType(str, Enum):
     # Erreurs
     ERROR_INGESTION_FAILED = "ERROR_INGESTION_FAILED"
     ERROR_PROCESSING_FAILED = "ERROR_PROCESSING_FAILED"
+    ERROR_SIGNAL_EXPIRED = "ERROR_SIGNAL_EXPIRED"
 
 
 class CortexId(str, Enum):
     """Identifiants des cortices du système"""
+    
+    def __str__(self) -> str:
+        return self.value
+    
     SENSORIEL = "cortex-sensoriel"
     NLP = "cortex-nlp"
     QUALIFICATION = "cortex-qualification"
@@ -47,6 +97,10 @@ class CortexId(str, Enum):
 
 class Priority(str, Enum):
     """Niveaux de priorité des signaux"""
+    
+    def __str__(self) -> str:
+        return self.value
+    
     LOW = "LOW"
     NORMAL = "NORMAL"
     HIGH = "HIGH"
@@ -68,20 +122,55 @@ class SignalPondere(BaseModel):
     Équivalent biologique: Potentiel d'action avec intensité variable
     transmis entre neurones via synapses.
     """
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_signal_id)
     type: SignalType
     source: CortexId
-    timestamp: int = Field(default_factory=lambda: int(datetime.now().timestamp() * 1000))
+    timestamp: int = Field(default_factory=now_ms)
     payload: Dict[str, Any]
     confiance: float = Field(ge=0.0, le=1.0, default=1.0, description="Intensité du signal")
     ttl: int = Field(default=60000, description="Time-to-live en ms")
-    correlation_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    correlation_id: str = Field(default_factory=new_signal_id)
     metadata: SignalMetadata = Field(default_factory=SignalMetadata)
     
+    @classmethod
+    def trusted(
+        cls,
+        type: Union[SignalType, str],
+        source: Union[CortexId, str],
+        payload: Dict[str, Any],
+        confiance: float = 1.0,
+        correlation_id: Optional[str] = None,
+        priority: Union[Priority, str] = Priority.NORMAL,
+        ttl: int = 60000
+    ) -> "SignalPondere":
+        """
+        Construction sans validation pour les signaux créés par un cortex.
+        
+        Les champs viennent du code du service (pas d'une entrée externe):
+        seuls les énumérés sont vérifiés. Sans `correlation_id`, le signal
+        ouvre sa propre chaîne de corrélation (même valeur que son `id`).
+        """
+        signal_id = new_signal_id()
+        return _construct(cls, {
+            "id": signal_id,
+            "type": type if isinstance(type, SignalType) else SignalType(type),
+            "source": source if isinstance(source, CortexId) else CortexId(source),
+            "timestamp": now_ms(),
+            "payload": payload,
+            "confiance": confiance,
+            "ttl": ttl,
+            "correlation_id": correlation_id or signal_id,
+            "metadata": _construct(SignalMetadata, {
+                "version": "1.0.0",
+                "priority": priority if isinstance(priority, Priority) else Priority(priority),
+                "trace_id": None,
+                "span_id": None
+            })
+        })
+    
     def is_expired(self) -> bool:
         """Vérifie si le signal a expiré"""
-        now = int(datetime.now().timestamp() * 1000)
-        return (now - self.timestamp) > self.ttl
+        return is_expired_at(self.timestamp, self.ttl)
     
     def with_increased_confidence(self, boost: float) -> "SignalPondere":
         """Retourne une copie avec confiance augmentée"""
@@ -111,6 +200,9 @@ class LeadMessagePayload(BaseModel):
     prospect_info: ProspectInfo
     conversation_history: List[ChatMessage] = []
     message_count: int = 1
+    # Protocole delta: numéro du message, sans historique (sauf resync)
+    seq: Optional[int] = None
+    gap: Optional[Dict[str, int]] = None
 
 
 class IntentDetectedPayload(BaseModel):
@@ -0,0 +1,10 @@
+"""
+Tests du code partagé - `shared` (backend/) importable
+
+    cd backend && python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+
+from shared.claimcheck import REF_KEY, BlobNotFound, ClaimCheck, FileBlobStore, create_claim_check, is_ref
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def claims(tmp_path, threshold=64):
+    return ClaimCheck(FileBlobStore(str(tmp_path)), threshold)
+
+
+def test_only_texts_above_the_threshold_are_offloaded(tmp_path):
+    check = claims(tmp_path, threshold=64)
+    at_threshold = "é" * 32  # 64 octets en UTF-8
+    above = "é" * 33
+
+    assert run(check.offload("court")) == "court"
+    assert run(check.offload(at_threshold)) == at_threshold
+    assert run(check.offload({"not": "text"})) == {"not": "text"}
+    ref = run(check.offload(above, "response"))
+    assert ref == {REF_KEY: "sha256:" + hashlib.sha256(above.encode()).hexdigest(), "size": 66}
+
+
+def test_payload_round_trip(tmp_path):
+    check = claims(tmp_path)
+    payload = {"session_id": "s1", "response": "x" * 100, "report": "court"}
+
+    offloaded = run(check.offload_payload(payload, ["response", "report"]))
+    assert is_ref(offloaded["response"]) and offloaded["report"] == "court"
+    assert payload["response"] == "x" * 100  # L'original n'est pas modifié
+    assert run(check.resolve_payload(offloaded)) == payload
+
+    small = {"session_id": "s1", "response": "ok"}
+    assert run(check.offload_payload(small, ["response"])) is small
+    assert run(check.resolve_payload(small)) is small
+
+
+def test_identical_texts_share_one_blob(tmp_path):
+    check = claims(tmp_path)
+    first = run(check.offload("y" * 100))
+    second = run(check.offload("y" * 100))
+
+    assert first == second
+    assert len([p for p in tmp_path.glob("*/*/*")]) == 1
+
+
+def test_missing_or_invalid_reference_raises_blob_not_found(tmp_path):
+    check = claims(tmp_path)
+    with pytest.raises(BlobNotFound):
+        run(check.resolve({REF_KEY: "sha256:" + "0" * 64, "size": 1}))
+    with pytest.raises(BlobNotFound):
+        run(check.resolve({REF_KEY: "../../etc/passwd", "size": 1}))
+
+
+def test_prune_expires_unreferenced_blobs_only(tmp_path):
+    check = claims(tmp_path)
+    store = check.store
+    old = run(check.offload("o" * 100))
+    recent = run(check.offload("r" * 100))
+    reused = run(check.offload("u" * 100))
+
+    past = time.time() - 3600
+    for ref in (old, reused):
+        path = store._path(ref[REF_KEY].split(":", 1)[1])
+        os.utime(path, (past, past))
+    run(check.offload("u" * 100))  # Nouvel envoi: l'expiration est repoussée
+
+    assert store.prune(max_age_seconds=60) == 1
+    with pytest.raises(BlobNotFound):
+        run(check.resolve(old))
+    assert run(check.resolve(recent)) == "r" * 100
+    assert run(check.resolve(reused)) == "u" * 100
+
+
+def test_claim_check_is_disabled_without_a_store():
+    assert create_claim_check(None, 1024) is None
+    assert create_claim_check("", 1024) is None